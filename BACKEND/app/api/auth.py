@@ -2,21 +2,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.services.auth import get_current_user, verify_password, create_access_token
+from app.services.auth import get_current_user, get_current_user_async, verify_password, create_access_token
 from app.models.user import User
-from app.db.session import SessionLocal
+from app.db.session import get_db
 
 from app.services.auth import hash_password
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class LoginRequest(BaseModel):
     email: str
     password: str
@@ -54,7 +47,7 @@ def generate_hash(password: str):
     }
 
 @router.get("/me")
-def get_me(current_user = Depends(get_current_user)):
+async def get_me(current_user = Depends(get_current_user_async)):
     return current_user
 
 def require_admin(user=Depends(get_current_user)):
@@ -1,205 +1,504 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.db.session import SessionLocal
-import math
+from app.db.session import get_db, get_async_db
+from app.services import features as feature_set
+from app.services.gee_tasks import tracker, ACTIVE_STATES
+from app.services.regression import fit_from_stats, metrics
+from app.services import model_stats, uncertainty, carbon_map, carbon_models, interpolation
+from app.services.model_registry import registry
+from app.services.raster import LocalScene
+from app.models.carbon import CarbonLocalMapRequest, CarbonPredictRequest, CarbonInterpolateRequest
+import numpy as np
+import json
+import time
 import ee
 
 router = APIRouter(prefix="/carbon", tags=["Carbon"])
 
-
-# ===============================
-# DATABASE DEPENDENCY
-# ===============================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Long-poll output: baca ulang database tiap N detik selama menunggu,
+# untuk perubahan yang dilihat tracker di worker lain
+OUTPUT_RECHECK_S = 5
 
 
 # ===============================
-# SIMPLE LINEAR REGRESSION (NO SKLEARN)
-# y = b0 + b1*x1 + ... + bk*xk
+# TRAIN MODEL
 # ===============================
-def fit_linear_regression(X, y):
-    # Add intercept column
-    # X: list[list[float]] shape (n,k)
-    # y: list[float] shape (n,)
-    n = len(X)
-    if n == 0:
-        raise ValueError("No data")
-    k = len(X[0])
-
-    # Build design matrix with intercept
-    A = []
-    for i in range(n):
-        A.append([1.0] + [float(v) for v in X[i]])
-
-    # Solve normal equation: beta = (A^T A)^-1 A^T y
-    # We'll do a small, safe Gauss-Jordan inversion for (k+1)x(k+1)
-    m = k + 1
-
-    # Compute ATA and ATy
-    ATA = [[0.0] * m for _ in range(m)]
-    ATy = [0.0] * m
-
-    for i in range(n):
-        for r in range(m):
-            ATy[r] += A[i][r] * y[i]
-            for c in range(m):
-                ATA[r][c] += A[i][r] * A[i][c]
-
-    # Invert ATA (Gauss-Jordan)
-    # Augment with identity
-    aug = [row[:] + [0.0]*m for row in ATA]
-    for i in range(m):
-        aug[i][m+i] = 1.0
-
-    # Elimination
-    for col in range(m):
-        # Find pivot
-        pivot = col
-        for r in range(col, m):
-            if abs(aug[r][col]) > abs(aug[pivot][col]):
-                pivot = r
-        if abs(aug[pivot][col]) < 1e-12:
-            raise ValueError("Singular matrix (not enough variation / too few points)")
-
-        # Swap
-        if pivot != col:
-            aug[col], aug[pivot] = aug[pivot], aug[col]
-
-        # Normalize row
-        div = aug[col][col]
-        for j in range(2*m):
-            aug[col][j] /= div
-
-        # Eliminate others
-        for r in range(m):
-            if r == col:
-                continue
-            factor = aug[r][col]
-            for j in range(2*m):
-                aug[r][j] -= factor * aug[col][j]
-
-    inv = [row[m:] for row in aug]
-
-    beta = [0.0] * m
-    for r in range(m):
-        beta[r] = sum(inv[r][c] * ATy[c] for c in range(m))
-
-    intercept = beta[0]
-    coefs = beta[1:]
-    return intercept, coefs
-
-
-def metrics(y_true, y_pred):
-    n = len(y_true)
-    if n == 0:
-        return None
+def _stats_for(db, project_id: str, features: list[str]):
+    stats = model_stats.load(db, project_id)
+    if stats is None or stats["features"] != features:
+        stats = model_stats.rebuild(db, project_id, features)
+        db.commit()
+    return stats
 
-    mean_y = sum(y_true) / n
-    ss_tot = sum((v - mean_y) ** 2 for v in y_true)
-    ss_res = sum((y_true[i] - y_pred[i]) ** 2 for i in range(n))
-    r2 = 1.0 - (ss_res / ss_tot) if ss_tot > 1e-12 else None
 
-    mse = ss_res / n
-    rmse = math.sqrt(mse)
-    return r2, rmse
+# Query param train_carbon_model sendiri; sisanya option model type
+TRAIN_PARAMS = {"features", "cv_folds", "source", "model_type"}
 
 
-# ===============================
-# TRAIN MODEL
-# ===============================
 @router.post("/train/{project_id}")
-def train_carbon_model(project_id: str, db: Session = Depends(get_db)):
+def train_carbon_model(
+    project_id: str,
+    request: Request,
+    features: list[str] | None = Query(None),
+    cv_folds: int = Query(5, ge=0, le=20),
+    source: str = Query("points", pattern="^(points|stats)$"),
+    model_type: str = Query("linear_regression"),
+    db: Session = Depends(get_db)
+):
+    """
+    Query param selain di atas adalah option model type, misal
+    ridge (linear_regression) atau n_trees / max_depth / min_leaf /
+    max_features / seed (random_forest); lihat carbon_models.
+    """
     # Choose features we will use
-    features = ["ndvi", "evi", "b4", "b8"]
+    try:
+        features = feature_set.validate(features or feature_set.MODEL_FEATURES)
+        plugin = carbon_models.get_type(model_type)
+        opts = carbon_models.parse_options(plugin, {
+            k: v for k, v in request.query_params.items() if k not in TRAIN_PARAMS
+        })
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    if source == "stats" and model_type != "linear_regression":
+        raise HTTPException(400, "source=stats hanya untuk linear_regression")
+
+    # source=stats: fit from running sufficient statistics, O(k^2),
+    # no per-point data (so no cross-validation)
+    if source == "stats":
+        stats = _stats_for(db, project_id, features)
+        n_points = stats["n"]
+
+        if n_points < 10:
+            raise HTTPException(
+                400,
+                f"Data approved terlalu sedikit untuk training (butuh minimal ~10). Sekarang: {n_points}"
+            )
+
+        ridge = opts.get("ridge", 0.0)
+        try:
+            intercept, coefs, r2, rmse = fit_from_stats(stats, ridge=ridge)
+        except ValueError as e:
+            raise HTTPException(400, f"Gagal training: {str(e)}")
+
+        params = {
+            "intercept": intercept,
+            "coefficients": dict(zip(features, coefs)),
+            "ridge": ridge,
+            "cv": None,
+        }
 
-    # Pull training data from approved points
-    rows = db.execute(
-        text(f"""
-            SELECT {",".join(features)}, agb_kg_per_m2
-            FROM sampling_points
-            WHERE project_id = :pid
-              AND survey_status = 'approved'
-              AND agb_kg_per_m2 IS NOT NULL
-              AND ndvi IS NOT NULL
-              AND b4 IS NOT NULL
-              AND b8 IS NOT NULL
-        """),
-        {"pid": project_id}
-    ).mappings().all()
+        return _save_model(db, project_id, model_type, features, params, r2, rmse, n_points)
 
-    if len(rows) < 10:
+    # Pull training data from approved points that have every feature
+    X, y = model_stats.training_rows(db, project_id, features)
+
+    if len(y) < 10:
         raise HTTPException(
             400,
-            f"Data approved terlalu sedikit untuk training (butuh minimal ~10). Sekarang: {len(rows)}"
+            f"Data approved terlalu sedikit untuk training (butuh minimal ~10). Sekarang: {len(y)}"
         )
 
-    X = []
-    y = []
-    for r in rows:
-        # if evi is missing, you can default to 0, but better require it if you want it
-        xrow = []
-        for f in features:
-            if r[f] is None:
-                raise HTTPException(400, f"Feature {f} masih NULL di beberapa point")
-            xrow.append(float(r[f]))
-        X.append(xrow)
-        y.append(float(r["agb_kg_per_m2"]))
-
     try:
-        intercept, coefs = fit_linear_regression(X, y)
+        params = plugin.fit(X, y, features, **opts)
+        cv = (
+            carbon_models.kfold_cv(plugin, X, y, features, folds=cv_folds, **opts)
+            if cv_folds >= 2 else None
+        )
     except ValueError as e:
         raise HTTPException(400, f"Gagal training: {str(e)}")
 
     # Predict on training set (baseline)
-    yhat = []
-    for i in range(len(X)):
-        pred = intercept
-        for j in range(len(features)):
-            pred += coefs[j] * X[i][j]
-        yhat.append(pred)
+    r2, rmse = metrics(y, plugin.load(params, features).predict(X))
+    params["cv"] = cv
+
+    return _save_model(db, project_id, model_type, features, params, r2, rmse, len(y))
 
-    r2, rmse = metrics(y, yhat)
 
+def _save_model(db, project_id, model_type, features, params, r2, rmse, n_points):
     # Save to project_models
     inserted = db.execute(
         text("""
             INSERT INTO project_models (project_id, model_type, features, params, r_squared, rmse)
-            VALUES (:pid, :model_type, :features, :params::jsonb, :r2, :rmse)
+            VALUES (:pid, :model_type, :features, CAST(:params AS jsonb), :r2, :rmse)
             RETURNING id
         """),
         {
             "pid": project_id,
-            "model_type": "linear_regression",
+            "model_type": model_type,
             "features": features,
-            "params": {
-                "intercept": intercept,
-                "coefficients": dict(zip(features, coefs)),
-            },
+            "params": json.dumps(params),
             "r2": r2,
             "rmse": rmse
         }
     ).fetchone()
 
     db.commit()
+    registry.invalidate(project_id)
 
     return {
         "project_id": project_id,
         "model_id": int(inserted[0]),
-        "model_type": "linear_regression",
+        "model_type": model_type,
+        "features": features,
+        # array tree tidak perlu dikirim balik
+        "params": {k: v for k, v in params.items() if k != "trees"},
+        "r_squared": r2,
+        "rmse": rmse,
+        "training_points": n_points,
+    }
+
+
+# ===============================
+# PREVIEW FIT (FROM RUNNING STATS)
+# ===============================
+@router.get("/preview/{project_id}")
+def preview_carbon_model(
+    project_id: str,
+    features: list[str] | None = Query(None),
+    ridge: float = Query(0.0, ge=0),
+    db: Session = Depends(get_db)
+):
+    try:
+        features = feature_set.validate(features or feature_set.MODEL_FEATURES)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    stats = _stats_for(db, project_id, features)
+
+    try:
+        intercept, coefs, r2, rmse = fit_from_stats(stats, ridge=ridge)
+    except ValueError as e:
+        raise HTTPException(400, f"Belum bisa fit: {str(e)}")
+
+    return {
+        "project_id": project_id,
         "features": features,
         "params": {
             "intercept": intercept,
             "coefficients": dict(zip(features, coefs)),
+            "ridge": ridge,
         },
         "r_squared": r2,
         "rmse": rmse,
-        "training_points": len(rows),
+        "training_points": stats["n"],
+        "stats_updated_at": stats.get("updated_at"),
+    }
+
+
+# ===============================
+# UNCERTAINTY (BOOTSTRAP + CV)
+# ===============================
+@router.post("/uncertainty/{model_id}")
+def model_uncertainty(
+    model_id: int,
+    n_boot: int = Query(2000, ge=100, le=20000),
+    level: float = Query(0.95, gt=0.5, lt=1),
+    cv_folds: int = Query(5, ge=0, le=20),
+    seed: int = 0,
+    db: Session = Depends(get_db)
+):
+    model = db.execute(
+        text("""
+            SELECT id, project_id, model_type, features, params
+            FROM project_models
+            WHERE id = :id
+        """),
+        {"id": model_id}
+    ).mappings().first()
+
+    if not model:
+        raise HTTPException(404, "Model tidak ditemukan")
+
+    if model["model_type"] != "linear_regression":
+        raise HTTPException(400, "Saat ini hanya support linear_regression")
+
+    features = list(model["features"])
+    ridge = float(model["params"].get("ridge") or 0.0)
+
+    X, y = model_stats.training_rows(db, str(model["project_id"]), features)
+
+    if len(y) < 10:
+        raise HTTPException(400, f"Data training terlalu sedikit: {len(y)}")
+
+    result = uncertainty.bootstrap(
+        X,
+        y,
+        n_boot=n_boot,
+        ridge=ridge,
+        level=level,
+        seed=seed,
+        cv_folds=cv_folds
+    )
+    result["terms"] = ["intercept"] + features
+    result["training_points"] = len(y)
+
+    db.execute(
+        text("""
+            UPDATE project_models
+            SET uncertainty = CAST(:unc AS jsonb)
+            WHERE id = :id
+        """),
+        {"id": model_id, "unc": json.dumps(result)}
+    )
+    db.commit()
+    registry.invalidate(model["project_id"])
+
+    return {
+        "model_id": model_id,
+        "uncertainty": result
+    }
+
+
+# ===============================
+# ACTIVE MODEL
+# ===============================
+def _resolve_model(db, project_id: str, model_id: int | None = None, linear_only: bool = False):
+    if model_id is not None:
+        model = registry.get(db, model_id)
+        if model is None or model.project_id != str(project_id):
+            raise HTTPException(404, "Model tidak ditemukan")
+    else:
+        model = registry.active(db, project_id)
+
+    if not model:
+        raise HTTPException(400, "Belum ada model. Jalankan training dulu.")
+
+    if model.predictor is None:
+        raise HTTPException(400, f"Model type tidak didukung: {model.model_type}")
+
+    if linear_only and not model.is_linear:
+        raise HTTPException(400, "Saat ini hanya support linear_regression")
+
+    try:
+        feature_set.validate(model.features)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return model
+
+
+@router.post("/models/{model_id}/activate")
+def activate_carbon_model(model_id: int, db: Session = Depends(get_db)):
+    """
+    Pin model sebagai model aktif project (dipakai generate / predict
+    walaupun ada training yang lebih baru).
+    """
+    model = registry.activate(db, model_id)
+
+    if model is None:
+        raise HTTPException(404, "Model tidak ditemukan")
+
+    return {
+        "project_id": model.project_id,
+        "model_id": model.id,
+        "model_type": model.model_type,
+        "features": model.features,
+        "is_active": True
+    }
+
+
+@router.delete("/models/{model_id}/activate")
+def deactivate_carbon_model(model_id: int, db: Session = Depends(get_db)):
+    """
+    Lepas pin: generate / predict kembali memakai training terbaru.
+    """
+    model = registry.deactivate(db, model_id)
+
+    if model is None:
+        raise HTTPException(404, "Model tidak ditemukan")
+
+    return {
+        "project_id": model.project_id,
+        "model_id": model.id,
+        "model_type": model.model_type,
+        "features": model.features,
+        "is_active": False
+    }
+
+
+# ===============================
+# BATCH PREDICTION
+# ===============================
+MAX_PREDICT_ROWS = 100_000
+
+
+NEAREST_FEATURES_SQL = """
+    SELECT v.ord, n.features, n.dist
+    FROM unnest(
+        CAST(:lons AS double precision[]),
+        CAST(:lats AS double precision[])
+    ) WITH ORDINALITY AS v(lon, lat, ord)
+    LEFT JOIN LATERAL (
+        SELECT
+            f.features,
+            ST_Distance(
+                sp.geom::geography,
+                ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326)::geography
+            ) AS dist
+        FROM sampling_points sp
+        JOIN sampling_point_features f
+          ON f.sampling_point_id = sp.id
+        WHERE sp.project_id = :pid
+          AND f.features ?& CAST(:features AS text[])
+        ORDER BY sp.geom <-> ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326)
+        LIMIT 1
+    ) n ON true
+"""
+
+
+def _features_from_points(db, project_id: str, names: list[str], lon, lat, max_distance_m: float):
+    """
+    Feature dari titik sampling terdekat (KNN GiST) yang punya semua
+    feature. Return (X, distance_m); baris tanpa tetangga -> NaN.
+    """
+    rows = db.execute(
+        text(NEAREST_FEATURES_SQL),
+        {"pid": project_id, "lons": list(lon), "lats": list(lat), "features": names}
+    ).fetchall()
+
+    X = np.full((len(lon), len(names)), np.nan)
+    dist = np.full(len(lon), np.nan)
+
+    for ord_, feats, d in rows:
+        if feats is None or d is None or d > max_distance_m:
+            continue
+        X[ord_ - 1] = [feats[n] for n in names]
+        dist[ord_ - 1] = d
+
+    return X, dist
+
+
+def _features_from_scene(db, scene_id: str, names: list[str], lon, lat, buffer_m: float):
+    try:
+        scene = LocalScene(scene_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(404, str(e))
+
+    # lon/lat -> CRS scene, satu query untuk semua titik
+    xy = db.execute(
+        text("""
+            SELECT ST_X(p), ST_Y(p)
+            FROM (
+                SELECT ST_Transform(ST_SetSRID(ST_MakePoint(lon, lat), 4326), :srid) AS p, ord
+                FROM unnest(
+                    CAST(:lons AS double precision[]),
+                    CAST(:lats AS double precision[])
+                ) WITH ORDINALITY AS v(lon, lat, ord)
+            ) t
+            ORDER BY ord
+        """),
+        {"lons": list(lon), "lats": list(lat), "srid": scene.srid}
+    ).fetchall()
+
+    xs = np.array([r[0] for r in xy], dtype=np.float64)
+    ys = np.array([r[1] for r in xy], dtype=np.float64)
+
+    try:
+        stats = scene.buffered_mean(
+            feature_set.required_bands(names),
+            xs,
+            ys,
+            radius_m=buffer_m,
+            derive=lambda window: feature_set.compute_features(window, names)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(400, str(e))
+
+    return np.column_stack([stats[n] for n in names]), scene
+
+
+@router.post("/predict/{project_id}")
+def predict_carbon(
+    project_id: str,
+    payload: CarbonPredictRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Prediksi AGB (kg/m²) untuk banyak titik sekaligus dengan model aktif.
+    Input feature langsung, atau koordinat yang feature-nya diambil dari
+    scene lokal / titik sampling terdekat. Interval prediksi ikut bila
+    model sudah punya uncertainty.
+    """
+    if (payload.coordinates is None) == (payload.features is None):
+        raise HTTPException(400, "Isi salah satu: coordinates atau features")
+
+    n = len(payload.coordinates if payload.coordinates is not None else payload.features)
+
+    if n == 0:
+        raise HTTPException(400, "Input kosong")
+    if n > MAX_PREDICT_ROWS:
+        raise HTTPException(400, f"Maksimal {MAX_PREDICT_ROWS} baris per request")
+
+    model = _resolve_model(db, project_id, payload.model_id)
+    names = model.features
+
+    distance = None
+    source = "features"
+
+    if payload.features is not None:
+        missing = sorted({f for row in payload.features for f in names if f not in row})
+        if missing:
+            raise HTTPException(400, f"Feature kurang: {', '.join(missing)}")
+
+        X = np.array([[row[f] for f in names] for row in payload.features], dtype=np.float64)
+
+    else:
+        # bentuk [[lon, lat], ...] sudah divalidasi model request (422)
+        coords = np.asarray(payload.coordinates, dtype=np.float64)
+
+        if payload.scene_id:
+            X, scene = _features_from_scene(
+                db, payload.scene_id, names, coords[:, 0], coords[:, 1], payload.buffer_m
+            )
+            source = f"scene:{scene.scene_id}"
+        else:
+            X, distance = _features_from_points(
+                db, project_id, names, coords[:, 0], coords[:, 1], payload.max_distance_m
+            )
+            source = "sampling_points"
+
+    # ======================================
+    # Satu evaluasi vectorized untuk semua baris
+    # ======================================
+    valid = np.isfinite(X).all(axis=1)
+    agb = np.full(n, np.nan)
+    agb[valid] = model.predict(X[valid])
+
+    lower = upper = None
+    if model.uncertainty and model.is_linear and valid.any():
+        lower = np.full(n, np.nan)
+        upper = np.full(n, np.nan)
+        lower[valid], upper[valid] = uncertainty.prediction_interval(
+            X[valid], model.intercept, model.coefs, model.uncertainty
+        )
+
+    def _f(arr, i):
+        return float(arr[i]) if arr is not None and np.isfinite(arr[i]) else None
+
+    predictions = [
+        {
+            "agb_kg_per_m2": _f(agb, i),
+            "lower": _f(lower, i),
+            "upper": _f(upper, i),
+            "distance_m": _f(distance, i),
+        }
+        for i in range(n)
+    ]
+
+    return {
+        "project_id": project_id,
+        "model_id": model.id,
+        "features": names,
+        "source": source,
+        "level": model.uncertainty.get("level") if model.uncertainty else None,
+        "predicted": int(valid.sum()),
+        "skipped": int((~valid).sum()),
+        "predictions": predictions
     }
 
 
@@ -231,28 +530,13 @@ def generate_carbon_map(project_id: str, db: Session = Depends(get_db)):
         raise HTTPException(404, "Project tidak ditemukan")
 
     # =============================
-    # 2️ Get latest trained model
+    # 2️ Get active model (pinned or latest)
+    # GEE export: hanya model linear (ekspresi band)
     # =============================
-    model = db.execute(
-        text("""
-            SELECT id, model_type, features, params
-            FROM project_models
-            WHERE project_id = :pid
-            ORDER BY created_at DESC
-            LIMIT 1
-        """),
-        {"pid": project_id}
-    ).mappings().first()
+    model = _resolve_model(db, project_id, linear_only=True)
 
-    if not model:
-        raise HTTPException(400, "Belum ada model. Jalankan training dulu.")
-
-    if model["model_type"] != "linear_regression":
-        raise HTTPException(400, "Saat ini hanya support linear_regression")
-
-    params = model["params"]
-    intercept = float(params["intercept"])
-    coef_map = params["coefficients"]
+    intercept = model.intercept
+    coef_map = dict(zip(model.features, model.coefs.tolist()))
 
     # =============================
     # 3️ Build Earth Engine geometry
@@ -269,59 +553,29 @@ def generate_carbon_map(project_id: str, db: Session = Depends(get_db)):
     )
 
     # =============================
-    # 4️ FIX: Scale Sentinel-2 SR bands
-    # =============================
-    # Sentinel-2 SR bands are scaled by 10000
-    # Convert to reflectance 0–1 first
-
-    b2 = composite.select("B2").divide(10000)
-    b4 = composite.select("B4").divide(10000)
-    b8 = composite.select("B8").divide(10000)
-
-    # =============================
-    # 5️ Compute EVI (correct formula)
+    # 4️ Build feature image (same feature set as extraction)
     # =============================
-    evi = b8.subtract(b4).multiply(2.5).divide(
-        b8.add(b4.multiply(6))
-          .subtract(b2.multiply(7.5))
-          .add(1)
-    ).rename("EVI")
+    try:
+        names = feature_set.validate(list(coef_map.keys()))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
-    # =============================
-    # 6️ Build feature image
-    # =============================
-    feat_img = ee.Image.cat([
-        ndvi.rename("NDVI"),
-        evi,
-        b4.rename("B4"),
-        b8.rename("B8"),
-    ])
+    feat_img = feature_set.feature_image(composite, names)
 
     # =============================
-    # 7️ Carbon prediction
+    # 5️ Carbon prediction
     # =============================
-    band_lookup = {
-        "ndvi": "NDVI",
-        "evi": "EVI",
-        "b4": "B4",
-        "b8": "B8",
-    }
-
     pred = ee.Image.constant(intercept)
 
     for f, coef in coef_map.items():
-        band = band_lookup.get(f)
-        if not band:
-            raise HTTPException(400, f"Feature tidak dikenali: {f}")
-
         pred = pred.add(
-            feat_img.select(band).multiply(float(coef))
+            feat_img.select(f).multiply(float(coef))
         )
 
     pred = pred.rename("AGB_kg_m2").clip(aoi)
 
     # =============================
-    # 8️ Export to Drive
+    # 6️ Export to Drive
     # =============================
     task = ee.batch.Export.image.toDrive(
         image=pred,
@@ -336,26 +590,26 @@ def generate_carbon_map(project_id: str, db: Session = Depends(get_db)):
     task.start()
 
     # =============================
-    # 9️ Save output record
+    # 7️ Save output record
     # =============================
     out = db.execute(
         text("""
-            INSERT INTO project_outputs (project_id, output_type, gee_task_id, stats)
-            VALUES (:pid, :otype, :task_id, :stats::jsonb)
+            INSERT INTO project_outputs (project_id, output_type, gee_task_id, stats, state, updated_at)
+            VALUES (:pid, :otype, :task_id, CAST(:stats AS jsonb), 'READY', NOW())
             RETURNING id
         """),
         {
             "pid": project_id,
             "otype": "carbon_map",
             "task_id": task.id,
-            "stats": {
-                "model_id": model["id"],
+            "stats": json.dumps({
+                "model_id": model.id,
                 "year": proj["year"],
                 "months": proj["months"],
                 "cloud": proj["cloud"],
                 "export": "drive",
                 "scale": 10
-            }
+            })
         }
     ).fetchone()
 
@@ -365,5 +619,255 @@ def generate_carbon_map(project_id: str, db: Session = Depends(get_db)):
         "project_id": project_id,
         "output_id": int(out[0]),
         "gee_task_id": task.id,
+        "state": "READY",
         "message": "Export started (Drive folder: carbon_outputs)"
     }
+
+
+# ===============================
+# GENERATE CARBON MAP (LOCAL SCENE)
+# ===============================
+@router.post("/generate-local/{project_id}")
+def generate_local_carbon_map(
+    project_id: str,
+    payload: CarbonLocalMapRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Prediksi peta AGB dari scene lokal (memory-mapped), diproses per
+    window secara paralel dan ditulis ke GeoTIFF tiled. Tanpa GEE.
+    """
+    try:
+        scene = LocalScene(payload.scene_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(404, str(e))
+
+    proj = db.execute(
+        text("""
+            SELECT id, ST_AsBinary(ST_Transform(aoi, :srid)) AS aoi_wkb
+            FROM projects
+            WHERE id = :pid
+        """),
+        {"pid": project_id, "srid": scene.srid}
+    ).mappings().first()
+
+    if not proj:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    model = _resolve_model(db, project_id, payload.model_id)
+    names = model.features
+
+    # jangan tahan koneksi selama prediksi
+    db.rollback()
+
+    try:
+        path, stats = carbon_map.predict_local_map(
+            scene,
+            bytes(proj["aoi_wkb"]),
+            names,
+            model.predictor,
+            name=f"carbon_{project_id}",
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    stats["model_id"] = model.id
+
+    out = db.execute(
+        text("""
+            INSERT INTO project_outputs (project_id, output_type, uri, stats, state, updated_at)
+            VALUES (:pid, :otype, :uri, CAST(:stats AS jsonb), 'COMPLETED', NOW())
+            RETURNING id
+        """),
+        {
+            "pid": project_id,
+            "otype": "carbon_map_local",
+            "uri": str(path),
+            "stats": json.dumps(stats)
+        }
+    ).fetchone()
+
+    db.commit()
+
+    return {
+        "project_id": project_id,
+        "output_id": int(out[0]),
+        "state": "COMPLETED",
+        "uri": str(path),
+        "stats": stats
+    }
+
+
+# ===============================
+# INTERPOLATED AGB MAP (IDW / KRIGING)
+# ===============================
+@router.post("/interpolate/{project_id}")
+def interpolate_carbon_map(
+    project_id: str,
+    payload: CarbonInterpolateRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Peta AGB cepat tanpa citra: interpolasi agb_kg_per_m2 titik approved
+    ke grid AOI (CRS UTM zona AOI), plus laporan leave-one-out CV.
+    """
+    proj = db.execute(
+        text("""
+            SELECT
+                ST_X(ST_Centroid(aoi)) AS lon,
+                ST_Y(ST_Centroid(aoi)) AS lat
+            FROM projects
+            WHERE id = :pid
+        """),
+        {"pid": project_id}
+    ).mappings().first()
+
+    if not proj:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    srid = interpolation.utm_srid(proj["lon"], proj["lat"])
+
+    aoi_wkb = db.execute(
+        text("SELECT ST_AsBinary(ST_Transform(aoi, :srid)) FROM projects WHERE id = :pid"),
+        {"pid": project_id, "srid": srid}
+    ).scalar()
+
+    points = db.execute(
+        text("""
+            SELECT
+                ST_X(ST_Transform(geom, :srid)) AS x,
+                ST_Y(ST_Transform(geom, :srid)) AS y,
+                agb_kg_per_m2
+            FROM sampling_points
+            WHERE project_id = :pid
+              AND survey_status = 'approved'
+              AND agb_kg_per_m2 IS NOT NULL
+        """),
+        {"pid": project_id, "srid": srid}
+    ).fetchall()
+
+    if len(points) < 3:
+        raise HTTPException(400, f"Titik approved terlalu sedikit untuk interpolasi: {len(points)}")
+
+    xy = np.array([[p[0], p[1]] for p in points], dtype=np.float64)
+    z = np.array([p[2] for p in points], dtype=np.float64)
+
+    # jangan tahan koneksi selama interpolasi
+    db.rollback()
+
+    try:
+        interp = interpolation.Interpolator(
+            xy,
+            z,
+            method=payload.method,
+            neighbors=payload.neighbors,
+            power=payload.power,
+            variogram=payload.variogram,
+        )
+        cv = interp.cross_validate()
+        path, stats = interpolation.interpolate_to_raster(
+            interp,
+            bytes(aoi_wkb),
+            srid,
+            payload.resolution_m,
+            name=f"agb_{payload.method}_{project_id}",
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    stats.update({
+        "method": payload.method,
+        "neighbors": interp.k,
+        "power": payload.power if payload.method == "idw" else None,
+        "variogram": interp.variogram,
+        "cv": cv,
+    })
+
+    out = db.execute(
+        text("""
+            INSERT INTO project_outputs (project_id, output_type, uri, stats, state, updated_at)
+            VALUES (:pid, :otype, :uri, CAST(:stats AS jsonb), 'COMPLETED', NOW())
+            RETURNING id
+        """),
+        {
+            "pid": project_id,
+            "otype": "agb_interpolation",
+            "uri": str(path),
+            "stats": json.dumps(stats)
+        }
+    ).fetchone()
+
+    db.commit()
+
+    return {
+        "project_id": project_id,
+        "output_id": int(out[0]),
+        "state": "COMPLETED",
+        "uri": str(path),
+        "stats": stats
+    }
+
+
+# ===============================
+# OUTPUT STATUS (LONG-POLL)
+# ===============================
+@router.get("/outputs/{output_id}")
+async def get_carbon_output(
+    output_id: int,
+    wait: int = Query(0, ge=0, le=60),
+    state: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Status export. Dengan ?wait=N&state=<state terakhir>, request ditahan
+    sampai poller melihat state berubah (maks N detik), jadi client tidak
+    perlu polling GEE sendiri. Async: menunggu tidak memakai thread worker.
+    """
+    async def load():
+        return (await db.execute(
+            text("""
+                SELECT
+                    id,
+                    project_id,
+                    output_type,
+                    gee_task_id,
+                    state,
+                    uri,
+                    error_message,
+                    stats,
+                    created_at,
+                    task_started_at,
+                    task_finished_at,
+                    updated_at
+                FROM project_outputs
+                WHERE id = :id
+            """),
+            {"id": output_id}
+        )).mappings().first()
+
+    row = await load()
+
+    if not row:
+        raise HTTPException(404, "Output tidak ditemukan")
+
+    known = state or row["state"]
+    deadline = time.monotonic() + wait
+
+    while row["state"] == known and row["state"] in ACTIVE_STATES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        # jangan tahan transaksi / koneksi selama menunggu
+        await db.rollback()
+        await tracker.wait_for_change(output_id, timeout=min(remaining, OUTPUT_RECHECK_S))
+
+        row = await load()
+        if not row:
+            raise HTTPException(404, "Output tidak ditemukan")
+
+    return row
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+
+from app.db.session import (
+    async_engine, async_read_engine, read_engine, replica_guard, pool_metrics,
+    DB_POOL_TIMEOUT, DB_STATEMENT_TIMEOUT_MS
+)
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+# ===============================
+# DATABASE POOL
+# ===============================
+@router.get("/db")
+def db_pool_metrics():
+    return {
+        "pool": pool_metrics(),
+        "async_pool": pool_metrics(async_engine.sync_engine),
+        "pool_timeout_s": DB_POOL_TIMEOUT,
+        "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+        "replica": _replica_metrics(),
+    }
+
+
+def _replica_metrics():
+    if read_engine is None:
+        return {"configured": False}
+
+    return {
+        "configured": True,
+        **replica_guard.status(),
+        "pool": pool_metrics(read_engine),
+        "async_pool": pool_metrics(async_read_engine.sync_engine),
+    }
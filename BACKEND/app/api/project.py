@@ -1,28 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from geoalchemy2.shape import from_shape
 from shapely.geometry import shape
 
-from app.db.session import SessionLocal
+from app.db.session import get_db, get_read_db, get_async_read_db, read_session_factory
 from app.models.project import Project
 
 from shapely.geometry import Polygon, MultiPolygon
 
 from app.services.auth import require_admin
+from app.services import archive, carbon_rollup, export, project_deletion, serialize
 
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # # ================= CREATE PROJECT =================
 # @router.post("/")
 # def create_project(payload: dict, db: Session = Depends(get_db)):
@@ -102,44 +97,145 @@ def create_project(payload: dict, db: Session = Depends(get_db), user = Depends(
     }
 
 # ================= LIST PROJECTS =================
+# Kolom yang bisa dipilih lewat ?fields=. aoi hanya dikirim bila diminta
+# (versi sederhana sesuai ?simplify=); AOI penuh lewat /{id}/aoi.
+# Geometri diambil sebagai teks GeoJSON dan dikirim tanpa parse ulang.
+PROJECT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "year": "year",
+    "months": "months",
+    "cloud": "cloud",
+    "status": "status",
+    "created_at": "created_at",
+    "bbox": "ARRAY[ST_XMin(bbox), ST_YMin(bbox), ST_XMax(bbox), ST_YMax(bbox)]",
+    "center": "ST_AsGeoJSON(centroid)",
+}
+
+GEOJSON_FIELDS = {"aoi", "center"}
+
+DEFAULT_PROJECT_FIELDS = ["id", "name", "year", "status", "created_at", "bbox", "center"]
+
+AOI_COLUMNS = {
+    "low": "aoi_simple_low",
+    "mid": "aoi_simple_mid",
+    "full": "aoi",
+}
+
+
 @router.get("/")
-def list_projects(db: Session = Depends(get_db)):
-    rows = db.execute(
-        text("""
+async def list_projects(
+    fields: str | None = Query(None, description="comma separated, e.g. id,name,bbox,aoi"),
+    simplify: str = Query("low", pattern="^(low|mid|full)$"),
+    limit: int | None = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    names = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_PROJECT_FIELDS
+
+    unknown = [f for f in names if f not in PROJECT_FIELDS and f != "aoi"]
+    if unknown:
+        raise HTTPException(400, f"Field tidak dikenali: {', '.join(unknown)}")
+
+    columns = []
+    for f in names:
+        if f == "aoi":
+            columns.append(f"ST_AsGeoJSON({AOI_COLUMNS[simplify]}) AS aoi")
+        else:
+            columns.append(f"{PROJECT_FIELDS[f]} AS {f}")
+
+    params = {"offset": offset}
+    if limit:
+        params["limit"] = limit
+
+    rows = (await db.execute(
+        text(f"""
+            SELECT
+              {", ".join(columns)},
+              COUNT(*) OVER () AS _total
+            FROM projects
+            WHERE status IS DISTINCT FROM 'deleting'
+            ORDER BY created_at DESC
+            {"LIMIT :limit" if limit else ""}
+            OFFSET :offset
+        """),
+        params
+    )).all()
+
+    # _total kolom terakhir
+    return serialize.json_response(
+        serialize.records([r[:-1] for r in rows], names, GEOJSON_FIELDS),
+        headers={"X-Total-Count": str(rows[0][-1] if rows else 0)}
+    )
+
+
+# ================= PROJECT AOI (FULL) =================
+@router.get("/{project_id}/aoi")
+def get_project_aoi(
+    project_id: str,
+    simplify: str = Query("full", pattern="^(low|mid|full)$"),
+    db: Session = Depends(get_db)
+):
+    row = db.execute(
+        text(f"""
             SELECT
               id,
-              name,
-              year,
-              status,
-              created_at,
-              ST_AsGeoJSON(aoi)::json AS aoi,
-              ST_AsGeoJSON(ST_PointOnSurface(aoi))::json AS center
+              ST_AsGeoJSON({AOI_COLUMNS[simplify]}) AS aoi,
+              {PROJECT_FIELDS["bbox"]} AS bbox,
+              {PROJECT_FIELDS["center"]} AS center
             FROM projects
-            ORDER BY created_at DESC;
-        """)
-    ).mappings().all()
+            WHERE id = :id
+        """),
+        {"id": project_id}
+    ).first()
 
-    return rows
+    if not row:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    return serialize.json_response(serialize.dumps({
+        "id": row.id,
+        "aoi": serialize.raw(row.aoi),
+        "bbox": row.bbox,
+        "center": serialize.raw(row.center),
+    }))
 
 
 # ================= DELETE PROJECT =================
-@router.delete("/{project_id}")
-def delete_project(project_id: str, db: Session = Depends(get_db)):
-    res = db.execute(
-        text("DELETE FROM projects WHERE id = :id RETURNING id"),
-        {"id": project_id},
-    ).fetchone()
-
-    if not res:
+# Penghapusan berjalan di background (batch per tabel); progress lewat
+# GET /{id}/deletion.
+@router.delete("/{project_id}", status_code=202)
+def delete_project(
+    project_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    deletion = project_deletion.start(db, project_id)
+
+    if not deletion:
         raise HTTPException(404, "Project tidak ditemukan")
 
-    db.commit()
-    return {"deleted": project_id}
+    background_tasks.add_task(project_deletion.run, project_id)
+
+    return {
+        "project_id": project_id,
+        "status": "deleting",
+        "deletion": deletion,
+    }
+
+
+@router.get("/{project_id}/deletion")
+def project_deletion_status(project_id: str, db: Session = Depends(get_db)):
+    row = project_deletion.progress(db, project_id)
+
+    if not row:
+        raise HTTPException(404, "Tidak ada proses penghapusan untuk project ini")
+
+    return row
 
 
 # ================= FEATURE REPORT =================
 @router.get("/{project_id}/feature-report")
-def feature_report(project_id: str, db: Session = Depends(get_db)):
+def feature_report(project_id: str, db: Session = Depends(get_read_db)):
 
     rows = db.execute(
         text("""
@@ -201,3 +297,218 @@ def feature_report(project_id: str, db: Session = Depends(get_db)):
     ).mappings().all()
 
     return rows
+
+
+# ================= FEATURE REPORT EXPORT (STREAMING) =================
+@router.get("/{project_id}/feature-report/export")
+def export_feature_report(
+    project_id: str,
+    format: str = Query("csv", pattern="^(csv|parquet|geojsonseq)$"),
+    dataset: str = Query("points", pattern="^(points|surveys)$"),
+    columns: str | None = Query(None, description="comma separated"),
+    approved_only: bool = True,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Export feature report dengan memori terbatas (server-side cursor).
+    dataset=points: satu baris per titik; dataset=surveys: detail pohon.
+    """
+    exists = db.execute(
+        text("SELECT 1 FROM projects WHERE id = :id"),
+        {"id": project_id}
+    ).scalar()
+
+    if not exists:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    if dataset == "points":
+        spec, default, build = export.POINT_COLUMNS, export.DEFAULT_POINT_COLUMNS, export.feature_report_sql
+    else:
+        spec, default, build = export.SURVEY_COLUMNS, export.DEFAULT_SURVEY_COLUMNS, export.survey_detail_sql
+
+    try:
+        names = export.select_columns(spec, columns, default)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    # geometri GeoJSON selalu butuh koordinat
+    query_names = list(names)
+    if format == "geojsonseq":
+        query_names += [c for c in ("longitude", "latitude") if c not in query_names]
+
+    types = {c: spec[c][1] for c in names}
+    batches = export.stream_batches(
+        build(query_names, approved_only=approved_only),
+        {"project_id": project_id},
+        session_factory=read_session_factory()
+    )
+
+    media_type, ext = export.FORMATS[format]
+
+    return StreamingResponse(
+        export.render(format, names, types, batches),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=feature_report_{dataset}_{project_id}.{ext}"
+        }
+    )
+
+
+# ================= PROJECT ARCHIVE =================
+@router.get("/{project_id}/archive")
+def project_archive(project_id: str, db: Session = Depends(get_db)):
+    """
+    Satu zip berisi AOI, titik, survey, spesies, model dan foto project,
+    di-stream tanpa menampung seluruh isi di memori.
+    """
+    exists = db.execute(
+        text("SELECT 1 FROM projects WHERE id = :id"),
+        {"id": project_id}
+    ).scalar()
+
+    if not exists:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    return StreamingResponse(
+        archive.archive_stream(project_id),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=project_{project_id}.zip"
+        }
+    )
+
+
+# ================= DASHBOARD SUMMARY =================
+SUMMARY_SQL = """
+    WITH pts AS (
+        SELECT
+            sp.id,
+            sp.status::text AS status,
+            sp.survey_status::text AS survey_status,
+            sp.approval_status::text AS approval_status,
+            (f.sampling_point_id IS NOT NULL) AS extracted
+        FROM sampling_points sp
+        LEFT JOIN sampling_point_features f
+          ON f.sampling_point_id = sp.id
+        WHERE sp.project_id = :pid
+    ),
+    -- satu scan untuk ketiga dimensi + total
+    grouped AS (
+        SELECT
+            GROUPING(status, survey_status, approval_status) AS g,
+            status,
+            survey_status,
+            approval_status,
+            COUNT(*) AS n,
+            COUNT(*) FILTER (WHERE extracted) AS extracted,
+            COUNT(*) FILTER (WHERE survey_status = 'approved') AS approved,
+            COUNT(*) FILTER (WHERE extracted AND survey_status = 'approved') AS approved_extracted
+        FROM pts
+        GROUP BY GROUPING SETS ((status), (survey_status), (approval_status), ())
+    ),
+    trees AS (
+        SELECT
+            COUNT(*) AS trees,
+            COALESCE(SUM(s.biomass), 0) AS biomass,
+            COUNT(DISTINCT s.surveyor_id) AS active_surveyors
+        FROM surveys s
+        JOIN sampling_points sp ON sp.id = s.sampling_point_id
+        WHERE sp.project_id = :pid
+    ),
+    assigned AS (
+        SELECT COUNT(DISTINCT sa.surveyor_id) AS surveyors
+        FROM sampling_assignments sa
+        JOIN sampling_points sp ON sp.id = sa.sampling_point_id
+        WHERE sp.project_id = :pid
+    ),
+    model AS (
+        SELECT id, model_type, features, r_squared, rmse, is_active, created_at
+        FROM project_models
+        WHERE project_id = :pid
+        ORDER BY is_active DESC, created_at DESC
+        LIMIT 1
+    )
+    SELECT
+        p.id,
+        p.name,
+        p.year,
+        p.status,
+
+        (SELECT n FROM grouped WHERE g = 7) AS total_points,
+
+        (SELECT COALESCE(jsonb_object_agg(COALESCE(status, 'unknown'), n), '{}')
+           FROM grouped WHERE g = 3) AS by_status,
+        (SELECT COALESCE(jsonb_object_agg(COALESCE(survey_status, 'unknown'), n), '{}')
+           FROM grouped WHERE g = 5) AS by_survey_status,
+        (SELECT COALESCE(jsonb_object_agg(COALESCE(approval_status, 'unknown'), n), '{}')
+           FROM grouped WHERE g = 6) AS by_approval_status,
+
+        (SELECT jsonb_build_object(
+            'extracted_points', extracted,
+            'approved_points', approved,
+            'approved_extracted', approved_extracted,
+            'approved_coverage',
+                CASE WHEN approved > 0 THEN approved_extracted::float / approved END
+         ) FROM grouped WHERE g = 7) AS extraction,
+
+        a.surveyors AS assigned_surveyors,
+        t.active_surveyors,
+        t.trees AS trees_measured,
+        t.biomass AS total_biomass,
+
+        (SELECT to_jsonb(m) FROM model m) AS latest_model
+
+    FROM projects p
+    CROSS JOIN trees t
+    CROSS JOIN assigned a
+    WHERE p.id = :pid
+"""
+
+
+@router.get("/{project_id}/summary")
+def project_summary(project_id: str, db: Session = Depends(get_db)):
+    """
+    Ringkasan dashboard dalam satu query: jumlah titik per status,
+    surveyor, pohon, biomassa, cakupan ekstraksi dan model terakhir.
+    """
+    row = db.execute(
+        text(SUMMARY_SQL),
+        {"pid": project_id}
+    ).mappings().first()
+
+    if not row:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    return row
+
+
+# ================= CARBON SUMMARY =================
+@router.get("/{project_id}/carbon-summary")
+def carbon_summary(project_id: str, db: Session = Depends(get_db)):
+    """
+    Total AGB, karbon (0.47 x AGB) dan CO2e (44/12 x C) per status,
+    spesies dan sub-area 1 km, dibaca dari tabel rollup.
+    """
+    exists = db.execute(
+        text("SELECT 1 FROM projects WHERE id = :id"),
+        {"id": project_id}
+    ).scalar()
+
+    if not exists:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    result = carbon_rollup.summary(db, project_id)
+
+    # rollup belum pernah dibangun untuk project ini
+    if result is None:
+        carbon_rollup.refresh_project(db, project_id)
+        db.commit()
+        result = carbon_rollup.summary(db, project_id)
+
+    return {
+        "project_id": project_id,
+        "carbon_fraction": carbon_rollup.CARBON_FRACTION,
+        "co2e_per_c": carbon_rollup.CO2E_PER_C,
+        "cell_size_m": carbon_rollup.CELL_SIZE_M,
+        **result
+    }
@@ -1,28 +1,20 @@
 import io
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
 from openpyxl import Workbook
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.db.session import SessionLocal
+from app.db.session import get_db, get_async_read_db, get_read_db
+from app.services import model_stats, carbon_rollup, bulk_import, serialize, project_deletion
+from app.services.auth import require_admin
 from datetime import date
 import traceback
 
 router = APIRouter(prefix="/sampling", tags=["Sampling"])
 
 
-# ===============================
-# DATABASE DEPENDENCY
-# ===============================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ===============================
 # GENERATE GRID SAMPLING
 # ===============================
@@ -113,14 +105,14 @@ def generate_sampling(
     if spacing_m < 10:
         raise HTTPException(400, "spacing terlalu kecil")
 
-    project = db.execute(
-        text("SELECT id FROM projects WHERE id = :id"),
-        {"id": project_id},
-    ).first()
+    status = project_deletion.lock_project(db, project_id)
 
-    if not project:
+    if status is None:
         raise HTTPException(404, "Project tidak ditemukan")
 
+    if status == "deleting":
+        raise HTTPException(400, "Project sedang dihapus")
+
     # delete old points
     db.execute(
         text("""
@@ -132,22 +124,17 @@ def generate_sampling(
     )
 
     # insert new points
-    db.execute(
+    new_ids = db.execute(
         text("""
-        WITH proj AS (
-            SELECT id, ST_Transform(aoi, 3857) AS geom
-            FROM projects
-            WHERE id = :pid
-        ),
-        bounds AS (
+        WITH bounds AS (
             SELECT
                 id,
-                geom,
-                ST_XMin(geom) AS xmin,
-                ST_XMax(geom) AS xmax,
-                ST_YMin(geom) AS ymin,
-                ST_YMax(geom) AS ymax
-            FROM proj
+                ST_XMin(aoi_3857) AS xmin,
+                ST_XMax(aoi_3857) AS xmax,
+                ST_YMin(aoi_3857) AS ymin,
+                ST_YMax(aoi_3857) AS ymax
+            FROM projects
+            WHERE id = :pid
         ),
         grid AS (
             SELECT
@@ -160,8 +147,7 @@ def generate_sampling(
                         ymin + (j+1) * :spacing,
                         3857
                     )
-                ) AS pt_3857,
-                b.geom
+                ) AS pt_3857
             FROM bounds b,
             generate_series(0, CEIL((xmax - xmin)/:spacing)::int) AS i,
             generate_series(0, CEIL((ymax - ymin)/:spacing)::int) AS j
@@ -180,13 +166,24 @@ def generate_sampling(
             ST_X(ST_Transform(pt_3857, 4326)),
             'open'
         FROM grid
-        WHERE ST_Intersects(geom, pt_3857);
+        -- subdivided AOI (GiST), bukan ST_Transform(aoi) per titik
+        WHERE EXISTS (
+            SELECT 1
+            FROM project_aoi_parts pa
+            WHERE pa.project_id = grid.id
+              AND ST_Intersects(pa.geom, grid.pt_3857)
+        )
+        RETURNING id;
         """),
         {
             "pid": project_id,
             "spacing": spacing_m,
         },
-    )
+    ).scalars().all()
+
+    # titik open lama terhapus (cascade) -> group ulang, lalu titik baru
+    carbon_rollup.refresh_points(db, project_id, [])
+    carbon_rollup.refresh_points(db, project_id, new_ids)
 
     db.commit()
 
@@ -209,117 +206,103 @@ def generate_sampling(
 # ===============================
 # LIST SAMPLING POINTS (WITH LAT/LNG)
 # ===============================
-@router.get("/points/{project_id}")
-def list_sampling_points(project_id: str, db: Session = Depends(get_db)):
-
-    rows = db.execute(
-        text("""
-            SELECT
-              sp.id,
-              sp.status,
-              sp.survey_status,
-              sp.start_date,
-              sp.end_date,
-              sp.description,
-              sp.max_surveyors,
-              sp.created_at,
-              sp.submitted_at,
-
-              sp.ndvi,
-              sp.sentinel_date,
-              sp.sentinel_cloud,
-
-              ST_AsGeoJSON(sp.geom)::json AS geometry,
-              ST_Y(sp.geom) AS latitude,
-              ST_X(sp.geom) AS longitude,
-
-              COUNT(DISTINCT sa.surveyor_id) AS assigned_count,
-
-              COALESCE(
-                ARRAY_AGG(DISTINCT u.id) FILTER (WHERE u.id IS NOT NULL),
-                '{}'
-              ) AS assigned_ids,
-
-              COALESCE(
-                ARRAY_AGG(DISTINCT u.name) FILTER (WHERE u.name IS NOT NULL),
-                '{}'
-              ) AS assigned_names,
-
-              COALESCE(b.total_biomass, 0) AS total_biomass
-
-            FROM sampling_points sp
+POINT_PROPERTIES = [
+    "id",
+    "status",
+    "survey_status",
+    "assigned_count",
+    "max_surveyors",
+    "assigned_ids",
+    "assigned_names",
+    "latitude",
+    "longitude",
+    "total_biomass",
+    "start_date",
+    "end_date",
+    "created_at",
+    "submitted_at",
+    "ndvi",
+    "sentinel_date",
+    "sentinel_cloud",
+]
+
+# urutan kolom = (geometry, *POINT_PROPERTIES); nilai sudah bertipe
+# JSON dari SQL, baris langsung diserialisasi tanpa konversi per field
+POINTS_SQL = """
+    SELECT
+      ST_AsGeoJSON(sp.geom) AS geometry,
+
+      sp.id,
+      sp.status,
+      sp.survey_status,
+
+      COUNT(DISTINCT sa.surveyor_id) AS assigned_count,
+      sp.max_surveyors,
+
+      COALESCE(
+        ARRAY_AGG(DISTINCT u.id) FILTER (WHERE u.id IS NOT NULL),
+        '{}'
+      ) AS assigned_ids,
+
+      COALESCE(
+        ARRAY_AGG(DISTINCT u.name) FILTER (WHERE u.name IS NOT NULL),
+        '{}'
+      ) AS assigned_names,
+
+      ST_Y(sp.geom) AS latitude,
+      ST_X(sp.geom) AS longitude,
+      COALESCE(b.total_biomass, 0)::float8 AS total_biomass,
+
+      sp.start_date,
+      sp.end_date,
+      sp.created_at,
+      sp.submitted_at,
+
+      sp.ndvi,
+      sp.sentinel_date,
+      sp.sentinel_cloud
+
+    FROM sampling_points sp
+
+    LEFT JOIN sampling_assignments sa
+      ON sa.sampling_point_id = sp.id
+
+    LEFT JOIN users u
+      ON u.id = sa.surveyor_id
+
+    LEFT JOIN (
+        SELECT
+            s.sampling_point_id,
+            SUM(s.biomass) AS total_biomass
+        FROM surveys s
+        JOIN sampling_points p
+          ON p.id = s.sampling_point_id
+        WHERE p.project_id = :pid
+        GROUP BY s.sampling_point_id
+    ) b
+      ON b.sampling_point_id = sp.id
 
-            LEFT JOIN sampling_assignments sa
-              ON sa.sampling_point_id = sp.id
+    WHERE sp.project_id = :pid
 
-            LEFT JOIN users u
-              ON u.id = sa.surveyor_id
+    GROUP BY
+      sp.id,
+      b.total_biomass
 
-            LEFT JOIN (
-                SELECT
-                    sampling_point_id,
-                    SUM(biomass) AS total_biomass
-                FROM surveys
-                GROUP BY sampling_point_id
-            ) b
-              ON b.sampling_point_id = sp.id
+    ORDER BY sp.id ASC;
+"""
 
-            WHERE sp.project_id = :pid
 
-            GROUP BY
-              sp.id,
-              sp.status,
-              sp.survey_status,
-              sp.start_date,
-              sp.end_date,
-              sp.description,
-              sp.max_surveyors,
-              sp.created_at,
-              sp.submitted_at,
-              sp.ndvi,
-              sp.sentinel_date,
-              sp.sentinel_cloud,
-              sp.geom,
-              b.total_biomass
+@router.get("/points/{project_id}")
+async def list_sampling_points(project_id: str, db: AsyncSession = Depends(get_async_read_db)):
 
-            ORDER BY sp.id ASC;
-        """),
+    rows = (await db.execute(
+        text(POINTS_SQL),
         {"pid": project_id}
-    ).mappings().all()
-
-    features = []
-
-    for r in rows:
-        features.append({
-            "type": "Feature",
-            "geometry": r["geometry"],
-            "properties": {
-                "id": r["id"],
-                "status": r["status"],
-                "survey_status": r["survey_status"],
-                "assigned_count": int(r["assigned_count"]),
-                "max_surveyors": r["max_surveyors"],
-                "assigned_ids": r["assigned_ids"],
-                "assigned_names": r["assigned_names"],
-                "latitude": float(r["latitude"]),
-                "longitude": float(r["longitude"]),
-                "total_biomass": float(r["total_biomass"] or 0),
-
-                "start_date": str(r["start_date"]) if r["start_date"] else None,
-                "end_date": str(r["end_date"]) if r["end_date"] else None,
-                "created_at": r["created_at"].isoformat() if r["created_at"] else None,
-                "submitted_at": r["submitted_at"].isoformat() if r["submitted_at"] else None,
-
-                "ndvi": float(r["ndvi"]) if r["ndvi"] is not None else None,
-                "sentinel_date": str(r["sentinel_date"]) if r["sentinel_date"] else None,
-                "sentinel_cloud": r["sentinel_cloud"]
-            }
-        })
+    )).all()
 
-    return {
-        "type": "FeatureCollection",
-        "features": features
-    }
+    return serialize.json_response(
+        serialize.feature_collection(rows, POINT_PROPERTIES)
+    )
 
 
 # ===============================
@@ -346,13 +329,17 @@ def move_sampling_point(
           )
           WHERE id = :id
             AND status = 'open'
+          RETURNING project_id
         """),
         {"id": point_id, "lat": lat, "lng": lng}
-    )
+    ).fetchone()
 
-    if result.rowcount == 0:
+    if not result:
         raise HTTPException(400, "Titik tidak bisa dipindahkan")
 
+    # sub-area (grid cell) titik bisa berubah
+    carbon_rollup.refresh_points(db, result[0], [point_id])
+
     db.commit()
 
     return {"status": "moved"}
@@ -373,22 +360,25 @@ def add_manual_sampling_point(
     if lat is None or lng is None:
         raise HTTPException(400, "lat dan lng wajib diisi")
 
-    project = db.execute(
-        text("SELECT id FROM projects WHERE id = :id"),
-        {"id": project_id},
-    ).first()
+    status = project_deletion.lock_project(db, project_id)
 
-    if not project:
+    if status is None:
         raise HTTPException(404, "Project tidak ditemukan")
 
+    if status == "deleting":
+        raise HTTPException(400, "Project sedang dihapus")
+
     inside = db.execute(
         text("""
-          SELECT ST_Contains(
-            p.aoi,
-            ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)
+          SELECT EXISTS (
+            SELECT 1
+            FROM project_aoi_parts pa
+            WHERE pa.project_id = :pid
+              AND ST_Intersects(
+                pa.geom,
+                ST_Transform(ST_SetSRID(ST_MakePoint(:lng, :lat), 4326), 3857)
+              )
           )
-          FROM projects p
-          WHERE p.id = :pid
         """),
         {"pid": project_id, "lat": lat, "lng": lng},
     ).scalar()
@@ -401,10 +391,12 @@ def add_manual_sampling_point(
 
     row = db.execute(
         text("""
-          INSERT INTO sampling_points (project_id, geom, status)
+          INSERT INTO sampling_points (project_id, geom, latitude, longitude, status)
           VALUES (
             :pid,
             ST_SetSRID(ST_MakePoint(:lng, :lat), 4326),
+            :lat,
+            :lng,
             'open'
           )
           RETURNING id;
@@ -412,6 +404,8 @@ def add_manual_sampling_point(
         {"pid": project_id, "lat": lat, "lng": lng},
     ).fetchone()
 
+    carbon_rollup.refresh_points(db, project_id, [row[0]])
+
     db.commit()
 
     return {
@@ -423,6 +417,44 @@ def add_manual_sampling_point(
     }
 
 
+# ===============================
+# BULK IMPORT (CSV / XLSX / GEOJSON)
+# ===============================
+@router.post("/import/{project_id}")
+def import_sampling_data(
+    project_id: str,
+    file: UploadFile = File(...),
+    format: str | None = Query(None, pattern="^(csv|xlsx|geojson)$"),
+    dry_run: bool = Query(False, description="validasi saja, tanpa menulis"),
+    db: Session = Depends(get_db),
+    user = Depends(require_admin),
+):
+    try:
+        fmt = format or bulk_import.detect_format(file.filename)
+        importer = bulk_import.Importer.for_project(db, project_id, user["sub"], dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    if not importer:
+        raise HTTPException(404, "Project tidak ditemukan")
+
+    try:
+        result = bulk_import.run_import(importer, file.file, fmt)
+    except (ValueError, KeyError) as e:
+        db.rollback()
+        raise HTTPException(400, f"File tidak bisa dibaca: {e}")
+
+    if dry_run:
+        db.rollback()
+        return result
+
+    if importer.touched:
+        carbon_rollup.refresh_points(db, project_id, importer.touched)
+
+    db.commit()
+    return result
+
+
 # ===============================
 # LOCK / UNLOCK
 # ===============================
@@ -469,19 +501,35 @@ def unlock_sampling_point(point_id: int, db: Session = Depends(get_db)):
 # ===============================
 @router.delete("/{point_id}")
 def delete_sampling_point(point_id: int, db: Session = Depends(get_db)):
-    result = db.execute(
+    point = db.execute(
         text("""
-          DELETE FROM sampling_points
+          SELECT project_id, status, survey_status::text AS survey_status
+          FROM sampling_points
           WHERE id = :id
-          AND status = 'open'
-          RETURNING id
+          FOR UPDATE
         """),
         {"id": point_id}
-    ).fetchone()
+    ).mappings().first()
 
-    if not result:
+    if not point or point["status"] != "open":
         raise HTTPException(400, "Titik terkunci / tidak ditemukan")
 
+    # titik approved dipakai training model, tidak boleh dihapus
+    if point["survey_status"] in ("submitted", "approved"):
+        raise HTTPException(400, "Survey sudah disubmit / approved")
+
+    stats_before = model_stats.snapshot(db, point["project_id"], [point_id])
+
+    db.execute(
+        text("DELETE FROM sampling_points WHERE id = :id"),
+        {"id": point_id}
+    )
+
+    model_stats.apply(db, stats_before)
+
+    # kontribusi titik ikut terhapus (cascade), rollup di-group ulang
+    carbon_rollup.refresh_points(db, point["project_id"], [])
+
     db.commit()
     return {"deleted": point_id}
 
@@ -513,6 +561,9 @@ def delete_sampling_by_project(
         {"pid": project_id}
     ).fetchall()
 
+    if result:
+        carbon_rollup.refresh_points(db, project_id, [])
+
     db.commit()
 
     return {
@@ -549,20 +600,15 @@ def preview_sampling_points(
     # """)
 
     sql = text("""
-        WITH proj AS (
-            SELECT ST_Transform(aoi, 3857) AS geom
+        WITH bounds AS (
+            SELECT
+                ST_XMin(aoi_3857) AS xmin,
+                ST_XMax(aoi_3857) AS xmax,
+                ST_YMin(aoi_3857) AS ymin,
+                ST_YMax(aoi_3857) AS ymax
             FROM projects
             WHERE id = :project_id
         ),
-        bounds AS (
-            SELECT
-                ST_XMin(geom) AS xmin,
-                ST_XMax(geom) AS xmax,
-                ST_YMin(geom) AS ymin,
-                ST_YMax(geom) AS ymax,
-                geom
-            FROM proj
-        ),
         grid AS (
             SELECT
                 ST_Centroid(
@@ -573,8 +619,7 @@ def preview_sampling_points(
                         ymin + (j+1) * :spacing,
                         3857
                     )
-                ) AS pt,
-                geom
+                ) AS pt
             FROM bounds,
             generate_series(
                 0,
@@ -585,9 +630,15 @@ def preview_sampling_points(
                 CEIL((ymax - ymin)/:spacing)::int
             ) AS j
         )
-        SELECT COUNT(*) AS count 
+        -- predikat sama dengan /generate supaya jumlahnya cocok
+        SELECT COUNT(*) AS count
         FROM grid
-        WHERE ST_Contains(geom, pt);
+        WHERE EXISTS (
+            SELECT 1
+            FROM project_aoi_parts pa
+            WHERE pa.project_id = :project_id
+              AND ST_Intersects(pa.geom, grid.pt)
+        );
     """)
 
     count = db.execute(sql, {
@@ -608,7 +659,7 @@ def setup_survey_point(
     db: Session = Depends(get_db)
 ):
 
-    db.execute(
+    result = db.execute(
         text("""
             UPDATE sampling_points
             SET
@@ -619,6 +670,7 @@ def setup_survey_point(
                 plot_radius_m = :plot_radius_m,
                 survey_status = 'ready'
             WHERE id = :id
+            RETURNING project_id
         """),
         {
             "id": point_id,
@@ -628,13 +680,31 @@ def setup_survey_point(
             "max_surveyors": payload.get("max_surveyors", 5),
             "plot_radius_m": payload.get("plot_radius_m", 10)  # 🔥 NEW
         }
-    )
+    ).fetchone()
+
+    if result:
+        carbon_rollup.refresh_points(db, result[0], [point_id])
 
     db.commit()
 
     return {"status": "ready"}
 
 
+ASSIGNMENT_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM sampling_assignments
+    WHERE sampling_point_id = :pid
+"""
+
+
+ASSIGNMENT_CHECK_SQL = """
+    SELECT 1
+    FROM sampling_assignments
+    WHERE sampling_point_id = :pid
+      AND surveyor_id = :sid
+"""
+
+
 @router.post("/assign/{point_id}")
 def assign_surveyor(
     point_id: int,
@@ -699,12 +769,8 @@ def assign_surveyor(
     # CHECK QUOTA
     # ===============================
     current_count = db.execute(
-        text("""
-        SELECT COUNT(*)
-        FROM sampling_assignments
-        WHERE sampling_point_id = :id
-        """),
-        {"id": point_id}
+        text(ASSIGNMENT_COUNT_SQL),
+        {"pid": point_id}
     ).scalar()
 
     if current_count >= point["max_surveyors"]:
@@ -734,14 +800,17 @@ def assign_surveyor(
     else:
         new_status = "ready"
 
-    db.execute(
+    project_id = db.execute(
         text("""
         UPDATE sampling_points
         SET survey_status = :status
         WHERE id = :pid
+        RETURNING project_id
         """),
         {"pid": point_id, "status": new_status}
-    )
+    ).scalar()
+
+    carbon_rollup.refresh_points(db, project_id, [point_id])
 
     db.commit()
 
@@ -790,11 +859,7 @@ def remove_surveyor(
 
     # hitung ulang jumlah surveyor
     count = db.execute(
-        text("""
-        SELECT COUNT(*)
-        FROM sampling_assignments
-        WHERE sampling_point_id = :pid
-        """),
+        text(ASSIGNMENT_COUNT_SQL),
         {"pid": point_id}
     ).scalar()
 
@@ -806,14 +871,17 @@ def remove_surveyor(
     else:
         new_status = "active"
 
-    db.execute(
+    project_id = db.execute(
         text("""
         UPDATE sampling_points
         SET survey_status = :status
         WHERE id = :pid
+        RETURNING project_id
         """),
         {"pid": point_id, "status": new_status}
-    )
+    ).scalar()
+
+    carbon_rollup.refresh_points(db, project_id, [point_id])
 
     db.commit()
 
@@ -854,7 +922,7 @@ def submit_sampling_point(
     # cek point
     point = db.execute(
         text("""
-            SELECT survey_status, approval_status
+            SELECT project_id, survey_status, approval_status
             FROM sampling_points
             WHERE id = :pid
         """),
@@ -872,12 +940,7 @@ def submit_sampling_point(
 
     # cek surveyor sudah join
     joined = db.execute(
-        text("""
-            SELECT 1
-            FROM sampling_assignments
-            WHERE sampling_point_id = :pid
-              AND surveyor_id = :sid
-        """),
+        text(ASSIGNMENT_CHECK_SQL),
         {"pid": point_id, "sid": surveyor_id}
     ).scalar()
 
@@ -913,6 +976,8 @@ def submit_sampling_point(
         {"pid": point_id}
     )
 
+    carbon_rollup.refresh_points(db, point["project_id"], [point_id])
+
     db.commit()
 
     return {
@@ -997,7 +1062,7 @@ def review_sampling_point(
 
     point = db.execute(
         text("""
-            SELECT survey_status, plot_radius_m
+            SELECT project_id, survey_status, plot_radius_m
             FROM sampling_points
             WHERE id = :pid
         """),
@@ -1010,6 +1075,9 @@ def review_sampling_point(
     if point["survey_status"] != "submitted":
         raise HTTPException(400, "Point belum disubmit")
 
+    # model training stats follow the review result
+    stats_before = model_stats.snapshot(db, point["project_id"], [point_id])
+
     # ===============================
     # APPROVE
     # ===============================
@@ -1081,13 +1149,16 @@ def review_sampling_point(
             {"pid": point_id}
         )
 
+    model_stats.apply(db, stats_before)
+    carbon_rollup.refresh_points(db, point["project_id"], [point_id])
+
     db.commit()
 
     return {"status": action}
 
 
 @router.get("/export/{project_id}")
-def export_sampling(project_id: str, db: Session = Depends(get_db)):
+def export_sampling(project_id: str, db: Session = Depends(get_read_db)):
 
     rows = db.execute(
         text("""
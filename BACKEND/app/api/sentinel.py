@@ -1,34 +1,28 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.db.session import SessionLocal
+from app.db.session import get_db
 
 from app.models.sentinel import (
     SentinelPreviewRequest,
     SentinelAvailabilityRequest,
     SentinelExtractRequest,
-    SentinelClosestRequest
+    SentinelClosestRequest,
+    SentinelLocalExtractRequest,
+    SentinelCatalogHarvestRequest
 )
 
 from app.services.gee import get_sentinel_composite
+from app.services.raster import LocalScene
+from app.services import scene_catalog, features, model_stats
 
 import ee
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import date, datetime, timedelta
 
 router = APIRouter(prefix="/sentinel", tags=["Sentinel"])
 
 
-# ===============================
-# DATABASE DEPENDENCY
-# ===============================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ===============================
 # AVAILABILITY YEAR
 # ===============================
@@ -124,8 +118,12 @@ def preview_sentinel(payload: SentinelPreviewRequest):
 
 
 # ===============================
-# EXTRACT NDVI TO SAMPLING POINTS
+# EXTRACT FEATURES TO SAMPLING POINTS
 # ===============================
+# Batas elemen per getInfo di GEE
+EXTRACT_CHUNK = 5000
+
+
 @router.post("/extract/{project_id}")
 def extract_sentinel(
     project_id: str,
@@ -138,6 +136,11 @@ def extract_sentinel(
         end_date = payload.end_date
         cloud = payload.cloud
 
+        try:
+            names = features.validate(payload.features or features.FEATURE_SET)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+
         # ======================================
         # 1️ Load selected Sentinel image
         # ======================================
@@ -148,6 +151,9 @@ def extract_sentinel(
                       .format("YYYY-MM-dd") \
                       .getInfo()
 
+        # All requested bands + indices in one image
+        feat_img = features.feature_image(image, names)
+
         # ======================================
         # 2️ Get approved points in date range
         # ======================================
@@ -171,60 +177,54 @@ def extract_sentinel(
         if not points:
             raise HTTPException(404, "No approved points in date range")
 
-        processed = 0
+        ids = []
+        rows = []
 
         # ======================================
-        # 3️ Extract for each point
+        # 3️ One reduceRegions per chunk of points
         # ======================================
-        for p in points:
-
-            point_geom = ee.Geometry.Point([p["lon"], p["lat"]])
-
-            stats = image.select(["B4", "B8"]).reduceRegion(
+        for i in range(0, len(points), EXTRACT_CHUNK):
+            chunk = points[i:i + EXTRACT_CHUNK]
+
+            fc = ee.FeatureCollection([
+                ee.Feature(
+                    ee.Geometry.Point([p["lon"], p["lat"]]).buffer(10),
+                    {"point_id": p["id"]}
+                )
+                for p in chunk
+            ])
+
+            result = feat_img.reduceRegions(
+                collection=fc,
                 reducer=ee.Reducer.mean(),
-                geometry=point_geom.buffer(10),
-                scale=10,
-                maxPixels=1e9
+                scale=10
             ).getInfo()
 
-            if not stats:
-                continue
-
-            b4 = stats.get("B4")
-            b8 = stats.get("B8")
-
-            if b4 is None or b8 is None:
-                continue
-
-            ndvi = (b8 - b4) / (b8 + b4) if (b8 + b4) != 0 else 0
-
-            # ======================================
-            # 4️ Save to DB (TRACEABLE)
-            # ======================================
-            db.execute(
-                text("""
-                    UPDATE sampling_points
-                    SET
-                        ndvi = :ndvi,
-                        b4 = :b4,
-                        b8 = :b8,
-                        sentinel_date = :img_date,
-                        sentinel_cloud = :cloud,
-                        sentinel_image_id = :image_id
-                    WHERE id = :id
-                """),
-                {
-                    "id": p["id"],
-                    "ndvi": ndvi,
-                    "b4": b4,
-                    "b8": b8,
-                    "img_date": img_date,
-                    "cloud": cloud,
-                    "image_id": image_id
-                }
-            )
+            for f in result["features"]:
+                props = f["properties"]
+                values = {n: props.get(n) for n in names if props.get(n) is not None}
+
+                if not values:
+                    continue
+
+                ids.append(int(props["point_id"]))
+                rows.append(values)
+
+        # ======================================
+        # 4️ Save to DB (TRACEABLE)
+        # ======================================
+        stats_before = model_stats.snapshot(db, project_id, ids)
+
+        features.save_point_features(
+            db,
+            ids,
+            rows,
+            image_id=image_id,
+            sentinel_date=img_date,
+            cloud=cloud
+        )
 
-            processed += 1
+        model_stats.apply(db, stats_before)
 
         db.commit()
 
@@ -232,12 +232,109 @@ def extract_sentinel(
             "status": "success",
             "image_id": image_id,
             "sentinel_date": img_date,
-            "processed_points": processed
+            "features": names,
+            "processed_points": len(ids)
         }
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(500, str(e))
 
+
+# ===============================
+# EXTRACT FROM LOCAL SCENE (NO GEE CALLS)
+# ===============================
+@router.post("/extract-local/{project_id}")
+def extract_sentinel_local(
+    project_id: str,
+    payload: SentinelLocalExtractRequest,
+    db: Session = Depends(get_db)
+):
+    try:
+        names = features.validate(payload.features or features.FEATURE_SET)
+        scene = LocalScene(payload.scene_id)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(400, str(e))
+
+    # ======================================
+    # 1️ Approved points, already in scene CRS
+    # ======================================
+    points = db.execute(
+        text("""
+            SELECT id,
+                   ST_X(ST_Transform(geom, :srid)) AS x,
+                   ST_Y(ST_Transform(geom, :srid)) AS y
+            FROM sampling_points
+            WHERE project_id = :pid
+              AND survey_status = 'approved'
+              AND submitted_at BETWEEN :start AND :end
+        """),
+        {
+            "pid": project_id,
+            "srid": scene.srid,
+            "start": payload.start_date,
+            "end": payload.end_date
+        }
+    ).fetchall()
+
+    if not points:
+        raise HTTPException(404, "No approved points in date range")
+
+    ids = np.array([p[0] for p in points], dtype=np.int64)
+    xs = np.array([p[1] for p in points], dtype=np.float64)
+    ys = np.array([p[2] for p in points], dtype=np.float64)
+
+    # ======================================
+    # 2️ Per-pixel features, buffered mean for all points at once
+    # ======================================
+    try:
+        stats = scene.buffered_mean(
+            features.required_bands(names),
+            xs,
+            ys,
+            radius_m=payload.buffer_m,
+            derive=lambda window: features.compute_features(window, names)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(400, str(e))
+
+    matrix = np.column_stack([stats[n] for n in names])
+    valid = np.isfinite(matrix).any(axis=1)
+
+    rows = [
+        {n: float(v) for n, v in zip(names, row) if np.isfinite(v)}
+        for row in matrix[valid]
+    ]
+
+    # ======================================
+    # 3️ Bulk save (single statement per table)
+    # ======================================
+    stats_before = model_stats.snapshot(db, project_id, ids[valid].tolist())
+
+    features.save_point_features(
+        db,
+        ids[valid].tolist(),
+        rows,
+        image_id=scene.image_id,
+        sentinel_date=scene.date,
+        cloud=scene.cloud
+    )
+
+    model_stats.apply(db, stats_before)
+
+    db.commit()
+
+    return {
+        "status": "success",
+        "image_id": scene.image_id,
+        "sentinel_date": scene.date,
+        "features": names,
+        "processed_points": int(valid.sum()),
+        "skipped_points": int((~valid).sum())
+    }
+
 @router.post("/list-closest-scenes/{project_id}")
 def list_closest_scenes(
     project_id: str,
@@ -275,6 +372,19 @@ def list_closest_scenes(
         search_start = mid_date - timedelta(days=30)
         search_end = mid_date + timedelta(days=30)
 
+        # ===============================
+        # 2b Answer from local catalog if harvested
+        # ===============================
+        if scene_catalog.catalog_covers(db, project_id, search_start, search_end):
+            return scene_catalog.closest_scenes(
+                db,
+                project_id,
+                mid=datetime.combine(mid_date, datetime.min.time()),
+                start=search_start,
+                end=search_end,
+                cloud=payload.cloud,
+            )
+
         # ===============================
         # 3️ Search Sentinel Collection
         # ===============================
@@ -321,9 +431,62 @@ def list_closest_scenes(
 
         return results
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(500, str(e))
 
+
+# ===============================
+# LOCAL SCENE CATALOG
+# ===============================
+@router.post("/catalog/harvest/{project_id}")
+def harvest_scene_catalog(
+    project_id: str,
+    payload: SentinelCatalogHarvestRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    project = db.execute(
+        text("SELECT id FROM projects WHERE id = :pid"),
+        {"pid": project_id}
+    ).first()
+
+    if not project:
+        raise HTTPException(404, "Project not found")
+
+    end_date = payload.end_date or date.today()
+
+    background_tasks.add_task(
+        scene_catalog.harvest_project_scenes,
+        project_id,
+        payload.start_date,
+        end_date
+    )
+
+    return {
+        "project_id": project_id,
+        "start_date": payload.start_date,
+        "end_date": end_date,
+        "status": "running"
+    }
+
+
+@router.get("/catalog/availability/{project_id}")
+def catalog_availability(project_id: str, db: Session = Depends(get_db)):
+    return {
+        "years": scene_catalog.available_years(db, project_id)
+    }
+
+
+@router.get("/catalog/availability/{project_id}/{year}")
+def catalog_availability_month(project_id: str, year: int, db: Session = Depends(get_db)):
+    return {
+        "year": year,
+        "months": scene_catalog.available_months(db, project_id, year)
+    }
+
 @router.post("/preview-image")
 def preview_image(payload: dict):
 
@@ -1,48 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.db.session import SessionLocal
+from app.db.session import get_db, get_async_db
 from datetime import date
 import ast
 import math
 from app.services.auth import get_current_user
+from app.services import carbon_rollup, project_deletion
+from app.services.biomass import check_formula
 
 router = APIRouter(prefix="/survey", tags=["Survey"])
 
 
-# ===============================
-# DATABASE DEPENDENCY
-# ===============================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ===============================
 # SAFE FORMULA EVAL
 # ===============================
-_ALLOWED_AST_NODES = (
-    ast.Expression,
-    ast.BinOp,
-    ast.UnaryOp,
-    ast.Num,
-    ast.Constant,
-    ast.Name,
-    ast.Load,
-    ast.Add,
-    ast.Sub,
-    ast.Mult,
-    ast.Div,
-    ast.Pow,
-    ast.Mod,
-    ast.USub,
-    ast.UAdd,
-    ast.Call,
-)
-
 _ALLOWED_FUNCS = {
     "sqrt": math.sqrt,
     "log": math.log,
@@ -58,18 +31,7 @@ _ALLOWED_FUNCS = {
 
 def safe_eval_formula(expr: str, variables: dict) -> float:
     tree = ast.parse(expr, mode="eval")
-
-    for node in ast.walk(tree):
-        if not isinstance(node, _ALLOWED_AST_NODES):
-            raise ValueError(f"Komponen tidak diizinkan: {type(node).__name__}")
-
-        if isinstance(node, ast.Call):
-            if not isinstance(node.func, ast.Name) or node.func.id not in _ALLOWED_FUNCS:
-                raise ValueError("Function tidak diizinkan")
-
-        if isinstance(node, ast.Name):
-            if node.id not in variables and node.id not in _ALLOWED_FUNCS:
-                raise ValueError(f"Variable tidak dikenal: {node.id}")
+    check_formula(tree, variables, _ALLOWED_FUNCS)
 
     compiled = compile(tree, "<formula>", "eval")
     env = {"__builtins__": {}}
@@ -83,6 +45,15 @@ def safe_eval_formula(expr: str, variables: dict) -> float:
 # ===============================
 # CREATE SURVEY (TREE MEASUREMENT)
 # ===============================
+JOINED_SQL = """
+    SELECT 1
+    FROM sampling_assignments
+    WHERE sampling_point_id = :pid
+    AND surveyor_id = :sid
+    LIMIT 1
+"""
+
+
 @router.post("/tree/{sampling_point_id}")
 def create_tree_survey(
     sampling_point_id: int,
@@ -119,7 +90,9 @@ def create_tree_survey(
         text("""
             SELECT
                 id,
+                project_id,
                 approval_status,
+                survey_status,
                 latitude,
                 longitude,
                 ST_Y(geom) AS geom_lat,
@@ -133,21 +106,18 @@ def create_tree_survey(
     if not point:
         raise HTTPException(404, "Sampling point tidak ditemukan")
 
-    if str(point["approval_status"]) == "approved":
+    if "approved" in (str(point["approval_status"]), str(point["survey_status"])):
         raise HTTPException(400, "Sampling point sudah approved")
 
+    if project_deletion.lock_project(db, point["project_id"]) == "deleting":
+        raise HTTPException(400, "Project sedang dihapus")
+
     # ===============================
     # CHECK SURVEYOR JOINED
     # ===============================
 
     joined = db.execute(
-        text("""
-            SELECT 1
-            FROM sampling_assignments
-            WHERE sampling_point_id = :pid
-            AND surveyor_id = :sid
-            LIMIT 1
-        """),
+        text(JOINED_SQL),
         {"pid": sampling_point_id, "sid": surveyor_id}
     ).scalar()
 
@@ -276,6 +246,8 @@ def create_tree_survey(
         }
     ).mappings().first()
 
+    carbon_rollup.refresh_points(db, point["project_id"], [sampling_point_id])
+
     db.commit()
 
     return {
@@ -286,6 +258,18 @@ def create_tree_survey(
 # ===============================
 # ADD PHOTOS TO SURVEY
 # ===============================
+def _survey_project(db, survey_id: int):
+    return db.execute(
+        text("""
+            SELECT sp.project_id::text
+            FROM surveys s
+            JOIN sampling_points sp ON sp.id = s.sampling_point_id
+            WHERE s.id = :id
+        """),
+        {"id": survey_id}
+    ).scalar()
+
+
 @router.post("/{survey_id}/photos")
 def add_survey_photos(
     survey_id: int,
@@ -308,14 +292,14 @@ def add_survey_photos(
         raise HTTPException(400, "photos harus berupa list URL")
 
     # check survey exists
-    exists = db.execute(
-        text("SELECT id FROM surveys WHERE id = :id"),
-        {"id": survey_id}
-    ).scalar()
+    project_id = _survey_project(db, survey_id)
 
-    if not exists:
+    if not project_id:
         raise HTTPException(404, "Survey tidak ditemukan")
 
+    if project_deletion.lock_project(db, project_id) == "deleting":
+        raise HTTPException(400, "Project sedang dihapus")
+
     inserted = []
 
     for url in photos:
@@ -455,52 +439,67 @@ def submit_survey(
 
 #     return result
 
+
+SURVEYS_BY_POINT_SQL = """
+    SELECT
+        s.id AS survey_id,
+        s.surveyor_id,
+        s.tree_species_id,
+        s.dbh_cm,
+        s.height_m,
+        s.biomass,
+        s.latitude,
+        s.longitude,
+        s.latitude_manual,
+        s.longitude_manual,
+        s.created_at,
+        u.name AS input_by_name,
+        ts.local_name
+    FROM surveys s
+    JOIN tree_species ts ON ts.id = s.tree_species_id
+    JOIN users u ON u.id = s.surveyor_id
+    WHERE s.sampling_point_id = :pid
+    ORDER BY s.created_at ASC
+"""
+
+
+PHOTOS_BY_SURVEYS_SQL = """
+    SELECT survey_id, photo_url
+    FROM survey_photos
+    WHERE survey_id = ANY(CAST(:sids AS integer[]))
+    ORDER BY
+        survey_id,
+        CASE photo_slot
+            WHEN 'photo1' THEN 1
+            WHEN 'photo2' THEN 2
+            WHEN 'photo3' THEN 3
+        END
+"""
+
+
 @router.get("/by-point/{point_id}")
-def list_surveys_by_point(point_id: int, db: Session = Depends(get_db)):
+async def list_surveys_by_point(point_id: int, db: AsyncSession = Depends(get_async_db)):
 
-    rows = db.execute(
-        text("""
-            SELECT
-                s.id AS survey_id,
-                s.surveyor_id,
-                s.tree_species_id,
-                s.dbh_cm,
-                s.height_m,
-                s.biomass,
-                s.latitude,
-                s.longitude,
-                s.latitude_manual,
-                s.longitude_manual,
-                s.created_at,
-                u.name AS input_by_name,
-                ts.local_name
-            FROM surveys s
-            JOIN tree_species ts ON ts.id = s.tree_species_id
-            JOIN users u ON u.id = s.surveyor_id
-            WHERE s.sampling_point_id = :pid
-            ORDER BY s.created_at ASC
-        """),
+    rows = (await db.execute(
+        text(SURVEYS_BY_POINT_SQL),
         {"pid": point_id}
-    ).mappings().all()
+    )).mappings().all()
+
+    # foto semua survey titik ini dalam satu query (bukan satu per survey)
+    photos = {}
+    if rows:
+        photo_rows = (await db.execute(
+            text(PHOTOS_BY_SURVEYS_SQL),
+            {"sids": [r["survey_id"] for r in rows]}
+        )).all()
+
+        for sid, url in photo_rows:
+            photos.setdefault(sid, []).append(url)
 
     result = []
 
     for r in rows:
-
-        photos = db.execute(
-            text("""
-                SELECT photo_url
-                FROM survey_photos
-                WHERE survey_id = :sid
-                ORDER BY
-                    CASE photo_slot
-                        WHEN 'photo1' THEN 1
-                        WHEN 'photo2' THEN 2
-                        WHEN 'photo3' THEN 3
-                    END
-            """),
-            {"sid": r["survey_id"]}
-        ).scalars().all()
+        urls = photos.get(r["survey_id"], [])
 
         result.append({
             "survey_id": r["survey_id"],
@@ -518,9 +517,9 @@ def list_surveys_by_point(point_id: int, db: Session = Depends(get_db)):
             "tree_species": {
                 "local_name": r["local_name"]
             },
-            "photo1": photos[0] if len(photos) > 0 else None,
-            "photo2": photos[1] if len(photos) > 1 else None,
-            "photo3": photos[2] if len(photos) > 2 else None,
+            "photo1": urls[0] if len(urls) > 0 else None,
+            "photo2": urls[1] if len(urls) > 1 else None,
+            "photo3": urls[2] if len(urls) > 2 else None,
         })
 
     return result
@@ -535,9 +534,15 @@ def update_survey(
 
     survey = db.execute(
         text("""
-            SELECT surveyor_id
-            FROM surveys
-            WHERE id = :id
+            SELECT
+                s.surveyor_id,
+                s.sampling_point_id,
+                sp.project_id,
+                sp.survey_status::text AS survey_status,
+                sp.approval_status::text AS approval_status
+            FROM surveys s
+            JOIN sampling_points sp ON sp.id = s.sampling_point_id
+            WHERE s.id = :id
         """),
         {"id": survey_id}
     ).mappings().first()
@@ -550,6 +555,10 @@ def update_survey(
     if role != "admin" and str(survey["surveyor_id"]) != str(user_id):
         raise HTTPException(403, "Not allowed to edit this survey")
 
+    # titik approved = data training model (project_model_stats), final
+    if "approved" in (survey["survey_status"], survey["approval_status"]):
+        raise HTTPException(400, "Sampling point sudah approved")
+
     db.execute(
         text("""
             UPDATE surveys
@@ -575,6 +584,8 @@ def update_survey(
         }
     )
 
+    carbon_rollup.refresh_points(db, survey["project_id"], [survey["sampling_point_id"]])
+
     db.commit()
 
     return {"status": "updated"}
@@ -588,9 +599,15 @@ def delete_survey(
 
     survey = db.execute(
         text("""
-            SELECT surveyor_id
-            FROM surveys
-            WHERE id = :id
+            SELECT
+                s.surveyor_id,
+                s.sampling_point_id,
+                sp.project_id,
+                sp.survey_status::text AS survey_status,
+                sp.approval_status::text AS approval_status
+            FROM surveys s
+            JOIN sampling_points sp ON sp.id = s.sampling_point_id
+            WHERE s.id = :id
         """),
         {"id": survey_id}
     ).mappings().first()
@@ -604,6 +621,10 @@ def delete_survey(
     if role != "admin" and str(survey["surveyor_id"]) != str(user_id):
         raise HTTPException(403, "Not allowed to delete this survey")
 
+    # titik approved = data training model (project_model_stats), final
+    if "approved" in (survey["survey_status"], survey["approval_status"]):
+        raise HTTPException(400, "Sampling point sudah approved")
+
     db.execute(
         text("""
             DELETE FROM surveys
@@ -612,6 +633,8 @@ def delete_survey(
         {"id": survey_id}
     )
 
+    carbon_rollup.refresh_points(db, survey["project_id"], [survey["sampling_point_id"]])
+
     db.commit()
 
     return {"deleted": survey_id}
@@ -638,6 +661,14 @@ def delete_survey(
 #     db.commit()
 #     return {"status":"ok"}
 
+
+PHOTO_SLOT_DELETE_SQL = """
+    DELETE FROM survey_photos
+    WHERE survey_id = :sid
+    AND photo_slot = :slot
+"""
+
+
 @router.post("/{survey_id}/photos-single")
 def save_survey_photos_single(
     survey_id: int,
@@ -645,17 +676,21 @@ def save_survey_photos_single(
     db: Session = Depends(get_db)
 ):
 
+    project_id = _survey_project(db, survey_id)
+
+    if not project_id:
+        raise HTTPException(404, "Survey tidak ditemukan")
+
+    if project_deletion.lock_project(db, project_id) == "deleting":
+        raise HTTPException(400, "Project sedang dihapus")
+
     for slot in ["photo1","photo2","photo3"]:
         url = payload.get(slot)
 
         if not url:
             continue
 
-        db.execute(text("""
-            DELETE FROM survey_photos
-            WHERE survey_id = :sid
-            AND photo_slot = :slot
-        """), {
+        db.execute(text(PHOTO_SLOT_DELETE_SQL), {
             "sid": survey_id,
             "slot": slot
         })
@@ -0,0 +1,288 @@
+import argparse
+import hashlib
+import re
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.db.session import DATABASE_URL, create_db_engine
+
+# ===============================
+# VERSIONED SCHEMA MIGRATIONS
+# ===============================
+# File migrations/NNNN_nama.sql dijalankan urut berdasarkan nomor dan
+# dicatat di schema_migrations (versi, nama, checksum, durasi). Jalankan
+# dari folder BACKEND:
+#
+#   python -m app.db.migrate status
+#   python -m app.db.migrate up [--to N]
+#   python -m app.db.migrate baseline --to N   (DB lama: tandai 0001..N sudah jalan)
+#
+# Skema dasar tetap dari restore db.sql; migrasi hanya menambah di atasnya.
+#
+# Tiap file jalan dalam satu transaksi bersama baris schema_migrations-nya.
+# File yang baris pertamanya "-- migrate: no-transaction" (mis. CREATE
+# INDEX CONCURRENTLY) dijalankan per statement dalam autocommit; statement
+# dipisah pada ';' di akhir baris, jadi file seperti ini tidak boleh berisi
+# body fungsi ($$ ... $$).
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "migrations"
+
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# Kunci pg_advisory_lock: dua proses migrate tidak jalan bersamaan
+ADVISORY_LOCK_KEY = 48_151_623
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+    @property
+    def transactional(self) -> bool:
+        first = self.sql.lstrip().splitlines()[:1]
+        return not (first and first[0].strip().lower() == NO_TRANSACTION_MARKER)
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    migrations = []
+    seen = {}
+    for path in sorted(directory.glob("*.sql")):
+        m = _FILE_RE.match(path.name)
+        if not m:
+            raise ValueError(f"Nama file migrasi tidak valid: {path.name}")
+
+        version = int(m.group(1))
+        if version in seen:
+            raise ValueError(f"Versi migrasi ganda {version}: {seen[version]} dan {path.name}")
+        seen[version] = path.name
+
+        migrations.append(Migration(version, m.group(2), path, path.read_text(encoding="utf-8")))
+    return migrations
+
+
+def split_statements(sql: str) -> list[str]:
+    """
+    Pisah file no-transaction per statement (';' di akhir baris,
+    baris komentar '--' diabaikan).
+    """
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("--"):
+            continue
+        current.append(line)
+        if stripped.endswith(";"):
+            statements.append("\n".join(current))
+            current = []
+
+    if current:
+        statements.append("\n".join(current))
+    return statements
+
+
+# ===============================
+# DATABASE
+# ===============================
+_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version integer PRIMARY KEY,
+        name text NOT NULL,
+        checksum text NOT NULL,
+        applied_at timestamp with time zone NOT NULL DEFAULT now(),
+        execution_ms integer NOT NULL DEFAULT 0
+    )
+"""
+
+_RECORD = """
+    INSERT INTO schema_migrations (version, name, checksum, execution_ms)
+    VALUES (%s, %s, %s, %s)
+"""
+
+
+class Migrator:
+    """
+    Satu koneksi DBAPI (psycopg2) untuk seluruh run: advisory lock
+    level session ditahan dari awal sampai selesai.
+    """
+
+    def __init__(self, url: str = None, directory: Path = MIGRATIONS_DIR):
+        # DDL besar (index) tidak boleh kena statement_timeout aplikasi
+        self.engine = create_db_engine(
+            url or DATABASE_URL, statement_timeout_ms=0,
+            pool_size=1, max_overflow=0
+        )
+        self.migrations = discover(directory)
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.engine.raw_connection()
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+            cur.execute(_CREATE_TABLE)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if not self.conn.autocommit:
+                self.conn.rollback()
+                self.conn.autocommit = True
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        finally:
+            self.conn.close()
+            self.engine.dispose()
+
+    def applied(self) -> dict:
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT version, name, checksum, applied_at, execution_ms FROM schema_migrations")
+            return {r[0]: r for r in cur.fetchall()}
+
+    def invalid_indexes(self) -> list[str]:
+        # sisa CREATE INDEX CONCURRENTLY yang gagal
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT i.indexrelid::regclass::text
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE NOT i.indisvalid
+                  AND n.nspname = current_schema()
+                ORDER BY 1
+            """)
+            return [r[0] for r in cur.fetchall()]
+
+    def check_checksums(self, applied: dict):
+        changed = [
+            m for m in self.migrations
+            if m.version in applied and applied[m.version][2] != m.checksum
+        ]
+        if changed:
+            names = ", ".join(m.path.name for m in changed)
+            raise RuntimeError(
+                f"File migrasi yang sudah dijalankan berubah: {names}. "
+                "Buat migrasi baru, jangan mengubah yang lama."
+            )
+
+    def pending(self, target: int = None) -> list[Migration]:
+        applied = self.applied()
+        self.check_checksums(applied)
+        return [
+            m for m in self.migrations
+            if m.version not in applied and (target is None or m.version <= target)
+        ]
+
+    def apply(self, m: Migration) -> int:
+        t0 = time.perf_counter()
+
+        if m.transactional:
+            self.conn.autocommit = False
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(m.sql)
+                    elapsed = int((time.perf_counter() - t0) * 1000)
+                    cur.execute(_RECORD, (m.version, m.name, m.checksum, elapsed))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                self.conn.autocommit = True
+            return elapsed
+
+        # no-transaction: statement harus idempotent (IF [NOT] EXISTS)
+        # supaya run ulang setelah gagal di tengah aman
+        with self.conn.cursor() as cur:
+            for statement in split_statements(m.sql):
+                cur.execute(statement)
+            elapsed = int((time.perf_counter() - t0) * 1000)
+            cur.execute(_RECORD, (m.version, m.name, m.checksum, elapsed))
+        return elapsed
+
+    def baseline(self, target: int) -> list[Migration]:
+        applied = self.applied()
+        marked = [
+            m for m in self.migrations
+            if m.version <= target and m.version not in applied
+        ]
+        with self.conn.cursor() as cur:
+            for m in marked:
+                cur.execute(_RECORD, (m.version, m.name, m.checksum, 0))
+        return marked
+
+
+# ===============================
+# CLI
+# ===============================
+def cmd_status(migrator: Migrator, args):
+    applied = migrator.applied()
+    for m in migrator.migrations:
+        row = applied.get(m.version)
+        if row is None:
+            state = "pending"
+        elif row[2] != m.checksum:
+            state = "CHANGED"
+        else:
+            state = f"applied {row[3]:%Y-%m-%d %H:%M} ({row[4]} ms)"
+        print(f"{m.version:04d}  {m.name:<40} {state}")
+
+    unknown = sorted(set(applied) - {m.version for m in migrator.migrations})
+    for v in unknown:
+        print(f"{v:04d}  {applied[v][1]:<40} applied, file tidak ditemukan")
+
+    invalid = migrator.invalid_indexes()
+    if invalid:
+        print("\nIndex INVALID (drop lalu jalankan ulang migrasinya):")
+        for name in invalid:
+            print(f"  {name}")
+
+
+def cmd_up(migrator: Migrator, args):
+    todo = migrator.pending(args.to)
+    if not todo:
+        print("Tidak ada migrasi baru")
+        return
+
+    for m in todo:
+        mode = "" if m.transactional else " [no-transaction]"
+        print(f"-> {m.path.name}{mode}", end=" ", flush=True)
+        elapsed = migrator.apply(m)
+        print(f"ok ({elapsed} ms)")
+
+
+def cmd_baseline(migrator: Migrator, args):
+    if args.to is None:
+        sys.exit("baseline butuh --to N")
+
+    marked = migrator.baseline(args.to)
+    for m in marked:
+        print(f"baseline {m.path.name}")
+    if not marked:
+        print("Tidak ada yang ditandai")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrate")
+    parser.add_argument("command", choices=["status", "up", "baseline"])
+    parser.add_argument("--to", type=int, help="versi terakhir yang diproses")
+    parser.add_argument("--url", help="database URL (default: dari .env)")
+    args = parser.parse_args(argv)
+
+    commands = {"status": cmd_status, "up": cmd_up, "baseline": cmd_baseline}
+    with Migrator(args.url) as migrator:
+        commands[args.command](migrator, args)
+
+
+if __name__ == "__main__":
+    main()
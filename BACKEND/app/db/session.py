@@ -1,7 +1,12 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 load_dotenv()
 
@@ -19,7 +24,147 @@ DATABASE_URL = (
     f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
-engine = create_engine(DATABASE_URL, echo=True)
+# Endpoint async (I/O-bound) memakai asyncpg
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}"
+    f"@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# ===============================
+# ENGINE SETTINGS
+# ===============================
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+# 0 = tanpa batas
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# false | true (SQL) | debug (SQL + hasil)
+DB_ECHO = os.getenv("DB_ECHO", "false").strip().lower()
+
+# URL SQLAlchemy read replica (postgresql+psycopg2://...); kosong = semua ke primary
+DB_READ_REPLICA_URL = os.getenv("DB_READ_REPLICA_URL", "").strip()
+# replika yang tertinggal lebih dari ini (detik) dilewati
+DB_REPLICA_MAX_LAG_S = float(os.getenv("DB_REPLICA_MAX_LAG_S", "5"))
+# hasil cek lag di-cache selama ini (detik)
+DB_REPLICA_LAG_CHECK_S = float(os.getenv("DB_REPLICA_LAG_CHECK_S", "2"))
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool yang mencatat jumlah checkout dan waktu tunggu koneksi
+    (termasuk connect bila pool membuka koneksi baru).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._checkouts = 0
+            self._timeouts = 0
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self._timeouts += 1
+            raise
+
+        waited = time.perf_counter() - t0
+        with self._metrics_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            checkouts = self._checkouts
+            return {
+                "pool_size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": self.overflow(),
+                "max_overflow": self._max_overflow,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "wait_total_ms": round(self._wait_total * 1000, 3),
+                "wait_avg_ms": round(self._wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+class MeteredAsyncQueuePool(MeteredQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options(**overrides) -> dict:
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "echo": "debug" if DB_ECHO == "debug" else DB_ECHO in ("1", "true", "yes", "on"),
+    }
+    options.update(overrides)
+    return options
+
+
+def create_db_engine(url: str = DATABASE_URL, statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS, **overrides):
+    """
+    Engine dengan setting pool dari environment. overrides diteruskan
+    ke create_engine (mis. pool_size untuk script / job khusus).
+    """
+    connect_args = {}
+    if statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+    return create_engine(url, **_pool_options(
+        poolclass=MeteredQueuePool,
+        connect_args=connect_args,
+        **overrides
+    ))
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL, statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS, **overrides):
+    """
+    Versi asyncpg dari create_db_engine (setting pool yang sama).
+    """
+    connect_args = {}
+    if statement_timeout_ms > 0:
+        connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+
+    return create_async_engine(url, **_pool_options(
+        poolclass=MeteredAsyncQueuePool,
+        connect_args=connect_args,
+        **overrides
+    ))
+
+
+def pool_metrics(bind=None) -> dict:
+    pool = (bind or engine).pool
+    if isinstance(pool, MeteredQueuePool):
+        return pool.metrics()
+    return {"status": pool.status()}
+
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -33,3 +178,165 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async_engine = create_async_db_engine()
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ===============================
+# READ REPLICA
+# ===============================
+# Endpoint baca-saja memakai get_read_db / get_async_read_db (penanda per
+# route). Session diarahkan ke replika selama lag replikasinya di bawah
+# DB_REPLICA_MAX_LAG_S; replika tertinggal / tidak bisa dihubungi -> primary.
+
+# Lag 0 bila WAL receiver sedang streaming dan replika sudah me-replay
+# semua WAL yang diterima (primary idle), atau bila server bukan standby
+# (mis. Postgres lokal kedua untuk tes). Receiver putus / tidak ada:
+# receive LSN berhenti sehingga sama dengan replay LSN, jadi lag dihitung
+# dari transaksi terakhir yang di-replay; NULL (belum pernah replay)
+# dianggap tidak sehat. status NULL bagi role tanpa pg_read_all_stats,
+# cukup baris receiver-nya ada.
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE COALESCE(status, 'streaming') = 'streaming'
+        )
+        AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class ReplicaLagGuard:
+    """
+    Status replika yang di-cache check_interval_s detik; hanya satu
+    request yang menjalankan cek, request lain memakai hasil terakhir.
+    """
+
+    def __init__(self, max_lag_s: float, check_interval_s: float):
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self._check_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._checked_at = None
+        self.lag_s = None
+        self.error = None
+        self.routed = {"replica": 0, "primary": 0}
+
+    @property
+    def healthy(self) -> bool:
+        return self.error is None and self.lag_s is not None and self.lag_s <= self.max_lag_s
+
+    def _due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval_s
+
+    def _record(self, lag_s=None, error=None):
+        self.lag_s = None if lag_s is None else float(lag_s)
+        self.error = error
+        self._checked_at = time.monotonic()
+
+    def _route(self) -> bool:
+        use = self.healthy
+        with self._count_lock:
+            self.routed["replica" if use else "primary"] += 1
+        return use
+
+    def use_replica(self, bind) -> bool:
+        if self._due() and self._check_lock.acquire(blocking=False):
+            try:
+                with bind.connect() as conn:
+                    self._record(conn.execute(text(REPLICA_LAG_SQL)).scalar())
+            except Exception as e:
+                self._record(error=str(e))
+            finally:
+                self._check_lock.release()
+        return self._route()
+
+    async def use_replica_async(self, bind) -> bool:
+        if self._due() and self._check_lock.acquire(blocking=False):
+            try:
+                async with bind.connect() as conn:
+                    self._record((await conn.execute(text(REPLICA_LAG_SQL))).scalar())
+            except Exception as e:
+                self._record(error=str(e))
+            finally:
+                self._check_lock.release()
+        return self._route()
+
+    def status(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_s": self.lag_s,
+            "max_lag_s": self.max_lag_s,
+            "error": self.error,
+            "routed": dict(self.routed),
+        }
+
+
+replica_guard = ReplicaLagGuard(DB_REPLICA_MAX_LAG_S, DB_REPLICA_LAG_CHECK_S)
+
+read_engine = None
+async_read_engine = None
+ReadSessionLocal = None
+AsyncReadSessionLocal = None
+
+if DB_READ_REPLICA_URL:
+    # readonly: tulis yang nyasar ke replika (atau ke Postgres biasa
+    # yang dipakai sebagai pengganti replika) langsung ditolak
+    read_engine = create_db_engine(DB_READ_REPLICA_URL).execution_options(
+        postgresql_readonly=True
+    )
+    ReadSessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=read_engine
+    )
+
+    async_read_engine = create_async_db_engine(
+        make_url(DB_READ_REPLICA_URL).set(drivername="postgresql+asyncpg")
+    ).execution_options(postgresql_readonly=True)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+def read_session_factory():
+    """
+    Session factory untuk baca-saja: replika bila sehat, selain itu primary.
+    Dipakai juga oleh generator streaming yang membuka session sendiri.
+    """
+    if read_engine is not None and replica_guard.use_replica(read_engine):
+        return ReadSessionLocal
+    return SessionLocal
+
+
+def get_read_db():
+    db = read_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    factory = AsyncSessionLocal
+    if async_read_engine is not None and await replica_guard.use_replica_async(async_read_engine):
+        factory = AsyncReadSessionLocal
+
+    async with factory() as db:
+        yield db
@@ -11,8 +11,13 @@ from app.api.user import router as user_router
 from app.api.tree_species import router as tree_species_router
 from app.api.upload import router as upload_router
 from app.api.auth import router as auth_router
+from app.api.carbon import router as carbon_router
+from app.api.metrics import router as metrics_router
+from app.services.gee_tasks import tracker as gee_task_tracker
+from app.db.session import async_engine, async_read_engine
+from app.services.serialize import FastJSONResponse
 
-app = FastAPI(title="Sentinel Backend")
+app = FastAPI(title="Sentinel Backend", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +30,20 @@ app.add_middleware(
 def health():
     return {"status": "ok"}
 
+@app.on_event("startup")
+def start_background_workers():
+    gee_task_tracker.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    gee_task_tracker.stop()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+
 # ===== API PREFIX DI SINI =====
 app.include_router(context_router, prefix="/api")
 app.include_router(sentinel_router, prefix="/api")
@@ -35,5 +54,7 @@ app.include_router(user_router, prefix="/api")
 app.include_router(tree_species_router, prefix="/api")
 app.include_router(upload_router, prefix="/api")
 app.include_router(auth_router, prefix="/api")
+app.include_router(carbon_router, prefix="/api")
+app.include_router(metrics_router, prefix="/api")
 
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
\ No newline at end of file
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Tuple
+
+
+# ===============================
+# LOCAL CARBON MAP (scene di disk)
+# ===============================
+class CarbonLocalMapRequest(BaseModel):
+    scene_id: str
+    model_id: Optional[int] = None  # default: model terbaru project
+
+
+# ===============================
+# BATCH PREDICTION
+# ===============================
+class CarbonPredictRequest(BaseModel):
+    # salah satu: koordinat [lon, lat] (EPSG:4326) atau feature per baris;
+    # tuple: koordinat yang tidak tepat 2 angka ditolak 422
+    coordinates: Optional[List[Tuple[float, float]]] = None
+    features: Optional[List[Dict[str, float]]] = None
+
+    # koordinat: feature dari scene lokal bila diisi, selain itu dari
+    # titik sampling terdekat yang sudah diekstrak
+    scene_id: Optional[str] = None
+    buffer_m: float = 10
+    max_distance_m: float = 30
+
+    model_id: Optional[int] = None  # default: model aktif project
+
+
+# ===============================
+# INTERPOLATION (tanpa citra)
+# ===============================
+class CarbonInterpolateRequest(BaseModel):
+    method: str = Field("idw", pattern="^(idw|kriging)$")
+    resolution_m: float = Field(30, gt=0)
+    neighbors: int = Field(12, ge=1, le=64)
+    power: float = Field(2.0, gt=0)  # IDW
+    variogram: str = Field("spherical", pattern="^(spherical|exponential)$")
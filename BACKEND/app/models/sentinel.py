@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import date
 
 
@@ -28,8 +28,27 @@ class SentinelExtractRequest(BaseModel):
     start_date: date
     end_date: date
     cloud: int = 20
+    features: Optional[List[str]] = None  # default: features.FEATURE_SET
 
 class SentinelClosestRequest(BaseModel):
     start_date: date
     end_date: date
-    cloud: int = 50
\ No newline at end of file
+    cloud: int = 50
+
+# ===============================
+# EXTRACT FROM LOCAL SCENE (memory-mapped)
+# ===============================
+class SentinelLocalExtractRequest(BaseModel):
+    scene_id: str
+    start_date: date
+    end_date: date
+    buffer_m: float = 10
+    features: Optional[List[str]] = None  # default: features.FEATURE_SET
+
+
+# ===============================
+# LOCAL SCENE CATALOG HARVEST
+# ===============================
+class SentinelCatalogHarvestRequest(BaseModel):
+    start_date: date = date(2017, 1, 1)
+    end_date: Optional[date] = None
@@ -0,0 +1,211 @@
+import json
+import time
+import zipfile
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+from app.services import export
+from app.services.uploads import path_for_url
+
+# ===============================
+# PROJECT ARCHIVE (STREAMED ZIP)
+# ===============================
+# Zip ditulis ke export.ChunkSink (tidak bisa seek -> zipfile memakai
+# data descriptor) dan dikirim per chunk. Tabel ditulis sebagai Parquet
+# per batch server-side cursor, foto disalin dari disk per blok; memori
+# dibatasi satu batch / satu blok.
+#
+#   project.json          metadata project + ringkasan isi
+#   aoi.geojson           AOI penuh
+#   models.json           semua model (params lengkap)
+#   sampling_points.parquet
+#   surveys.parquet
+#   species.parquet       spesies yang dipakai survey project
+#   photos.parquet        indeks foto (survey_id, slot, url, path di zip)
+#   photos/<survey_id>/<file>
+
+# Blok baca file foto
+PHOTO_CHUNK = 1 << 20
+
+SPECIES_COLUMNS = {
+    "id": "int",
+    "local_name": "str",
+    "scientific_name": "str",
+    "wood_density": "float",
+    "biomass_formula": "str",
+    "description": "str",
+}
+
+PHOTO_COLUMNS = {
+    "photo_id": "int",
+    "survey_id": "int",
+    "photo_slot": "str",
+    "photo_url": "str",
+    "archive_path": "str",
+    "size_bytes": "int",
+}
+
+
+def _entry(zf: zipfile.ZipFile, name: str, compress: int = zipfile.ZIP_DEFLATED):
+    info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+    info.compress_type = compress
+    return zf.open(info, "w", force_zip64=True)
+
+
+def _write_json(zf, name: str, obj):
+    with _entry(zf, name) as f:
+        f.write(json.dumps(obj, default=str, indent=2).encode("utf-8"))
+
+
+def _write_parquet(zf, sink, name: str, columns: list[str], types: dict, batches):
+    # Parquet sudah terkompresi (zstd): simpan tanpa deflate
+    with _entry(zf, name, zipfile.ZIP_STORED) as f:
+        for chunk in export.parquet_stream(columns, types, batches):
+            f.write(chunk)
+            yield sink.drain()
+
+
+def _species_sql() -> str:
+    return f"""
+        SELECT {", ".join(f"ts.{c}" for c in SPECIES_COLUMNS)}
+        FROM tree_species ts
+        WHERE ts.id IN (
+            SELECT DISTINCT s.tree_species_id
+            FROM surveys s
+            JOIN sampling_points sp ON sp.id = s.sampling_point_id
+            WHERE sp.project_id = :project_id
+        )
+        ORDER BY ts.id
+    """
+
+
+PHOTOS_SQL = """
+    SELECT ph.id AS photo_id, ph.survey_id, ph.photo_slot, ph.photo_url
+    FROM survey_photos ph
+    JOIN surveys s ON s.id = ph.survey_id
+    JOIN sampling_points sp ON sp.id = s.sampling_point_id
+    WHERE sp.project_id = :project_id
+    ORDER BY ph.survey_id, ph.id
+"""
+
+
+def _write_photos(zf, sink, params: dict, index: list):
+    """
+    Salin file foto per blok PHOTO_CHUNK; foto yang filenya tidak ada
+    tetap masuk indeks dengan archive_path kosong.
+    """
+    for rows in export.stream_batches(PHOTOS_SQL, params):
+        for r in rows:
+            path = path_for_url(r["photo_url"])
+            arcname = None
+            size = None
+
+            if path is not None and path.is_file():
+                arcname = f"photos/{r['survey_id']}/{r['photo_id']}_{path.name}"
+                size = 0
+                with open(path, "rb") as src, _entry(zf, arcname, zipfile.ZIP_STORED) as dst:
+                    while True:
+                        block = src.read(PHOTO_CHUNK)
+                        if not block:
+                            break
+                        dst.write(block)
+                        size += len(block)
+                        yield sink.drain()
+
+            index.append({**r, "archive_path": arcname, "size_bytes": size})
+
+        yield sink.drain()
+
+
+def project_meta(db, project_id: str):
+    return db.execute(
+        text("""
+            SELECT
+                id::text AS id,
+                name,
+                year,
+                months,
+                cloud,
+                status,
+                created_at,
+                ST_AsGeoJSON(aoi)::json AS aoi
+            FROM projects
+            WHERE id = :pid
+        """),
+        {"pid": project_id}
+    ).mappings().first()
+
+
+def archive_stream(project_id: str):
+    """
+    Generator bytes zip arsip project. Membuka session sendiri karena
+    berjalan setelah dependency get_db ditutup.
+    """
+    params = {"project_id": project_id}
+    sink = export.ChunkSink()
+
+    db = SessionLocal()
+    try:
+        meta = dict(project_meta(db, project_id))
+        models = [
+            dict(r) for r in db.execute(
+                text("""
+                    SELECT *
+                    FROM project_models
+                    WHERE project_id = :pid
+                    ORDER BY created_at
+                """),
+                {"pid": project_id}
+            ).mappings()
+        ]
+    finally:
+        db.close()
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        aoi = meta.pop("aoi")
+        _write_json(zf, "aoi.geojson", {
+            "type": "Feature",
+            "geometry": aoi,
+            "properties": {"project_id": project_id, "name": meta["name"]},
+        })
+        _write_json(zf, "models.json", models)
+        yield sink.drain()
+
+        point_cols = list(export.POINT_COLUMNS)
+        yield from _write_parquet(
+            zf, sink, "sampling_points.parquet",
+            point_cols, {c: export.POINT_COLUMNS[c][1] for c in point_cols},
+            export.stream_batches(export.feature_report_sql(point_cols, approved_only=False), params)
+        )
+
+        survey_cols = list(export.SURVEY_COLUMNS)
+        yield from _write_parquet(
+            zf, sink, "surveys.parquet",
+            survey_cols, {c: export.SURVEY_COLUMNS[c][1] for c in survey_cols},
+            export.stream_batches(export.survey_detail_sql(survey_cols, approved_only=False), params)
+        )
+
+        yield from _write_parquet(
+            zf, sink, "species.parquet",
+            list(SPECIES_COLUMNS), SPECIES_COLUMNS,
+            export.stream_batches(_species_sql(), params)
+        )
+
+        photos = []
+        yield from _write_photos(zf, sink, params, photos)
+
+        yield from _write_parquet(
+            zf, sink, "photos.parquet",
+            list(PHOTO_COLUMNS), PHOTO_COLUMNS,
+            [photos] if photos else []
+        )
+
+        _write_json(zf, "project.json", {
+            **meta,
+            "models": len(models),
+            "photos": len(photos),
+            "photos_missing": sum(1 for p in photos if p["archive_path"] is None),
+        })
+
+    yield sink.drain()
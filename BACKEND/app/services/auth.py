@@ -1,11 +1,13 @@
+import uuid
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from app.models.user import User
 
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, AsyncSessionLocal
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -63,6 +65,34 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     finally:
         db.close()
 
+async def get_current_user_async(token: str = Depends(oauth2_scheme)):
+    """
+    Sama dengan get_current_user, untuk endpoint async (asyncpg).
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        user_id = uuid.UUID(str(payload.get("sub")))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(
+            select(User).where(User.id == user_id)
+        )).scalars().first()
+
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    return {
+        "sub": str(user.id),
+        "role": user.role,
+        "name": user.name
+    }
+
 def require_admin(user=Depends(get_current_user)):
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Forbidden")
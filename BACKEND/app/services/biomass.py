@@ -0,0 +1,107 @@
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+# ===============================
+# BIOMASS FORMULA
+# ===============================
+# Formula per spesies (tree_species.biomass_formula) berupa ekspresi
+# dengan variabel dbh_cm, height_m, wood_density. Versi vectorized di
+# sini dipakai import massal: satu evaluasi per spesies untuk semua
+# baris spesies tersebut.
+
+ALLOWED_AST_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Num,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.Mod,
+    ast.USub,
+    ast.UAdd,
+    ast.Call,
+)
+
+FORMULA_VARIABLES = ("dbh_cm", "height_m", "wood_density")
+
+# padanan numpy untuk fungsi yang diizinkan di survey.safe_eval_formula
+_ARRAY_FUNCS = {
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "log10": np.log10,
+    "exp": np.exp,
+    "pow": np.power,
+    "abs": np.abs,
+    "min": np.minimum,
+    "max": np.maximum,
+    "round": np.round,
+}
+
+
+def check_formula(tree, variables, funcs):
+    """
+    Validasi AST formula: hanya node, function dan variable yang diizinkan.
+    """
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_AST_NODES):
+            raise ValueError(f"Komponen tidak diizinkan: {type(node).__name__}")
+
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in funcs:
+                raise ValueError("Function tidak diizinkan")
+
+        if isinstance(node, ast.Name):
+            if node.id not in variables and node.id not in funcs:
+                raise ValueError(f"Variable tidak dikenal: {node.id}")
+
+
+@lru_cache(maxsize=256)
+def _compile(expr: str):
+    tree = ast.parse(expr, mode="eval")
+    check_formula(tree, FORMULA_VARIABLES, _ARRAY_FUNCS)
+    return compile(tree, "<formula>", "eval")
+
+
+def default_biomass(dbh, height, wd) -> np.ndarray:
+    """
+    Allometri default (tanpa formula spesies); height / wood density
+    kosong atau 0 dianggap tidak ada, sama seperti create_tree_survey.
+    """
+    dbh = np.asarray(dbh, dtype=np.float64)
+    height = np.nan_to_num(np.asarray(height, dtype=np.float64))
+    wd = np.nan_to_num(np.asarray(wd, dtype=np.float64))
+
+    base = 0.11 * dbh ** 2
+    return np.where(
+        (height != 0) & (wd != 0), base * wd * height,
+        np.where(wd != 0, base * wd, base)
+    )
+
+
+def formula_biomass(expr: str, dbh, height, wd) -> np.ndarray:
+    """
+    Evaluasi formula spesies untuk banyak pohon sekaligus. Nilai yang
+    tidak terdefinisi (log 0, pembagian 0) menjadi NaN / inf.
+    """
+    dbh = np.asarray(dbh, dtype=np.float64)
+    variables = {
+        "dbh_cm": dbh,
+        "height_m": np.nan_to_num(np.asarray(height, dtype=np.float64)),
+        "wood_density": np.nan_to_num(np.asarray(wd, dtype=np.float64)),
+    }
+
+    env = {"__builtins__": {}}
+    env.update(_ARRAY_FUNCS)
+
+    with np.errstate(all="ignore"):
+        val = eval(_compile(expr), env, variables)
+
+    return np.broadcast_to(np.asarray(val, dtype=np.float64), dbh.shape)
@@ -0,0 +1,639 @@
+import codecs
+import csv
+import io
+import json
+import time
+from datetime import date, datetime
+
+import numpy as np
+import shapely
+from sqlalchemy import text
+
+from app.services import biomass
+
+# ===============================
+# BULK IMPORT (SAMPLING POINT + TREE INVENTORY)
+# ===============================
+# Satu baris = satu pohon (atau satu plot bila dbh kosong). Baris dengan
+# plot_id yang sama masuk ke sampling point yang sama; tanpa plot_id,
+# koordinat dipakai sebagai kunci plot. sampling_point_id menempelkan
+# pohon ke titik project yang sudah ada.
+#
+# File dibaca per batch; validasi koordinat, resolusi spesies dan
+# biomass dihitung vectorized per batch, lalu ditulis dengan COPY.
+# Baris yang gagal dilaporkan per nomor baris fisik di file (CSV/XLSX:
+# header = baris 1, baris kosong tetap dihitung; GeoJSON-seq: nomor
+# baris; FeatureCollection: urutan feature).
+
+IMPORT_BATCH = 10_000
+
+# Key nomor baris fisik yang ditambahkan reader ke tiap dict baris
+ROW_KEY = "__row__"
+
+# Error yang dikembalikan di response (sisanya hanya dihitung)
+MAX_ERRORS = 1_000
+
+COLUMN_ALIASES = {
+    "plot_id": ("plot_id", "plot", "plot_code"),
+    "sampling_point_id": ("sampling_point_id", "point_id"),
+    "latitude": ("latitude", "lat", "y"),
+    "longitude": ("longitude", "lng", "lon", "long", "x"),
+    "tree_latitude": ("tree_latitude", "tree_lat"),
+    "tree_longitude": ("tree_longitude", "tree_lng", "tree_lon"),
+    "species": ("species", "species_name", "tree_species", "tree_species_id", "scientific_name", "local_name"),
+    "dbh_cm": ("dbh_cm", "dbh"),
+    "circumference_cm": ("circumference_cm", "circumference", "girth_cm"),
+    "height_m": ("height_m", "height"),
+    "survey_date": ("survey_date", "date"),
+    "description": ("description", "notes", "remarks"),
+}
+
+FORMATS = ("csv", "xlsx", "geojson")
+
+
+def detect_format(filename: str | None) -> str:
+    ext = (filename or "").rsplit(".", 1)[-1].lower()
+    if ext in ("csv", "txt"):
+        return "csv"
+    if ext in ("xlsx", "xlsm"):
+        return "xlsx"
+    if ext in ("geojson", "json", "geojsonl", "geojsonseq", "ndjson"):
+        return "geojson"
+    raise ValueError("Format file tidak dikenali (csv, xlsx, geojson)")
+
+
+# ===============================
+# READERS (batch of dict rows)
+# ===============================
+def _chunked(rows, batch: int):
+    chunk = []
+    for r in rows:
+        chunk.append(r)
+        if len(chunk) >= batch:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_csv(fileobj, batch: int = IMPORT_BATCH):
+    stream = codecs.getreader("utf-8-sig")(fileobj)
+    head = stream.readline()
+
+    # Excel lokal sering menyimpan CSV dengan ';'
+    delimiter = ";" if head.count(";") > head.count(",") else ","
+    header = next(csv.reader([head], delimiter=delimiter))
+
+    reader = csv.reader(stream, delimiter=delimiter)
+    yield from _chunked(_csv_rows(reader, header), batch)
+
+
+def _csv_rows(reader, header):
+    # line_num menghitung baris fisik (termasuk kosong / multi-line quote)
+    start = 2
+    for r in reader:
+        if any(r):
+            row = dict(zip(header, r))
+            row[ROW_KEY] = start
+            yield row
+        start = reader.line_num + 2
+
+
+def read_xlsx(fileobj, batch: int = IMPORT_BATCH):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        it = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(it, ())]
+
+        rows = (
+            {**dict(zip(header, r)), ROW_KEY: no}
+            for no, r in enumerate(it, start=2)
+            if any(v is not None and v != "" for v in r)
+        )
+        yield from _chunked(rows, batch)
+    finally:
+        wb.close()
+
+
+def _feature_row(feature: dict, no: int) -> dict:
+    row = dict(feature.get("properties") or {})
+    geom = feature.get("geometry") or {}
+    if geom.get("type") == "Point":
+        row["longitude"], row["latitude"] = geom["coordinates"][:2]
+    row[ROW_KEY] = no
+    return row
+
+
+def read_geojson(fileobj, batch: int = IMPORT_BATCH):
+    """
+    FeatureCollection atau GeoJSON-seq (satu Feature per baris, format
+    export /feature-report/export). GeoJSON-seq dibaca baris demi baris.
+    """
+    stream = codecs.getreader("utf-8-sig")(fileobj)
+    first = stream.readline()
+
+    try:
+        doc = json.loads(first)
+    except ValueError:
+        doc = None
+
+    if isinstance(doc, dict) and doc.get("type") == "Feature":
+        features = (
+            (no, json.loads(line))
+            for no, line in enumerate(stream, start=2)
+            if line.strip()
+        )
+        rows = (_feature_row(f, no) for no, f in _prepend((1, doc), features))
+    else:
+        doc = json.loads(first + stream.read())
+        if doc.get("type") != "FeatureCollection":
+            raise ValueError("GeoJSON harus FeatureCollection atau GeoJSON-seq")
+        rows = (_feature_row(f, no) for no, f in enumerate(doc["features"], start=1))
+
+    yield from _chunked(rows, batch)
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+READERS = {
+    "csv": read_csv,
+    "xlsx": read_xlsx,
+    "geojson": read_geojson,
+}
+
+
+# ===============================
+# COLUMN PARSING (vectorized)
+# ===============================
+def _column_map(rows: list[dict]) -> dict:
+    """
+    Nama kolom kanonik -> nama kolom di file (case-insensitive alias).
+    """
+    keys = {}
+    for r in rows[:100]:
+        for k in r:
+            if k is not None:
+                keys.setdefault(str(k).strip().lower(), k)
+
+    found = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in keys:
+                found[name] = keys[alias]
+                break
+    return found
+
+
+def _blank(v) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def _floats(values):
+    """
+    Return (array float64, mask tidak valid). Kosong -> NaN (valid).
+    Koma desimal diterima.
+    """
+    clean = [
+        np.nan if _blank(v) else (v.strip().replace(",", ".") if isinstance(v, str) else v)
+        for v in values
+    ]
+    try:
+        return np.array(clean, dtype=np.float64), np.zeros(len(clean), dtype=bool)
+    except (ValueError, TypeError):
+        pass
+
+    out = np.full(len(clean), np.nan)
+    bad = np.zeros(len(clean), dtype=bool)
+    for i, v in enumerate(clean):
+        try:
+            out[i] = float(v)
+        except (ValueError, TypeError):
+            bad[i] = True
+    return out, bad
+
+
+def _text(v) -> str | None:
+    if _blank(v):
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v).strip()
+
+
+def _date(v):
+    if _blank(v):
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v).strip()[:10])
+
+
+def _norm(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+class SpeciesIndex:
+    """
+    Nama lokal / ilmiah / id -> (id, wood_density, biomass_formula).
+    Nama yang dipakai lebih dari satu spesies ditandai ambigu.
+    """
+
+    def __init__(self, rows):
+        self._by_key = {}
+        self._ambiguous = set()
+
+        for r in rows:
+            value = (
+                int(r["id"]),
+                float(r["wood_density"]) if r["wood_density"] is not None else np.nan,
+                r["biomass_formula"] or None,
+            )
+            self._by_key[str(r["id"])] = value
+
+            for name in {_norm(r["local_name"] or ""), _norm(r["scientific_name"] or "")}:
+                if not name:
+                    continue
+                prev = self._by_key.get(name)
+                if prev is not None and prev[0] != value[0]:
+                    self._ambiguous.add(name)
+                self._by_key[name] = value
+
+    @classmethod
+    def load(cls, db):
+        rows = db.execute(
+            text("""
+                SELECT id, local_name, scientific_name, wood_density, biomass_formula
+                FROM tree_species
+            """)
+        ).mappings().all()
+        return cls(rows)
+
+    def resolve(self, name: str):
+        """
+        Return (species, error).
+        """
+        key = _norm(name)
+        if key in self._ambiguous:
+            return None, f"Nama spesies ambigu: {name} (pakai scientific_name atau id)"
+        species = self._by_key.get(key)
+        if species is None:
+            return None, f"Spesies tidak dikenali: {name}"
+        return species, None
+
+
+def tree_biomass(dbh, height, wd, formulas) -> np.ndarray:
+    """
+    Biomass per pohon: formula spesies dievaluasi sekali per formula
+    untuk semua baris spesies itu; tanpa formula -> allometri default.
+    """
+    out = np.full(len(dbh), np.nan)
+    formulas = np.asarray(formulas, dtype=object)
+
+    no_formula = np.array([f is None for f in formulas], dtype=bool)
+    if no_formula.any():
+        out[no_formula] = biomass.default_biomass(dbh[no_formula], height[no_formula], wd[no_formula])
+
+    for expr in set(formulas[~no_formula]):
+        rows = formulas == expr
+        try:
+            out[rows] = biomass.formula_biomass(expr, dbh[rows], height[rows], wd[rows])
+        except (ValueError, SyntaxError, TypeError, ZeroDivisionError):
+            pass  # tetap NaN -> error per baris
+
+    return out
+
+
+def _ewkt(lng: float, lat: float) -> str:
+    return f"SRID=4326;POINT({lng!r} {lat!r})"
+
+
+# ===============================
+# IMPORTER
+# ===============================
+class Importer:
+    def __init__(self, db, project_id: str, surveyor_id: str, aoi, species: SpeciesIndex, dry_run: bool = False):
+        self.db = db
+        self.project_id = project_id
+        self.surveyor_id = surveyor_id
+        self.species = species
+        self.dry_run = dry_run
+
+        self.aoi = aoi
+        shapely.prepare(self.aoi)
+
+        # kunci plot -> (point_id, lat, lng)
+        self.plots = {}
+        self._existing = None
+        self._next_fake_id = -1
+
+        self.rows = 0
+        self.points_created = 0
+        self.trees_created = 0
+        self.touched = set()
+        self.errors = []
+        self.error_count = 0
+
+    @classmethod
+    def for_project(cls, db, project_id: str, surveyor_id: str, dry_run: bool = False):
+        row = db.execute(
+            # FOR SHARE: hapus project menunggu import selesai (lihat project_deletion)
+            text("SELECT ST_AsBinary(aoi) AS aoi, status FROM projects WHERE id = :pid FOR SHARE"),
+            {"pid": project_id}
+        ).mappings().first()
+
+        if not row:
+            return None
+        if row["status"] == "deleting":
+            raise ValueError("Project sedang dihapus")
+
+        return cls(
+            db, project_id, surveyor_id,
+            shapely.from_wkb(bytes(row["aoi"])),
+            SpeciesIndex.load(db),
+            dry_run=dry_run,
+        )
+
+    # ---------- errors ----------
+    def _error(self, row: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def _existing_points(self) -> dict:
+        if self._existing is None:
+            # (lat, lng, approved): titik approved = data training, immutable
+            self._existing = {
+                r[0]: (r[1], r[2], r[3])
+                for r in self.db.execute(
+                    text("""
+                        SELECT id, ST_Y(geom), ST_X(geom),
+                               (survey_status = 'approved' OR approval_status = 'approved')
+                        FROM sampling_points
+                        WHERE project_id = :pid
+                    """),
+                    {"pid": self.project_id}
+                )
+            }
+        return self._existing
+
+    # ---------- COPY ----------
+    def _copy(self, table: str, columns: list[str], rows: list[tuple]):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+
+        cur = self.db.connection().connection.cursor()
+        try:
+            cur.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buf
+            )
+        finally:
+            cur.close()
+
+    def _allocate_point_ids(self, n: int) -> list[int]:
+        if self.dry_run:
+            ids = list(range(self._next_fake_id, self._next_fake_id - n, -1))
+            self._next_fake_id -= n
+            return ids
+
+        return self.db.execute(
+            text("""
+                SELECT nextval(pg_get_serial_sequence('sampling_points', 'id'))
+                FROM generate_series(1, :n)
+            """),
+            {"n": n}
+        ).scalars().all()
+
+    # ---------- batch ----------
+    def feed(self, rows: list[dict]):
+        first_row = self.rows + 1
+        n = len(rows)
+        self.rows += n
+
+        cols = _column_map(rows)
+
+        def column(name):
+            key = cols.get(name)
+            return [r.get(key) for r in rows] if key is not None else [None] * n
+
+        row_no = np.array([r.get(ROW_KEY, first_row + k) for k, r in enumerate(rows)])
+        ok = np.ones(n, dtype=bool)
+
+        def fail(mask, message):
+            for i in np.flatnonzero(mask & ok):
+                self._error(int(row_no[i]), message)
+            ok[mask] = False
+
+        lat, bad_lat = _floats(column("latitude"))
+        lng, bad_lng = _floats(column("longitude"))
+        dbh, bad_dbh = _floats(column("dbh_cm"))
+        height, bad_h = _floats(column("height_m"))
+        circ, bad_c = _floats(column("circumference_cm"))
+        tlat, bad_tlat = _floats(column("tree_latitude"))
+        tlng, bad_tlng = _floats(column("tree_longitude"))
+
+        fail(bad_lat | bad_lng | bad_tlat | bad_tlng, "Koordinat bukan angka")
+        fail(bad_dbh | bad_h | bad_c, "dbh_cm / height_m / circumference_cm bukan angka")
+
+        has_xy = np.isfinite(lat) & np.isfinite(lng)
+        fail(has_xy & ((np.abs(lat) > 90) | (np.abs(lng) > 180)), "Koordinat di luar rentang")
+
+        # satu test vectorized untuk semua baris yang punya koordinat
+        inside = np.zeros(n, dtype=bool)
+        idx = np.flatnonzero(has_xy & ok)
+        if len(idx):
+            inside[idx] = shapely.intersects_xy(self.aoi, lng[idx], lat[idx])
+
+        plot_ids = column("plot_id")
+        point_refs, bad_ref = _floats(column("sampling_point_id"))
+        fail(bad_ref, "sampling_point_id bukan angka")
+
+        # ---------- plots ----------
+        point_of = np.zeros(n, dtype=np.int64)
+        plot_lat = np.full(n, np.nan)
+        plot_lng = np.full(n, np.nan)
+        new_points = []
+        pending = {}
+
+        for i in np.flatnonzero(ok):
+            if np.isfinite(point_refs[i]):
+                pid = int(point_refs[i])
+                existing = self._existing_points().get(pid)
+                if existing is None:
+                    self._error(int(row_no[i]), f"sampling_point_id {pid} tidak ada di project ini")
+                    ok[i] = False
+                    continue
+                if existing[2]:
+                    self._error(int(row_no[i]), f"Sampling point {pid} sudah approved")
+                    ok[i] = False
+                    continue
+                point_of[i] = pid
+                plot_lat[i], plot_lng[i] = existing[:2]
+                continue
+
+            plot = _text(plot_ids[i])
+            if plot is not None:
+                key = plot
+            elif has_xy[i]:
+                key = f"{lat[i]:.7f},{lng[i]:.7f}"
+            else:
+                self._error(int(row_no[i]), "Butuh plot_id + koordinat, koordinat, atau sampling_point_id")
+                ok[i] = False
+                continue
+
+            known = self.plots.get(key)
+            if known is None:
+                if not has_xy[i]:
+                    self._error(int(row_no[i]), f"Koordinat plot {key} belum pernah diberikan")
+                    ok[i] = False
+                    continue
+                if not inside[i]:
+                    self._error(int(row_no[i]), "Titik berada di luar area fokus")
+                    ok[i] = False
+                    continue
+
+                known = [None, float(lat[i]), float(lng[i])]
+                self.plots[key] = known
+                new_points.append(known)
+
+            plot_lat[i], plot_lng[i] = known[1], known[2]
+            if known[0] is None:
+                pending[i] = known
+            else:
+                point_of[i] = known[0]
+
+        if new_points:
+            # id plot baru dialokasikan sekaligus (COPY tidak bisa RETURNING)
+            ids = self._allocate_point_ids(len(new_points))
+            for plot, pid in zip(new_points, ids):
+                plot[0] = pid
+            for i, plot in pending.items():
+                point_of[i] = plot[0]
+
+            if not self.dry_run:
+                self._copy(
+                    "sampling_points",
+                    ["id", "project_id", "geom", "latitude", "longitude", "status"],
+                    [(p[0], self.project_id, _ewkt(p[2], p[1]), p[1], p[2], "open") for p in new_points]
+                )
+            self.points_created += len(new_points)
+            self.touched.update(p[0] for p in new_points)
+
+        # ---------- trees ----------
+        species_col = column("species")
+        is_tree = ok & (np.isfinite(dbh) | np.array([not _blank(v) for v in species_col]))
+
+        fail(is_tree & ~np.isfinite(dbh), "dbh_cm wajib diisi")
+        fail(is_tree & (dbh <= 0), "dbh_cm harus > 0")
+        fail(is_tree & np.array([_blank(v) for v in species_col]), "species wajib diisi")
+
+        tree_idx = np.flatnonzero(is_tree & ok)
+        if not len(tree_idx):
+            return
+
+        # resolusi spesies per nama unik
+        names = [_text(species_col[i]) for i in tree_idx]
+        resolved = {}
+        for name in set(names):
+            resolved[name] = self.species.resolve(name)
+
+        species_id = np.zeros(len(tree_idx), dtype=np.int64)
+        wd = np.full(len(tree_idx), np.nan)
+        formulas = [None] * len(tree_idx)
+        keep = np.ones(len(tree_idx), dtype=bool)
+
+        for j, name in enumerate(names):
+            sp, err = resolved[name]
+            if err:
+                self._error(int(row_no[tree_idx[j]]), err)
+                keep[j] = False
+                continue
+            species_id[j], wd[j], formulas[j] = sp
+
+        agb = tree_biomass(dbh[tree_idx], height[tree_idx], wd, formulas)
+
+        bad_agb = keep & ~(np.isfinite(agb) & (agb >= 0))
+        for j in np.flatnonzero(bad_agb):
+            self._error(int(row_no[tree_idx[j]]), "Biomass tidak valid (cek formula spesies / input)")
+        keep &= ~bad_agb
+
+        dates = column("survey_date")
+        descriptions = column("description")
+        today = date.today()
+
+        out = []
+        for j in np.flatnonzero(keep):
+            i = tree_idx[j]
+            try:
+                survey_date = _date(dates[i]) or today
+            except ValueError:
+                self._error(int(row_no[i]), "survey_date tidak valid (YYYY-MM-DD)")
+                continue
+
+            has_tree_xy = np.isfinite(tlat[i]) and np.isfinite(tlng[i])
+            t_lat = float(tlat[i]) if has_tree_xy else float(plot_lat[i])
+            t_lng = float(tlng[i]) if has_tree_xy else float(plot_lng[i])
+
+            out.append((
+                int(point_of[i]),
+                self.surveyor_id,
+                int(species_id[j]),
+                survey_date.isoformat(),
+                float(dbh[i]),
+                float(circ[i]) if np.isfinite(circ[i]) else None,
+                float(height[i]) if np.isfinite(height[i]) else None,
+                float(agb[j]),
+                _text(descriptions[i]),
+                t_lat,
+                t_lng,
+                _ewkt(t_lng, t_lat),
+                "draft",
+            ))
+            self.touched.add(int(point_of[i]))
+
+        if out and not self.dry_run:
+            self._copy(
+                "surveys",
+                [
+                    "sampling_point_id", "surveyor_id", "tree_species_id", "survey_date",
+                    "dbh_cm", "circumference_cm", "height_m", "biomass", "description",
+                    "latitude", "longitude", "geom", "status",
+                ],
+                out
+            )
+        self.trees_created += len(out)
+
+    def result(self, elapsed: float) -> dict:
+        return {
+            "project_id": self.project_id,
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "points_created": self.points_created,
+            "trees_created": self.trees_created,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+            "errors_truncated": self.error_count > len(self.errors),
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.rows / elapsed) if elapsed > 0 else None,
+        }
+
+
+def run_import(importer: Importer, fileobj, fmt: str, batch: int = IMPORT_BATCH) -> dict:
+    """
+    Baca file per batch dan masukkan ke importer. Caller yang commit
+    (satu transaksi untuk seluruh file).
+    """
+    started = time.perf_counter()
+
+    for rows in READERS[fmt](fileobj, batch):
+        importer.feed(rows)
+
+    return importer.result(time.perf_counter() - started)
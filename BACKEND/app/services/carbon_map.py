@@ -0,0 +1,182 @@
+import os
+from concurrent.futures import as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import shapely
+from dotenv import load_dotenv
+
+from app.services import features as feature_set
+from app.services.process_pool import get_pool
+from app.services.raster import LocalScene
+
+load_dotenv()
+
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", "outputs"))
+
+# Ukuran window prediksi (kelipatan block GeoTIFF)
+WINDOW = 512
+BLOCK = 256
+
+# Raster strata opsional di folder scene (kode integer per pixel)
+STRATA_BAND = "STRATA"
+
+
+def _windows(height: int, width: int, bounds_px):
+    r0, r1, c0, c1 = bounds_px
+    for row in range(r0 - r0 % WINDOW, r1, WINDOW):
+        for col in range(c0 - c0 % WINDOW, c1, WINDOW):
+            yield row, col, min(WINDOW, height - row), min(WINDOW, width - col)
+
+
+def _predict_window(scene_id, row, col, h, w, features, predictor, aoi_wkb):
+    """
+    Dijalankan di worker: buka memmap sendiri, hitung feature per pixel,
+    terapkan model, mask AOI, dan jumlahkan AGB per stratum.
+    """
+    scene = LocalScene(scene_id)
+    aoi = shapely.from_wkb(aoi_wkb)
+    shapely.prepare(aoi)
+
+    raw = {
+        b: np.asarray(scene.band(b)[row:row + h, col:col + w], dtype=np.float64)
+        for b in feature_set.required_bands(features)
+    }
+
+    valid = np.ones((h, w), dtype=bool)
+    for arr in raw.values():
+        valid &= np.isfinite(arr)
+        if scene.nodata is not None:
+            valid &= arr != scene.nodata
+
+    # pusat pixel di dalam AOI
+    xs = scene.x0 + (np.arange(col, col + w) + 0.5) * scene.dx
+    ys = scene.y0 + (np.arange(row, row + h) + 0.5) * scene.dy
+    gx, gy = np.meshgrid(xs, ys)
+    valid &= shapely.contains_xy(aoi, gx, gy)
+
+    feats = feature_set.compute_features(raw, features)
+    X = np.stack([feats[name] for name in features], axis=-1).reshape(h * w, len(features))
+
+    valid &= np.isfinite(X).all(axis=1).reshape(h, w)
+
+    # model hanya dievaluasi pada pixel valid
+    pred = np.full((h, w), np.nan, dtype=np.float32)
+    pred[valid] = np.clip(predictor.predict(X[valid.ravel()]), 0, None)
+
+    pixel_area = abs(scene.dx * scene.dy)
+
+    try:
+        strata = np.asarray(scene.band(STRATA_BAND)[row:row + h, col:col + w], dtype=np.int64)
+    except FileNotFoundError:
+        strata = np.zeros((h, w), dtype=np.int64)
+
+    codes = strata[valid]
+    agb = pred[valid].astype(np.float64) * pixel_area
+
+    totals = {}
+    if codes.size:
+        uniq, inv = np.unique(codes, return_inverse=True)
+        sums = np.bincount(inv, weights=agb)
+        counts = np.bincount(inv)
+        totals = {
+            int(u): (int(c), float(s))
+            for u, c, s in zip(uniq, counts, sums)
+        }
+
+    return row, col, pred, totals
+
+
+def predict_local_map(scene: LocalScene, aoi_wkb: bytes, features: list[str], predictor, name: str):
+    """
+    Peta AGB (kg/m²) per window secara paralel, ditulis ke GeoTIFF
+    tiled + deflate saat hasil window datang (memori terbatas).
+    Return (path, stats).
+    """
+    import rasterio
+    from rasterio.transform import Affine
+    from rasterio.windows import Window
+
+    aoi = shapely.from_wkb(aoi_wkb)
+
+    height, width = scene.band(feature_set.required_bands(features)[0]).shape
+
+    # batasi window ke bbox AOI
+    minx, miny, maxx, maxy = aoi.bounds
+    cols = sorted(np.floor((np.array([minx, maxx]) - scene.x0) / scene.dx).astype(int))
+    rows = sorted(np.floor((np.array([miny, maxy]) - scene.y0) / scene.dy).astype(int))
+    bounds_px = (
+        max(rows[0], 0), min(rows[1] + 1, height),
+        max(cols[0], 0), min(cols[1] + 1, width),
+    )
+
+    if bounds_px[0] >= bounds_px[1] or bounds_px[2] >= bounds_px[3]:
+        raise ValueError("AOI tidak berada di dalam scene")
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    path = OUTPUT_DIR / f"{name}_{datetime.now():%Y%m%d%H%M%S}.tif"
+
+    profile = {
+        "driver": "GTiff",
+        "height": height,
+        "width": width,
+        "count": 1,
+        "dtype": "float32",
+        "nodata": float("nan"),
+        "crs": f"EPSG:{scene.srid}",
+        "transform": Affine(scene.dx, 0, scene.x0, 0, scene.dy, scene.y0),
+        "tiled": True,
+        "blockxsize": BLOCK,
+        "blockysize": BLOCK,
+        "compress": "deflate",
+        "predictor": 3,
+        "BIGTIFF": "IF_SAFER",
+    }
+
+    pool = get_pool()
+    totals = {}
+
+    with rasterio.open(path, "w", **profile) as dst:
+        futures = [
+            pool.submit(
+                _predict_window,
+                scene.scene_id, row, col, h, w,
+                features, predictor, aoi_wkb
+            )
+            for row, col, h, w in _windows(height, width, bounds_px)
+        ]
+
+        for fut in as_completed(futures):
+            row, col, pred, window_totals = fut.result()
+
+            dst.write(pred, 1, window=Window(col, row, pred.shape[1], pred.shape[0]))
+
+            for code, (count, agb) in window_totals.items():
+                prev = totals.get(code, (0, 0.0))
+                totals[code] = (prev[0] + count, prev[1] + agb)
+
+    pixel_area = abs(scene.dx * scene.dy)
+
+    strata = [
+        {
+            "stratum": code,
+            "pixels": count,
+            "area_ha": count * pixel_area / 10_000,
+            "agb_t": agb / 1000,
+            "agb_t_per_ha": (agb / 1000) / (count * pixel_area / 10_000) if count else None,
+        }
+        for code, (count, agb) in sorted(totals.items())
+    ]
+
+    stats = {
+        "scene_id": scene.scene_id,
+        "image_id": scene.image_id,
+        "srid": scene.srid,
+        "pixel_area_m2": pixel_area,
+        "total_agb_t": sum(s["agb_t"] for s in strata),
+        "total_area_ha": sum(s["area_ha"] for s in strata),
+        "strata": strata,
+    }
+
+    return path, stats
@@ -0,0 +1,332 @@
+import base64
+
+import numpy as np
+
+from app.services.regression import fit_linear_regression, predict as linear_predict, metrics
+
+# ===============================
+# CARBON MODEL TYPES (PLUGIN)
+# ===============================
+# Setiap model type punya:
+#   options                     -> {nama option: tipe} yang diterima fit
+#   check_options(opts)         -> ValueError bila nilai option di luar batas
+#   fit(X, y, features, **opts) -> params (JSON, disimpan di project_models.params)
+#   load(params, features)      -> predictor dengan predict(X) vectorized
+#
+# Router training meneruskan query param lain sebagai option mentah lewat
+# parse_options, jadi model type baru tidak perlu mengubah router.
+#
+# Predictor hanya berisi array numpy sehingga bisa dikirim ke process
+# pool (peta lokal per window).
+
+# Baris per blok saat traversal tree (n_rows x n_trees index)
+_PREDICT_CHUNK = 8192
+
+
+def _pack(arr: np.ndarray) -> dict:
+    arr = np.ascontiguousarray(arr)
+    return {
+        "dtype": arr.dtype.str,
+        "data": base64.b64encode(arr.tobytes()).decode("ascii"),
+    }
+
+
+def _unpack(obj: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(obj["data"]), dtype=np.dtype(obj["dtype"]))
+
+
+# ===============================
+# LINEAR REGRESSION
+# ===============================
+class LinearPredictor:
+    def __init__(self, intercept: float, coefs):
+        self.intercept = float(intercept)
+        self.coefs = np.asarray(coefs, dtype=np.float64)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.coefs))
+        return linear_predict(X, self.intercept, self.coefs)
+
+
+class LinearRegressionType:
+    name = "linear_regression"
+    options = {"ridge": float}
+
+    def check_options(self, opts: dict):
+        if not opts.get("ridge", 0.0) >= 0:
+            raise ValueError("ridge harus >= 0")
+
+    def fit(self, X, y, features: list[str], ridge: float = 0.0) -> dict:
+        intercept, coefs = fit_linear_regression(X, y, ridge=ridge)
+        return {
+            "intercept": intercept,
+            "coefficients": dict(zip(features, coefs)),
+            "ridge": ridge,
+        }
+
+    def load(self, params: dict, features: list[str]) -> LinearPredictor:
+        coef_map = params["coefficients"]
+        return LinearPredictor(
+            params["intercept"],
+            [float(coef_map[f]) for f in features]
+        )
+
+
+# ===============================
+# RANDOM FOREST (NUMPY)
+# ===============================
+# Semua tree disimpan sebagai array node datar:
+#   feature   int16   (-1 = leaf)
+#   threshold float32 (leaf = +inf)
+#   left      int32   index absolut anak kiri; anak kanan = left + 1,
+#                     leaf menunjuk dirinya sendiri
+#   value     float32 rata-rata y di node
+# roots: index node akar tiap tree.
+class ForestPredictor:
+    def __init__(self, roots, feature, threshold, left, value, depth: int):
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.feature = np.asarray(feature, dtype=np.int64)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int64)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.depth = int(depth)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1)
+        k = X.shape[1]
+        out = np.empty(len(X))
+
+        for start in range(0, len(X), _PREDICT_CHUNK):
+            Xc = np.ascontiguousarray(X[start:start + _PREDICT_CHUNK])
+            flat = Xc.ravel()
+            base = (np.arange(len(Xc)) * k)[:, None]
+
+            # semua baris x semua tree maju satu level per iterasi;
+            # leaf menunjuk dirinya sendiri dan threshold +inf -> diam
+            node = np.broadcast_to(self.roots, (len(Xc), len(self.roots)))
+            for _ in range(self.depth):
+                go_right = np.take(flat, base + self.feature[node]) > self.threshold[node]
+                node = self.left[node] + go_right
+
+            out[start:start + _PREDICT_CHUNK] = self.value[node].mean(axis=1)
+
+        return out
+
+
+def _best_split(X, y, candidates, min_leaf: int):
+    """
+    Split terbaik (minimum SSE) di antara kolom candidates.
+    Return (feature, threshold float32) atau None.
+    """
+    n = len(y)
+    best = None
+    best_score = -np.inf
+
+    left_n = np.arange(1, n)
+    right_n = n - left_n
+    allowed = (left_n >= min_leaf) & (right_n >= min_leaf)
+
+    for f in candidates:
+        order = np.argsort(X[:, f], kind="stable")
+        xs = X[order, f]
+        ys = y[order]
+
+        cs = np.cumsum(ys)[:-1]
+        total = cs[-1] + ys[-1]
+
+        # SSE minimum <=> sum_L^2/n_L + sum_R^2/n_R maksimum
+        score = cs * cs / left_n + (total - cs) ** 2 / right_n
+        score = np.where(allowed & (xs[1:] > xs[:-1]), score, -np.inf)
+
+        i = int(np.argmax(score))
+        if score[i] > best_score:
+            best_score = score[i]
+            best = (f, np.float32((xs[i] + xs[i + 1]) / 2))
+
+    return best
+
+
+def _build_tree(X, y, max_depth: int, min_leaf: int, max_features: int, rng, nodes: dict):
+    """
+    Tambahkan satu tree ke nodes (list per kolom). Return index root.
+    """
+    k = X.shape[1]
+
+    def new_node(val):
+        nodes["feature"].append(-1)
+        nodes["threshold"].append(np.inf)
+        nodes["left"].append(len(nodes["value"]))
+        nodes["value"].append(val)
+        return len(nodes["value"]) - 1
+
+    root = new_node(float(y.mean()))
+    stack = [(root, np.arange(len(y)), 0)]
+
+    while stack:
+        nid, idx, depth = stack.pop()
+        yi = y[idx]
+
+        if depth >= max_depth or len(idx) < 2 * min_leaf or np.ptp(yi) == 0:
+            continue
+
+        candidates = rng.choice(k, size=min(max_features, k), replace=False)
+        split = _best_split(X[idx], yi, candidates, min_leaf)
+        if split is None:
+            continue
+
+        f, thr = split
+        go_left = X[idx, f] <= thr
+        li, ri = idx[go_left], idx[~go_left]
+        if len(li) == 0 or len(ri) == 0:
+            continue
+
+        # anak kanan selalu tepat setelah anak kiri
+        left = new_node(float(y[li].mean()))
+        new_node(float(y[ri].mean()))
+
+        nodes["feature"][nid] = int(f)
+        nodes["threshold"][nid] = thr
+        nodes["left"][nid] = left
+
+        stack.append((left, li, depth + 1))
+        stack.append((left + 1, ri, depth + 1))
+
+    return root
+
+
+class RandomForestType:
+    name = "random_forest"
+    options = {"n_trees": int, "max_depth": int, "min_leaf": int, "max_features": int, "seed": int}
+
+    def check_options(self, opts: dict):
+        if not 1 <= opts.get("n_trees", 100) <= 1000:
+            raise ValueError("n_trees harus 1-1000")
+        if not 1 <= opts.get("max_depth", 10) <= 30:
+            raise ValueError("max_depth harus 1-30")
+        if opts.get("min_leaf", 3) < 1:
+            raise ValueError("min_leaf harus >= 1")
+        if opts.get("max_features", 1) < 1:
+            raise ValueError("max_features harus >= 1")
+
+    def fit(
+        self,
+        X,
+        y,
+        features: list[str],
+        n_trees: int = 100,
+        max_depth: int = 10,
+        min_leaf: int = 3,
+        max_features: int | None = None,
+        seed: int = 0,
+    ) -> dict:
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n, k = X.shape
+
+        if n < 2 * min_leaf:
+            raise ValueError("Data terlalu sedikit untuk random forest")
+
+        max_features = max_features or max(1, k // 3)
+        rng = np.random.default_rng(seed)
+
+        nodes = {"feature": [], "threshold": [], "left": [], "value": []}
+        roots = []
+
+        for _ in range(n_trees):
+            sample = rng.integers(0, n, size=n)
+            roots.append(_build_tree(X[sample], y[sample], max_depth, min_leaf, max_features, rng, nodes))
+
+        return {
+            "n_trees": n_trees,
+            "max_depth": max_depth,
+            "min_leaf": min_leaf,
+            "max_features": max_features,
+            "seed": seed,
+            "nodes": len(nodes["value"]),
+            "trees": {
+                "roots": _pack(np.array(roots, dtype=np.int32)),
+                "feature": _pack(np.array(nodes["feature"], dtype=np.int16)),
+                "threshold": _pack(np.array(nodes["threshold"], dtype=np.float32)),
+                "left": _pack(np.array(nodes["left"], dtype=np.int32)),
+                "value": _pack(np.array(nodes["value"], dtype=np.float32)),
+            },
+        }
+
+    def load(self, params: dict, features: list[str]) -> ForestPredictor:
+        trees = params["trees"]
+        return ForestPredictor(
+            _unpack(trees["roots"]),
+            _unpack(trees["feature"]),
+            _unpack(trees["threshold"]),
+            _unpack(trees["left"]),
+            _unpack(trees["value"]),
+            depth=params["max_depth"],
+        )
+
+
+MODEL_TYPES = {
+    t.name: t for t in (LinearRegressionType(), RandomForestType())
+}
+
+
+def get_type(name: str):
+    if name not in MODEL_TYPES:
+        raise ValueError(f"Model type tidak dikenali: {name}")
+    return MODEL_TYPES[name]
+
+
+def parse_options(model_type, raw: dict) -> dict:
+    """
+    Option mentah (string dari query) -> kwargs fit yang sudah dicek.
+    """
+    unknown = sorted(set(raw) - set(model_type.options))
+    if unknown:
+        raise ValueError(f"Option tidak dikenali untuk {model_type.name}: {', '.join(unknown)}")
+
+    opts = {}
+    for name, value in raw.items():
+        kind = model_type.options[name]
+        try:
+            opts[name] = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} harus berupa {kind.__name__}")
+
+    model_type.check_options(opts)
+    return opts
+
+
+def kfold_cv(model_type, X, y, features: list[str], folds: int = 5, seed: int = 0, **opts):
+    """
+    K-fold cross-validation untuk model type apa pun (format hasil sama
+    dengan regression.kfold_cv).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+
+    folds = min(folds, n)
+    if folds < 2:
+        raise ValueError("Butuh minimal 2 fold")
+
+    order = np.random.default_rng(seed).permutation(n)
+    y_oof = np.empty(n)
+    fold_rmse = []
+
+    for test_idx in np.array_split(order, folds):
+        train_mask = np.ones(n, dtype=bool)
+        train_mask[test_idx] = False
+
+        params = model_type.fit(X[train_mask], y[train_mask], features, **opts)
+        y_oof[test_idx] = model_type.load(params, features).predict(X[test_idx])
+
+        fold_rmse.append(metrics(y[test_idx], y_oof[test_idx])[1])
+
+    r2, rmse = metrics(y, y_oof)
+
+    return {
+        "folds": folds,
+        "r_squared": r2,
+        "rmse": rmse,
+        "fold_rmse": fold_rmse,
+    }
@@ -0,0 +1,356 @@
+from sqlalchemy import text
+
+# ===============================
+# PROJECT CARBON STOCK ROLLUPS
+# ===============================
+# Pola pemakaian setiap kali survey / status / lokasi titik berubah:
+#
+#   ... UPDATE sampling_points / surveys ...
+#   carbon_rollup.refresh_points(db, project_id, [point_id])
+#   db.commit()
+#
+# Kontribusi titik dihitung ulang dari surveys (hanya titik itu) dan
+# rollup project di-update dengan delta (kontribusi lama dikurangi, yang
+# baru ditambah). Titik yang dihapus (kontribusinya ikut cascade):
+# refresh_points(db, project_id, []) -> rollup di-group ulang dari tabel
+# kontribusi (satu baris per titik, bukan per pohon).
+#
+# Semua refresh satu project diserialkan dengan advisory lock transaksi,
+# dilepas saat caller commit / rollback.
+
+# IPCC default carbon fraction of dry biomass
+CARBON_FRACTION = 0.47
+
+# CO2 / C molecular weight ratio
+CO2E_PER_C = 44.0 / 12.0
+
+# Sub-area: grid 1 km di EPSG:3857
+CELL_SIZE_M = 1000
+
+# Namespace pg_advisory_xact_lock(key1, key2) untuk refresh rollup
+_LOCK_NAMESPACE = 7301
+
+
+def _lock(db, project_id: str):
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:ns, hashtext(:pid))"),
+        {"ns": _LOCK_NAMESPACE, "pid": str(project_id)}
+    )
+
+
+def _refresh_contributions(db, project_id: str, point_ids):
+    params = {
+        "pid": project_id,
+        "ids": point_ids,
+        "cell": CELL_SIZE_M,
+    }
+
+    # titik yang sudah dihapus ikut ter-cascade; sisanya ditulis ulang
+    db.execute(
+        text("""
+            DELETE FROM project_point_species_carbon
+            WHERE sampling_point_id = ANY(CAST(:ids AS integer[]))
+        """),
+        params
+    )
+
+    db.execute(
+        text("""
+            INSERT INTO project_point_carbon (
+                sampling_point_id, project_id, survey_status,
+                cell_x, cell_y, tree_count, agb_kg, updated_at
+            )
+            SELECT
+                sp.id,
+                sp.project_id,
+                sp.survey_status::text,
+                floor(ST_X(ST_Transform(sp.geom, 3857)) / :cell)::int,
+                floor(ST_Y(ST_Transform(sp.geom, 3857)) / :cell)::int,
+                COALESCE(s.trees, 0),
+                COALESCE(s.agb, 0),
+                NOW()
+            FROM sampling_points sp
+            LEFT JOIN (
+                SELECT sampling_point_id, COUNT(*) AS trees, SUM(biomass) AS agb
+                FROM surveys
+                WHERE sampling_point_id = ANY(CAST(:ids AS integer[]))
+                GROUP BY sampling_point_id
+            ) s ON s.sampling_point_id = sp.id
+            WHERE sp.id = ANY(CAST(:ids AS integer[]))
+              AND sp.project_id = :pid
+            ON CONFLICT (sampling_point_id) DO UPDATE
+            SET survey_status = EXCLUDED.survey_status,
+                cell_x = EXCLUDED.cell_x,
+                cell_y = EXCLUDED.cell_y,
+                tree_count = EXCLUDED.tree_count,
+                agb_kg = EXCLUDED.agb_kg,
+                updated_at = NOW()
+        """),
+        params
+    )
+
+    db.execute(
+        text("""
+            INSERT INTO project_point_species_carbon (
+                sampling_point_id, project_id, tree_species_id, tree_count, agb_kg
+            )
+            SELECT
+                s.sampling_point_id,
+                sp.project_id,
+                s.tree_species_id,
+                COUNT(*),
+                COALESCE(SUM(s.biomass), 0)
+            FROM surveys s
+            JOIN sampling_points sp ON sp.id = s.sampling_point_id
+            WHERE s.sampling_point_id = ANY(CAST(:ids AS integer[]))
+              AND sp.project_id = :pid
+            GROUP BY s.sampling_point_id, sp.project_id, s.tree_species_id
+        """),
+        params
+    )
+
+
+def _dimension_rows(point_filter: str) -> str:
+    """
+    Baris (dimension, key, points, trees, agb) dari tabel kontribusi,
+    dibatasi point_filter (kondisi pada pc / ps).
+    """
+    return f"""
+        SELECT 'total' AS dimension, 'approved' AS key,
+               COUNT(*) AS points, SUM(tree_count) AS trees, SUM(agb_kg) AS agb
+        FROM project_point_carbon pc
+        WHERE {point_filter.format(t="pc")} AND survey_status = 'approved'
+
+        UNION ALL
+
+        SELECT 'status', COALESCE(survey_status, 'unknown'),
+               COUNT(*), SUM(tree_count), SUM(agb_kg)
+        FROM project_point_carbon pc
+        WHERE {point_filter.format(t="pc")}
+        GROUP BY survey_status
+
+        UNION ALL
+
+        SELECT 'cell', cell_x || ':' || cell_y,
+               COUNT(*), SUM(tree_count), SUM(agb_kg)
+        FROM project_point_carbon pc
+        WHERE {point_filter.format(t="pc")} AND survey_status = 'approved'
+        GROUP BY cell_x, cell_y
+
+        UNION ALL
+
+        SELECT 'species', ps.tree_species_id::text,
+               COUNT(*), SUM(ps.tree_count), SUM(ps.agb_kg)
+        FROM project_point_species_carbon ps
+        JOIN project_point_carbon pc
+          ON pc.sampling_point_id = ps.sampling_point_id
+        WHERE {point_filter.format(t="ps")} AND pc.survey_status = 'approved'
+        GROUP BY ps.tree_species_id
+    """
+
+
+_PROJECT_FILTER = "{t}.project_id = :pid"
+_POINTS_FILTER = "{t}.sampling_point_id = ANY(CAST(:ids AS integer[]))"
+
+
+def _rollup_params(project_id: str, **extra) -> dict:
+    return {
+        "pid": project_id,
+        "cf": CARBON_FRACTION,
+        "co2": CARBON_FRACTION * CO2E_PER_C,
+        **extra,
+    }
+
+
+def _rebuild_rollup(db, project_id: str):
+    params = _rollup_params(project_id)
+
+    db.execute(
+        text("DELETE FROM project_carbon_rollup WHERE project_id = :pid"),
+        params
+    )
+
+    db.execute(
+        text(f"""
+            INSERT INTO project_carbon_rollup (
+                project_id, dimension, key, points, trees,
+                agb_kg, carbon_kg, co2e_kg, updated_at
+            )
+            SELECT :pid, dimension, key, points,
+                   COALESCE(trees, 0),
+                   COALESCE(agb, 0),
+                   COALESCE(agb, 0) * :cf,
+                   COALESCE(agb, 0) * :co2,
+                   NOW()
+            FROM ({_dimension_rows(_PROJECT_FILTER)}) r
+        """),
+        params
+    )
+
+
+def _apply_delta(db, project_id: str, point_ids: list[int], sign: int):
+    """
+    Tambah (sign=1) / kurangi (sign=-1) kontribusi titik-titik ini ke rollup.
+    """
+    db.execute(
+        text(f"""
+            INSERT INTO project_carbon_rollup (
+                project_id, dimension, key, points, trees,
+                agb_kg, carbon_kg, co2e_kg, updated_at
+            )
+            SELECT :pid, dimension, key,
+                   :sign * points,
+                   :sign * COALESCE(trees, 0),
+                   :sign * COALESCE(agb, 0),
+                   :sign * COALESCE(agb, 0) * :cf,
+                   :sign * COALESCE(agb, 0) * :co2,
+                   NOW()
+            FROM ({_dimension_rows(_POINTS_FILTER)}) r
+            ON CONFLICT (project_id, dimension, key) DO UPDATE
+            SET points = project_carbon_rollup.points + EXCLUDED.points,
+                trees = project_carbon_rollup.trees + EXCLUDED.trees,
+                agb_kg = project_carbon_rollup.agb_kg + EXCLUDED.agb_kg,
+                carbon_kg = project_carbon_rollup.carbon_kg + EXCLUDED.carbon_kg,
+                co2e_kg = project_carbon_rollup.co2e_kg + EXCLUDED.co2e_kg,
+                updated_at = NOW()
+        """),
+        _rollup_params(project_id, ids=point_ids, sign=sign)
+    )
+
+
+def _has_rollup(db, project_id: str) -> bool:
+    return db.execute(
+        text("""
+            SELECT 1 FROM project_carbon_rollup
+            WHERE project_id = :pid AND dimension = 'total'
+        """),
+        {"pid": project_id}
+    ).scalar() is not None
+
+
+def refresh_points(db, project_id: str, point_ids):
+    """
+    Hitung ulang kontribusi titik-titik ini dan terapkan selisihnya ke
+    rollup project. point_ids kosong (titik dihapus): rollup di-group
+    ulang dari kontribusi. Caller yang commit.
+    """
+    _lock(db, project_id)
+
+    point_ids = [int(i) for i in point_ids]
+    if not point_ids:
+        _rebuild_rollup(db, project_id)
+        return
+
+    # rollup belum pernah dibangun: delta saja tidak cukup
+    if not _has_rollup(db, project_id):
+        refresh_project(db, project_id)
+        return
+
+    _apply_delta(db, project_id, point_ids, -1)
+    _refresh_contributions(db, project_id, point_ids)
+    _apply_delta(db, project_id, point_ids, 1)
+
+    # status / sel / spesies yang sudah tidak punya titik
+    db.execute(
+        text("""
+            DELETE FROM project_carbon_rollup
+            WHERE project_id = :pid
+              AND dimension <> 'total'
+              AND points <= 0
+        """),
+        {"pid": project_id}
+    )
+
+
+def refresh_project(db, project_id: str):
+    """
+    Bangun ulang semua kontribusi project (pertama kali / perbaikan data).
+    """
+    _lock(db, project_id)
+
+    db.execute(
+        text("DELETE FROM project_point_carbon WHERE project_id = :pid"),
+        {"pid": project_id}
+    )
+
+    ids = db.execute(
+        text("SELECT id FROM sampling_points WHERE project_id = :pid"),
+        {"pid": project_id}
+    ).scalars().all()
+
+    if ids:
+        _refresh_contributions(db, project_id, ids)
+    _rebuild_rollup(db, project_id)
+
+
+def summary(db, project_id: str) -> dict:
+    rows = db.execute(
+        text("""
+            SELECT
+                r.dimension,
+                r.key,
+                r.points,
+                r.trees,
+                r.agb_kg,
+                r.carbon_kg,
+                r.co2e_kg,
+                r.updated_at,
+                ts.local_name,
+                ts.scientific_name
+            FROM project_carbon_rollup r
+            LEFT JOIN tree_species ts
+              ON r.dimension = 'species'
+             AND ts.id = CASE WHEN r.dimension = 'species' THEN r.key::int END
+            WHERE r.project_id = :pid
+            ORDER BY r.dimension, r.agb_kg DESC
+        """),
+        {"pid": project_id}
+    ).mappings().all()
+
+    if not rows:
+        return None
+
+    out = {
+        "total": None,
+        "by_status": [],
+        "by_species": [],
+        "by_cell": [],
+        "updated_at": None,
+    }
+
+    def values(r):
+        return {
+            "points": r["points"],
+            "trees": r["trees"],
+            "agb_t": r["agb_kg"] / 1000,
+            "carbon_t": r["carbon_kg"] / 1000,
+            "co2e_t": r["co2e_kg"] / 1000,
+        }
+
+    for r in rows:
+        out["updated_at"] = max(filter(None, [out["updated_at"], r["updated_at"]]), default=None)
+
+        if r["dimension"] == "total":
+            out["total"] = values(r)
+        elif r["dimension"] == "status":
+            out["by_status"].append({"status": r["key"], **values(r)})
+        elif r["dimension"] == "species":
+            out["by_species"].append({
+                "tree_species_id": int(r["key"]),
+                "local_name": r["local_name"],
+                "scientific_name": r["scientific_name"],
+                **values(r),
+            })
+        elif r["dimension"] == "cell":
+            cx, cy = (int(v) for v in r["key"].split(":"))
+            out["by_cell"].append({
+                "cell": r["key"],
+                # bbox sel dalam EPSG:3857
+                "bbox_3857": [
+                    cx * CELL_SIZE_M, cy * CELL_SIZE_M,
+                    (cx + 1) * CELL_SIZE_M, (cy + 1) * CELL_SIZE_M,
+                ],
+                **values(r),
+            })
+
+    return out
@@ -0,0 +1,312 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+# ===============================
+# STREAMING EXPORT HELPERS
+# ===============================
+# Generator di sini membuka session sendiri: dependency get_db sudah
+# ditutup sebelum StreamingResponse selesai mengirim body.
+
+# Baris per fetch dari server-side cursor
+EXPORT_BATCH = 5_000
+
+# Tipe kolom export: "int" | "float" | "str" | "date" | "timestamp" | "json"
+_ARROW_TYPES = {
+    "int": "int64",
+    "float": "float64",
+    "str": "string",
+    "date": "date32",
+    "timestamp": "timestamp",
+    "json": "string",
+}
+
+
+class ChunkSink:
+    """
+    File-like tulis-saja (tidak bisa seek) untuk writer yang butuh file
+    (pyarrow, zipfile). Data yang sudah ditulis diambil lewat drain()
+    dan dikirim sebagai chunk response.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seekable(self) -> bool:
+        return False
+
+    def writable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def select_columns(available: dict, requested: str | None, default: list[str]) -> list[str]:
+    """
+    ?columns=a,b,c -> daftar kolom valid (urutan sesuai request).
+    """
+    if not requested:
+        return list(default)
+
+    names = [c.strip() for c in requested.split(",") if c.strip()]
+    unknown = [c for c in names if c not in available]
+    if unknown:
+        raise ValueError(f"Kolom tidak dikenali: {', '.join(unknown)}")
+    return names
+
+
+def stream_batches(sql: str, params: dict, batch: int = EXPORT_BATCH, session_factory=SessionLocal):
+    """
+    Baris hasil query per batch (list of dict) lewat server-side cursor,
+    memori dibatasi satu batch. session_factory: mis. read_session_factory()
+    untuk membaca dari replika.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(
+            text(sql).execution_options(stream_results=True, yield_per=batch),
+            params
+        )
+        for part in result.mappings().partitions(batch):
+            yield [dict(r) for r in part]
+    finally:
+        db.close()
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+# ===============================
+# DATASETS
+# ===============================
+# nama kolom -> (ekspresi SQL, tipe export)
+POINT_COLUMNS = {
+    "sampling_point_id": ("sp.id", "int"),
+    "status": ("sp.status", "str"),
+    "survey_status": ("sp.survey_status::text", "str"),
+    "approval_status": ("sp.approval_status::text", "str"),
+    "survey_ids": ("s.survey_ids", "str"),
+    "survey_count": ("COALESCE(s.survey_count, 0)", "int"),
+    "ndvi": ("sp.ndvi", "float"),
+    "evi": ("sp.evi", "float"),
+    "b4": ("sp.b4", "float"),
+    "b8": ("sp.b8", "float"),
+    "features": ("f.features", "json"),
+    "latitude": ("COALESCE(sp.latitude, ST_Y(sp.geom))", "float"),
+    "longitude": ("COALESCE(sp.longitude, ST_X(sp.geom))", "float"),
+    "start_date": ("sp.start_date", "date"),
+    "end_date": ("sp.end_date", "date"),
+    "sentinel_date": ("sp.sentinel_date", "date"),
+    "sentinel_image_id": ("sp.sentinel_image_id", "str"),
+    "plot_radius_m": ("sp.plot_radius_m", "float"),
+    "agb_kg_per_m2": ("sp.agb_kg_per_m2", "float"),
+    "total_biomass": ("COALESCE(s.total_biomass, 0)", "float"),
+}
+
+# sama dengan kolom /feature-report
+DEFAULT_POINT_COLUMNS = [
+    "sampling_point_id", "survey_ids", "survey_count",
+    "ndvi", "evi", "b4", "b8",
+    "latitude", "longitude",
+    "start_date", "end_date", "sentinel_date",
+    "total_biomass",
+]
+
+SURVEY_COLUMNS = {
+    "survey_id": ("s.id", "int"),
+    "sampling_point_id": ("s.sampling_point_id", "int"),
+    "surveyor_id": ("s.surveyor_id::text", "str"),
+    "tree_species_id": ("s.tree_species_id", "int"),
+    "local_name": ("ts.local_name", "str"),
+    "scientific_name": ("ts.scientific_name", "str"),
+    "survey_date": ("s.survey_date", "date"),
+    "dbh_cm": ("s.dbh_cm", "float"),
+    "circumference_cm": ("s.circumference_cm", "float"),
+    "height_m": ("s.height_m", "float"),
+    "biomass": ("s.biomass", "float"),
+    "status": ("s.status::text", "str"),
+    "latitude": ("COALESCE(s.latitude, ST_Y(s.geom))", "float"),
+    "longitude": ("COALESCE(s.longitude, ST_X(s.geom))", "float"),
+    "description": ("s.description", "str"),
+    "created_at": ("s.created_at", "timestamp"),
+}
+
+DEFAULT_SURVEY_COLUMNS = list(SURVEY_COLUMNS)
+
+
+def _select_list(spec: dict, columns: list[str]) -> str:
+    return ",\n".join(f"{spec[c][0]} AS {c}" for c in columns)
+
+
+def feature_report_sql(columns: list[str], approved_only: bool = True) -> str:
+    """
+    Titik project + agregat survey per titik (pre-aggregated, tanpa
+    GROUP BY besar di join utama). Parameter: :project_id.
+    """
+    return f"""
+        SELECT
+            {_select_list(POINT_COLUMNS, columns)}
+        FROM sampling_points sp
+        LEFT JOIN (
+            SELECT
+                s.sampling_point_id,
+                STRING_AGG(s.id::text, ',' ORDER BY s.id) AS survey_ids,
+                COUNT(*) AS survey_count,
+                SUM(s.biomass) AS total_biomass
+            FROM surveys s
+            JOIN sampling_points p ON p.id = s.sampling_point_id
+            WHERE p.project_id = :project_id
+            GROUP BY s.sampling_point_id
+        ) s ON s.sampling_point_id = sp.id
+        LEFT JOIN sampling_point_features f
+          ON f.sampling_point_id = sp.id
+        WHERE sp.project_id = :project_id
+          {"AND sp.survey_status = 'approved'" if approved_only else ""}
+        ORDER BY sp.id
+    """
+
+
+def survey_detail_sql(columns: list[str], approved_only: bool = True) -> str:
+    """
+    Satu baris per pohon (survey). Parameter: :project_id.
+    """
+    return f"""
+        SELECT
+            {_select_list(SURVEY_COLUMNS, columns)}
+        FROM surveys s
+        JOIN sampling_points sp ON sp.id = s.sampling_point_id
+        LEFT JOIN tree_species ts ON ts.id = s.tree_species_id
+        WHERE sp.project_id = :project_id
+          {"AND sp.survey_status = 'approved'" if approved_only else ""}
+        ORDER BY s.sampling_point_id, s.id
+    """
+
+
+# ===============================
+# FORMATS
+# ===============================
+def csv_stream(columns: list[str], batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    writer.writerow(columns)
+    for rows in batches:
+        for r in rows:
+            writer.writerow(
+                json.dumps(v) if isinstance(v, (dict, list)) else _plain(v)
+                for v in (r[c] for c in columns)
+            )
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def parquet_stream(columns: list[str], types: dict, batches):
+    """
+    Satu row group per batch, ditulis ke ChunkSink dan langsung dikirim.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def arrow_type(kind):
+        if kind == "timestamp":
+            return pa.timestamp("us", tz="UTC")
+        return getattr(pa, _ARROW_TYPES[kind])()
+
+    schema = pa.schema([(c, arrow_type(types[c])) for c in columns])
+
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+
+    try:
+        for rows in batches:
+            data = {}
+            for c in columns:
+                vals = [r[c] for r in rows]
+                if types[c] == "json":
+                    vals = [json.dumps(v) if v is not None else None for v in vals]
+                elif types[c] == "float":
+                    vals = [float(v) if v is not None else None for v in vals]
+                data[c] = vals
+
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+def geojson_seq_stream(columns: list[str], batches, lon: str = "longitude", lat: str = "latitude"):
+    """
+    Newline-delimited GeoJSON Feature (satu feature per baris, .geojsonl).
+    Tanpa prefix RS (0x1E) RFC 8142, jadi disajikan sebagai NDJSON,
+    bukan application/geo+json-seq; GDAL (GeoJSONSeq) membaca keduanya.
+    """
+    for rows in batches:
+        lines = []
+        for r in rows:
+            geometry = None
+            if r.get(lon) is not None and r.get(lat) is not None:
+                geometry = {"type": "Point", "coordinates": [float(r[lon]), float(r[lat])]}
+
+            lines.append(json.dumps({
+                "type": "Feature",
+                "geometry": geometry,
+                "properties": {c: _plain(r[c]) for c in columns},
+            }, default=str))
+
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "geojsonseq": ("application/x-ndjson", "geojsonl"),
+}
+
+
+def render(fmt: str, columns: list[str], types: dict, batches):
+    if fmt == "csv":
+        return csv_stream(columns, batches)
+    if fmt == "parquet":
+        return parquet_stream(columns, types, batches)
+    return geojson_seq_stream(columns, batches)
@@ -0,0 +1,204 @@
+import ast
+import json
+
+import numpy as np
+from sqlalchemy import text
+
+# ===============================
+# FEATURE SET (single source of truth)
+# ===============================
+# Dipakai bersama oleh ekstraksi titik (GEE / scene lokal),
+# training model dan generate_carbon_map.
+
+# Sentinel-2 SR disimpan x10000, semua feature memakai reflectance 0–1
+S2_SCALE = 10000.0
+
+# feature -> band Sentinel-2
+BANDS = {
+    "b2": "B2",
+    "b3": "B3",
+    "b4": "B4",
+    "b8": "B8",
+    "b11": "B11",
+}
+
+# feature -> ekspresi dari feature band di atas
+INDICES = {
+    "ndvi": "(b8 - b4) / (b8 + b4)",
+    "evi": "2.5 * (b8 - b4) / (b8 + 6 * b4 - 7.5 * b2 + 1)",
+    "savi": "1.5 * (b8 - b4) / (b8 + b4 + 0.5)",
+    "ndmi": "(b8 - b11) / (b8 + b11)",
+}
+
+# Yang diekstrak per titik bila request tidak menyebut feature
+FEATURE_SET = ["ndvi", "evi", "savi", "ndmi", "b2", "b3", "b4", "b8", "b11"]
+
+# Default feature untuk training model
+MODEL_FEATURES = ["ndvi", "evi", "b4", "b8"]
+
+
+def _index_inputs(expr: str) -> set[str]:
+    tree = ast.parse(expr, mode="eval")
+    return {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+
+
+_INDEX_CODE = {name: compile(expr, f"<{name}>", "eval") for name, expr in INDICES.items()}
+
+
+def validate(names: list[str]) -> list[str]:
+    unknown = [n for n in names if n not in BANDS and n not in INDICES]
+    if unknown:
+        raise ValueError(f"Feature tidak dikenali: {', '.join(unknown)}")
+    if not names:
+        raise ValueError("Feature kosong")
+    return list(dict.fromkeys(names))
+
+
+def band_features(names: list[str]) -> list[str]:
+    """
+    Feature band (b2, b4, ...) yang dibutuhkan untuk menghitung `names`.
+    """
+    needed = set()
+    for n in names:
+        if n in BANDS:
+            needed.add(n)
+        else:
+            needed |= _index_inputs(INDICES[n])
+    return [b for b in BANDS if b in needed]
+
+
+def required_bands(names: list[str]) -> list[str]:
+    """
+    Nama band Sentinel-2 (B2, B4, ...) yang dibutuhkan untuk `names`.
+    """
+    return [BANDS[b] for b in band_features(names)]
+
+
+# ===============================
+# EARTH ENGINE
+# ===============================
+def feature_image(image, names: list[str]):
+    """
+    Satu ee.Image berisi semua feature (nama band = nama feature),
+    sehingga cukup satu reduksi per image.
+    """
+    import ee
+
+    bands = {
+        b: image.select(BANDS[b]).divide(S2_SCALE)
+        for b in band_features(names)
+    }
+
+    layers = []
+    for n in names:
+        if n in BANDS:
+            layers.append(bands[n].rename(n))
+        else:
+            layers.append(image.expression(INDICES[n], bands).rename(n))
+
+    return ee.Image.cat(layers)
+
+
+# ===============================
+# NUMPY (scene lokal / pixel window)
+# ===============================
+def compute_features(raw: dict[str, np.ndarray], names: list[str]) -> dict[str, np.ndarray]:
+    """
+    raw: band Sentinel-2 mentah (DN) per nama band, misal {"B4": arr, "B8": arr}
+    Hasil: feature per nama, NaN bila tidak terdefinisi (pembagian nol, dll).
+    """
+    scaled = {
+        b: np.asarray(raw[BANDS[b]], dtype=np.float64) / S2_SCALE
+        for b in band_features(names)
+    }
+
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for n in names:
+            if n in BANDS:
+                val = scaled[n]
+            else:
+                val = eval(_INDEX_CODE[n], {"__builtins__": {}}, scaled)
+            val = np.asarray(val, dtype=np.float64)
+            out[n] = np.where(np.isfinite(val), val, np.nan)
+
+    return out
+
+
+# ===============================
+# STORAGE
+# ===============================
+def save_point_features(
+    db,
+    ids: list[int],
+    rows: list[dict],
+    image_id: str,
+    sentinel_date,
+    cloud,
+):
+    """
+    Simpan feature per titik ke sampling_point_features (jsonb) dan
+    isi ulang kolom lama (ndvi, evi, b4, b8) yang masih dipakai halaman
+    list / feature report. b4/b8 lama tetap disimpan dalam DN.
+    """
+    if not ids:
+        return
+
+    payload = [json.dumps(r) for r in rows]
+
+    db.execute(
+        text("""
+            INSERT INTO sampling_point_features (
+                sampling_point_id,
+                features,
+                image_id,
+                sentinel_date,
+                extracted_at
+            )
+            SELECT v.id, CAST(v.features AS jsonb), :image_id, :img_date, NOW()
+            FROM unnest(
+                CAST(:ids AS integer[]),
+                CAST(:features AS text[])
+            ) AS v(id, features)
+            ON CONFLICT (sampling_point_id) DO UPDATE
+            SET features = EXCLUDED.features,
+                image_id = EXCLUDED.image_id,
+                sentinel_date = EXCLUDED.sentinel_date,
+                extracted_at = EXCLUDED.extracted_at
+        """),
+        {
+            "ids": ids,
+            "features": payload,
+            "image_id": image_id,
+            "img_date": sentinel_date,
+        }
+    )
+
+    db.execute(
+        text("""
+            UPDATE sampling_points sp
+            SET
+                -- ekstraksi subset fitur tidak menimpa kolom lama dengan NULL
+                ndvi = COALESCE(CAST(v.f ->> 'ndvi' AS double precision), sp.ndvi),
+                evi = COALESCE(CAST(v.f ->> 'evi' AS double precision), sp.evi),
+                b4 = COALESCE(CAST(v.f ->> 'b4' AS double precision) * :scale, sp.b4),
+                b8 = COALESCE(CAST(v.f ->> 'b8' AS double precision) * :scale, sp.b8),
+                sentinel_date = :img_date,
+                sentinel_cloud = :cloud,
+                sentinel_image_id = :image_id
+            FROM (
+                SELECT
+                    unnest(CAST(:ids AS integer[])) AS id,
+                    CAST(unnest(CAST(:features AS text[])) AS jsonb) AS f
+            ) v
+            WHERE sp.id = v.id
+        """),
+        {
+            "ids": ids,
+            "features": payload,
+            "scale": S2_SCALE,
+            "img_date": sentinel_date,
+            "cloud": round(cloud) if cloud is not None else None,
+            "image_id": image_id,
+        }
+    )
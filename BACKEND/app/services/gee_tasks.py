@@ -0,0 +1,185 @@
+import asyncio
+import os
+import logging
+import threading
+
+import ee
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Interval polling status task GEE (detik). 0 = poller mati.
+POLL_INTERVAL = int(os.getenv("GEE_TASK_POLL_SECONDS", "30"))
+
+ACTIVE_STATES = ("UNSUBMITTED", "READY", "RUNNING", "CANCEL_REQUESTED")
+
+
+class TaskTracker:
+    """
+    Background worker yang mengikuti export task GEE di project_outputs.
+
+    Setiap interval: ambil semua output yang belum selesai, satu panggilan
+    ee.data.getTaskList() untuk semua task, lalu update state, waktu dan
+    lokasi output. Client yang menunggu (long-poll, async) dibangunkan
+    lewat asyncio.Event di event loop-nya setiap ada perubahan state.
+    Hanya waiter di proses yang sama yang dibangunkan; dengan beberapa
+    worker, endpoint tetap membaca ulang database secara berkala.
+    """
+
+    def __init__(self, interval: int = POLL_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._waiters = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="gee-task-tracker",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            waiters = [w for ws in self._waiters.values() for w in ws]
+            self._waiters.clear()
+        self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # event loop sudah ditutup
+                pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Polling task GEE gagal")
+            self._stop.wait(self.interval)
+
+    def poll_once(self) -> int:
+        """
+        Satu siklus polling. Return jumlah output yang berubah state.
+        """
+        db = SessionLocal()
+        try:
+            pending = db.execute(
+                text("""
+                    SELECT id, gee_task_id, state
+                    FROM project_outputs
+                    WHERE gee_task_id IS NOT NULL
+                      AND (state IS NULL OR state IN ('UNSUBMITTED', 'READY', 'RUNNING', 'CANCEL_REQUESTED'))
+                """)
+            ).mappings().all()
+
+            if not pending:
+                return 0
+
+            # One call for every task of the service account
+            tasks = {t["id"]: t for t in ee.data.getTaskList()}
+
+            changed = []
+            for row in pending:
+                task = tasks.get(row["gee_task_id"])
+                if not task or task.get("state") == row["state"]:
+                    continue
+
+                finished = task["state"] not in ACTIVE_STATES
+                uris = task.get("destination_uris") or []
+
+                changed.append({
+                    "id": row["id"],
+                    "state": task["state"],
+                    "error": task.get("error_message"),
+                    "uri": uris[0] if uris else None,
+                    "started_ms": task.get("start_timestamp_ms"),
+                    "finished_ms": task.get("update_timestamp_ms") if finished else None,
+                })
+
+            if not changed:
+                return 0
+
+            db.execute(
+                text("""
+                    UPDATE project_outputs po
+                    SET
+                        state = v.state,
+                        error_message = v.error,
+                        uri = COALESCE(v.uri, po.uri),
+                        task_started_at = COALESCE(to_timestamp(v.started_ms / 1000.0), po.task_started_at),
+                        task_finished_at = to_timestamp(v.finished_ms / 1000.0),
+                        updated_at = NOW()
+                    FROM unnest(
+                        CAST(:ids AS bigint[]),
+                        CAST(:states AS text[]),
+                        CAST(:errors AS text[]),
+                        CAST(:uris AS text[]),
+                        CAST(:started AS double precision[]),
+                        CAST(:finished AS double precision[])
+                    ) AS v(id, state, error, uri, started_ms, finished_ms)
+                    WHERE po.id = v.id
+                """),
+                {
+                    "ids": [c["id"] for c in changed],
+                    "states": [c["state"] for c in changed],
+                    "errors": [c["error"] for c in changed],
+                    "uris": [c["uri"] for c in changed],
+                    "started": [c["started_ms"] for c in changed],
+                    "finished": [c["finished_ms"] for c in changed],
+                }
+            )
+            db.commit()
+
+            woken = []
+            with self._lock:
+                for c in changed:
+                    woken.extend(self._waiters.pop(c["id"], ()))
+            self._wake(woken)
+
+            return len(changed)
+
+        finally:
+            db.close()
+
+    async def wait_for_change(self, output_id: int, timeout: float) -> bool:
+        """
+        Tunggu (tanpa memblok thread) sampai poller proses ini meng-update
+        state output, atau timeout. Tidak ada cache state per proses: cache
+        itu basi bila worker lain yang menulis state, dan membuat waiter
+        langsung kembali terus-menerus. Perubahan yang terjadi sebelum
+        waiter terdaftar ditangkap caller dengan membaca ulang database.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(output_id, set()).add(waiter)
+
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(output_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[output_id]
+
+
+tracker = TaskTracker()
@@ -0,0 +1,323 @@
+from datetime import datetime
+
+import numpy as np
+import shapely
+from scipy.optimize import curve_fit
+from scipy.spatial import cKDTree
+
+from app.services.carbon_map import OUTPUT_DIR, BLOCK
+from app.services.regression import metrics
+
+# ===============================
+# SPATIAL INTERPOLATION (IDW / ORDINARY KRIGING)
+# ===============================
+# Semua koordinat dalam CRS metrik (UTM zona AOI). Grid diproses per
+# blok baris; setiap blok: satu query KD-tree (k tetangga) lalu bobot
+# dihitung vectorized (kriging: satu batched solve untuk semua cell).
+
+# Cell grid per blok (membatasi memori matriks kriging M x (k+1)^2)
+CHUNK_CELLS = 16_384
+
+# Batas ukuran grid (cell) per request
+MAX_CELLS = 50_000_000
+
+# Titik maksimum untuk semivariogram empiris (pasangan ~ n^2 / 2)
+_VARIOGRAM_POINTS = 2_000
+
+
+def utm_srid(lon: float, lat: float) -> int:
+    zone = int((lon + 180) // 6) + 1
+    return (32600 if lat >= 0 else 32700) + zone
+
+
+# ===============================
+# VARIOGRAM
+# ===============================
+def _spherical(h, nugget, sill, rng):
+    h = np.asarray(h, dtype=np.float64)
+    r = np.clip(h / rng, 0, 1)
+    return np.where(h > 0, nugget + sill * (1.5 * r - 0.5 * r ** 3), 0.0)
+
+
+def _exponential(h, nugget, sill, rng):
+    h = np.asarray(h, dtype=np.float64)
+    return np.where(h > 0, nugget + sill * (1 - np.exp(-3 * h / rng)), 0.0)
+
+
+VARIOGRAMS = {
+    "spherical": _spherical,
+    "exponential": _exponential,
+}
+
+
+def fit_variogram(xy, z, model: str = "spherical", bins: int = 15, seed: int = 0) -> dict:
+    """
+    Semivariogram empiris (binned) + fit nugget / partial sill / range.
+    """
+    xy = np.asarray(xy, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+
+    if len(z) > _VARIOGRAM_POINTS:
+        pick = np.random.default_rng(seed).choice(len(z), _VARIOGRAM_POINTS, replace=False)
+        xy, z = xy[pick], z[pick]
+
+    i, j = np.triu_indices(len(z), k=1)
+    d = np.hypot(xy[i, 0] - xy[j, 0], xy[i, 1] - xy[j, 1])
+    g = 0.5 * (z[i] - z[j]) ** 2
+
+    max_lag = d.max() / 2 if len(d) else 0.0
+    if max_lag <= 0:
+        raise ValueError("Titik terlalu sedikit / berimpit untuk variogram")
+
+    edges = np.linspace(0, max_lag, bins + 1)
+    which = np.digitize(d, edges) - 1
+    keep = (which >= 0) & (which < bins)
+
+    counts = np.bincount(which[keep], minlength=bins)
+    sums = np.bincount(which[keep], weights=g[keep], minlength=bins)
+    lags = np.bincount(which[keep], weights=d[keep], minlength=bins)
+
+    ok = counts > 0
+    lag = lags[ok] / counts[ok]
+    gamma = sums[ok] / counts[ok]
+
+    var = float(np.var(z)) or 1e-9
+    func = VARIOGRAMS[model]
+
+    try:
+        (nugget, sill, rng), _ = curve_fit(
+            func,
+            lag,
+            gamma,
+            p0=[0.1 * var, 0.9 * var, max_lag / 2],
+            bounds=([0, 0, 1e-6], [np.inf, np.inf, 10 * max_lag]),
+            sigma=1 / np.sqrt(counts[ok]),
+            maxfev=10_000,
+        )
+    except RuntimeError:
+        nugget, sill, rng = 0.0, var, max_lag / 2
+
+    return {
+        "model": model,
+        "nugget": float(nugget),
+        "sill": float(sill),
+        "range": float(rng),
+        "lags": lag.tolist(),
+        "gamma": gamma.tolist(),
+        "pairs": counts[ok].tolist(),
+    }
+
+
+# ===============================
+# ESTIMATORS (vectorized per blok)
+# ===============================
+def _idw(dist, vals, power: float):
+    with np.errstate(divide="ignore"):
+        w = 1.0 / dist ** power
+
+    # target tepat di titik: ambil nilai titik itu
+    exact = dist[:, 0] == 0
+    w[exact] = 0.0
+    w[exact, 0] = 1.0
+
+    return (w * vals).sum(axis=1) / w.sum(axis=1), None
+
+
+def _kriging(tree_xy, z, idx, dist, vario: dict):
+    """
+    Ordinary kriging dengan k tetangga per target.
+    Return (estimate, kriging std).
+    """
+    func = VARIOGRAMS[vario["model"]]
+    params = (vario["nugget"], vario["sill"], vario["range"])
+
+    m, k = idx.shape
+    pts = tree_xy[idx]                                  # (m, k, 2)
+
+    dij = np.linalg.norm(pts[:, :, None, :] - pts[:, None, :, :], axis=-1)
+
+    A = np.ones((m, k + 1, k + 1))
+    A[:, :k, :k] = func(dij, *params)
+    A[:, k, k] = 0.0
+
+    b = np.ones((m, k + 1))
+    b[:, :k] = func(dist, *params)
+
+    try:
+        w = np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # titik duplikat tanpa nugget -> matriks singular
+        w = (np.linalg.pinv(A) @ b[..., None])[..., 0]
+
+    est = (w[:, :k] * z[idx]).sum(axis=1)
+    var = (w * b).sum(axis=1)
+
+    return est, np.sqrt(np.clip(var, 0, None))
+
+
+class Interpolator:
+    def __init__(self, xy, z, method: str = "idw", neighbors: int = 12, power: float = 2.0, variogram: str = "spherical"):
+        self.xy = np.asarray(xy, dtype=np.float64)
+        self.z = np.asarray(z, dtype=np.float64)
+        self.method = method
+        self.k = int(min(neighbors, len(self.z)))
+        self.power = power
+        self.tree = cKDTree(self.xy)
+
+        self.variogram = fit_variogram(self.xy, self.z, variogram) if method == "kriging" else None
+
+    def _estimate(self, idx, dist):
+        if self.method == "kriging":
+            return _kriging(self.xy, self.z, idx, dist, self.variogram)
+        return _idw(dist, self.z[idx], self.power)
+
+    def predict(self, targets):
+        """
+        Estimasi di targets (n, 2). Return (estimate, std atau None).
+        """
+        targets = np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+        est = np.empty(len(targets))
+        std = np.empty(len(targets)) if self.method == "kriging" else None
+
+        for start in range(0, len(targets), CHUNK_CELLS):
+            t = targets[start:start + CHUNK_CELLS]
+            dist, idx = self.tree.query(t, k=self.k)
+            dist = dist.reshape(len(t), -1)
+            idx = idx.reshape(len(t), -1)
+
+            e, s = self._estimate(idx, dist)
+            est[start:start + CHUNK_CELLS] = e
+            if std is not None:
+                std[start:start + CHUNK_CELLS] = s
+
+        return est, std
+
+    def cross_validate(self) -> dict:
+        """
+        Leave-one-out: tetangga k+1, buang titik itu sendiri.
+        """
+        n = len(self.z)
+        if n < 3:
+            raise ValueError("Butuh minimal 3 titik untuk cross-validation")
+
+        k = min(self.k, n - 1)
+        oof = np.empty(n)
+
+        for start in range(0, n, CHUNK_CELLS):
+            t = self.xy[start:start + CHUNK_CELLS]
+            dist, idx = self.tree.query(t, k=k + 1)
+
+            # kolom pertama = titik itu sendiri (jarak 0), kecuali ada duplikat
+            self_idx = np.arange(start, start + len(t))[:, None]
+            not_self = idx != self_idx
+            order = np.argsort(~not_self, axis=1, kind="stable")[:, :k]
+
+            idx = np.take_along_axis(idx, order, axis=1)
+            dist = np.take_along_axis(dist, order, axis=1)
+
+            oof[start:start + CHUNK_CELLS] = self._estimate(idx, dist)[0]
+
+        r2, rmse = metrics(self.z, oof)
+        resid = oof - self.z
+
+        return {
+            "method": "leave_one_out",
+            "points": n,
+            "r_squared": r2,
+            "rmse": rmse,
+            "mae": float(np.abs(resid).mean()),
+            "bias": float(resid.mean()),
+        }
+
+
+# ===============================
+# AOI GRID -> GEOTIFF
+# ===============================
+def interpolate_to_raster(interp: Interpolator, aoi_wkb: bytes, srid: int, resolution_m: float, name: str):
+    """
+    Estimasi per cell (pusat cell di dalam AOI), ditulis per blok baris
+    ke GeoTIFF tiled. Kriging menambah band 2: kriging std.
+    Return (path, stats).
+    """
+    import rasterio
+    from rasterio.transform import Affine
+    from rasterio.windows import Window
+
+    aoi = shapely.from_wkb(aoi_wkb)
+    shapely.prepare(aoi)
+
+    minx, miny, maxx, maxy = aoi.bounds
+    width = max(1, int(np.ceil((maxx - minx) / resolution_m)))
+    height = max(1, int(np.ceil((maxy - miny) / resolution_m)))
+
+    if width * height > MAX_CELLS:
+        raise ValueError(f"Grid terlalu besar ({width}x{height}); perbesar resolution_m")
+
+    bands = 2 if interp.method == "kriging" else 1
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    path = OUTPUT_DIR / f"{name}_{datetime.now():%Y%m%d%H%M%S}.tif"
+
+    profile = {
+        "driver": "GTiff",
+        "height": height,
+        "width": width,
+        "count": bands,
+        "dtype": "float32",
+        "nodata": float("nan"),
+        "crs": f"EPSG:{srid}",
+        "transform": Affine(resolution_m, 0, minx, 0, -resolution_m, maxy),
+        "tiled": True,
+        "blockxsize": BLOCK,
+        "blockysize": BLOCK,
+        "compress": "deflate",
+        "predictor": 3,
+        "BIGTIFF": "IF_SAFER",
+    }
+
+    xs = minx + (np.arange(width) + 0.5) * resolution_m
+    rows_per_block = max(1, CHUNK_CELLS * 4 // width)
+
+    total = 0.0
+    cells = 0
+
+    with rasterio.open(path, "w", **profile) as dst:
+        for row in range(0, height, rows_per_block):
+            h = min(rows_per_block, height - row)
+            ys = maxy - (np.arange(row, row + h) + 0.5) * resolution_m
+
+            gx, gy = np.meshgrid(xs, ys)
+            inside = shapely.contains_xy(aoi, gx, gy)
+
+            est = np.full((h, width), np.nan, dtype=np.float32)
+            std = np.full((h, width), np.nan, dtype=np.float32)
+
+            if inside.any():
+                e, s = interp.predict(np.column_stack([gx[inside], gy[inside]]))
+                e = np.clip(e, 0, None)
+                est[inside] = e
+                if s is not None:
+                    std[inside] = s
+
+                total += float(e.sum())
+                cells += int(inside.sum())
+
+            win = Window(0, row, width, h)
+            dst.write(est, 1, window=win)
+            if bands == 2:
+                dst.write(std, 2, window=win)
+
+    cell_area = resolution_m * resolution_m
+
+    stats = {
+        "srid": srid,
+        "resolution_m": resolution_m,
+        "width": width,
+        "height": height,
+        "cells": cells,
+        "area_ha": cells * cell_area / 10_000,
+        "total_agb_t": total * cell_area / 1000,
+        "mean_agb_kg_per_m2": total / cells if cells else None,
+    }
+
+    return path, stats
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app.services import carbon_models
+
+load_dotenv()
+
+# Umur cache model aktif (detik). Membatasi data basi antar worker
+# uvicorn; di dalam satu proses cache di-invalidate langsung.
+MODEL_CACHE_TTL = float(os.getenv("MODEL_CACHE_TTL", "60"))
+
+
+class CarbonModel:
+    """
+    Model yang sudah di-parse dari project_models, siap dipakai predict.
+    """
+
+    def __init__(self, row):
+        self.id = int(row["id"])
+        self.project_id = str(row["project_id"])
+        self.model_type = row["model_type"]
+        self.features = list(row["features"])
+        self.params = row["params"]
+        self.uncertainty = row.get("uncertainty")
+        self.is_active = bool(row.get("is_active"))
+
+        # None bila model_type tidak dikenal (baris lama / plugin dihapus)
+        self.predictor = None
+        if self.model_type in carbon_models.MODEL_TYPES:
+            self.predictor = carbon_models.MODEL_TYPES[self.model_type].load(self.params, self.features)
+
+    @property
+    def is_linear(self) -> bool:
+        return isinstance(self.predictor, carbon_models.LinearPredictor)
+
+    @property
+    def intercept(self) -> float:
+        return self.predictor.intercept
+
+    @property
+    def coefs(self) -> np.ndarray:
+        return self.predictor.coefs
+
+    def predict(self, X) -> np.ndarray:
+        """
+        X: (n, len(features)) urutan kolom = self.features.
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.features))
+        return self.predictor.predict(X)
+
+
+_MODEL_COLUMNS = """
+    id, project_id, model_type, features, params, uncertainty, is_active
+"""
+
+
+class ModelRegistry:
+    """
+    Cache model aktif per project: model yang dipin (is_active), atau
+    model terbaru bila belum ada pin.
+
+    Generation per project dinaikkan setiap invalidate; hasil query yang
+    berjalan bersamaan dengan invalidate (mis. training baru commit di
+    tengah SELECT) tidak disimpan, supaya tidak basi sepanjang TTL.
+    """
+
+    def __init__(self, ttl: float = MODEL_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._active = {}
+        self._generation = {}
+
+    def invalidate(self, project_id: str):
+        key = str(project_id)
+        with self._lock:
+            self._active.pop(key, None)
+            self._generation[key] = self._generation.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._active.clear()
+            for key in self._generation:
+                self._generation[key] += 1
+
+    def get(self, db, model_id: int) -> CarbonModel | None:
+        row = db.execute(
+            text(f"SELECT {_MODEL_COLUMNS} FROM project_models WHERE id = :id"),
+            {"id": model_id}
+        ).mappings().first()
+        return CarbonModel(row) if row else None
+
+    def active(self, db, project_id: str) -> CarbonModel | None:
+        key = str(project_id)
+        now = time.monotonic()
+
+        with self._lock:
+            hit = self._active.get(key)
+            if hit and now - hit[0] < self.ttl:
+                return hit[1]
+            generation = self._generation.get(key, 0)
+
+        row = db.execute(
+            text(f"""
+                SELECT {_MODEL_COLUMNS}
+                FROM project_models
+                WHERE project_id = :pid
+                ORDER BY is_active DESC, created_at DESC
+                LIMIT 1
+            """),
+            {"pid": project_id}
+        ).mappings().first()
+
+        model = CarbonModel(row) if row else None
+
+        # "belum ada model" tidak di-cache: training berikutnya langsung terlihat
+        if model is not None:
+            with self._lock:
+                if self._generation.get(key, 0) == generation:
+                    self._active[key] = (now, model)
+
+        return model
+
+    def activate(self, db, model_id: int) -> CarbonModel | None:
+        """
+        Pin model sebagai aktif untuk project-nya. Commit di sini supaya
+        cache baru di-invalidate setelah pin terlihat oleh request lain.
+        """
+        model = self.get(db, model_id)
+        if model is None:
+            return None
+
+        # aktivasi paralel di project yang sama antre di lock baris project,
+        # supaya tidak ada dua model aktif yang melanggar unique index parsial
+        db.execute(
+            text("SELECT 1 FROM projects WHERE id = :pid FOR UPDATE"),
+            {"pid": model.project_id}
+        )
+
+        # dua statement: unique index parsial dicek per baris
+        db.execute(
+            text("""
+                UPDATE project_models
+                SET is_active = false
+                WHERE project_id = :pid AND is_active AND id <> :id
+            """),
+            {"pid": model.project_id, "id": model_id}
+        )
+        db.execute(
+            text("UPDATE project_models SET is_active = true WHERE id = :id"),
+            {"id": model_id}
+        )
+        db.commit()
+
+        self.invalidate(model.project_id)
+        model.is_active = True
+        return model
+
+
+    def deactivate(self, db, model_id: int) -> CarbonModel | None:
+        """
+        Lepas pin model; project kembali memakai model terbaru.
+        """
+        model = self.get(db, model_id)
+        if model is None:
+            return None
+
+        db.execute(
+            text("SELECT 1 FROM projects WHERE id = :pid FOR UPDATE"),
+            {"pid": model.project_id}
+        )
+        db.execute(
+            text("UPDATE project_models SET is_active = false WHERE id = :id"),
+            {"id": model_id}
+        )
+        db.commit()
+
+        self.invalidate(model.project_id)
+        model.is_active = False
+        return model
+
+
+registry = ModelRegistry()
@@ -0,0 +1,153 @@
+import numpy as np
+from sqlalchemy import text
+
+from app.services import features as feature_set
+from app.services.regression import sufficient_stats
+
+# ===============================
+# RUNNING SUFFICIENT STATISTICS PER PROJECT
+# ===============================
+# Pola pemakaian saat status / feature titik berubah:
+#
+#   before = model_stats.snapshot(db, project_id, point_ids)
+#   ... UPDATE sampling_points / sampling_point_features ...
+#   model_stats.apply(db, before)
+#
+# snapshot mengunci baris project_model_stats (FOR UPDATE) sehingga
+# perubahan paralel pada project yang sama berjalan berurutan.
+
+
+def training_rows(db, project_id: str, features: list[str], point_ids=None):
+    """
+    X, y titik yang saat ini ikut training (approved, punya AGB dan
+    semua feature). point_ids=None -> semua titik project.
+    """
+    sql = """
+        SELECT f.features, sp.agb_kg_per_m2
+        FROM sampling_points sp
+        JOIN sampling_point_features f
+          ON f.sampling_point_id = sp.id
+        WHERE sp.project_id = :pid
+          AND sp.survey_status = 'approved'
+          AND sp.agb_kg_per_m2 IS NOT NULL
+          AND f.features ?& CAST(:features AS text[])
+    """
+    params = {"pid": project_id, "features": features}
+
+    if point_ids is not None:
+        sql += " AND sp.id = ANY(CAST(:ids AS integer[]))"
+        params["ids"] = list(point_ids)
+
+    rows = db.execute(text(sql), params).fetchall()
+
+    X = np.array([[r[0][f] for f in features] for r in rows], dtype=np.float64).reshape(-1, len(features))
+    y = np.array([r[1] for r in rows], dtype=np.float64)
+    return X, y
+
+
+def _save(db, project_id: str, features: list[str], stats: dict):
+    db.execute(
+        text("""
+            INSERT INTO project_model_stats (
+                project_id, features, n, ata, aty, y_sum, y_sumsq, updated_at
+            )
+            VALUES (:pid, :features, :n, :ata, :aty, :y_sum, :y_sumsq, NOW())
+            ON CONFLICT (project_id) DO UPDATE
+            SET features = EXCLUDED.features,
+                n = EXCLUDED.n,
+                ata = EXCLUDED.ata,
+                aty = EXCLUDED.aty,
+                y_sum = EXCLUDED.y_sum,
+                y_sumsq = EXCLUDED.y_sumsq,
+                updated_at = NOW()
+        """),
+        {
+            "pid": project_id,
+            "features": features,
+            "n": int(stats["n"]),
+            "ata": np.asarray(stats["ata"]).ravel().tolist(),
+            "aty": np.asarray(stats["aty"]).tolist(),
+            "y_sum": float(stats["y_sum"]),
+            "y_sumsq": float(stats["y_sumsq"]),
+        }
+    )
+
+
+def load(db, project_id: str, lock: bool = False):
+    row = db.execute(
+        text(f"""
+            SELECT features, n, ata, aty, y_sum, y_sumsq, updated_at
+            FROM project_model_stats
+            WHERE project_id = :pid
+            {"FOR UPDATE" if lock else ""}
+        """),
+        {"pid": project_id}
+    ).mappings().first()
+
+    if not row:
+        return None
+
+    m = len(row["features"]) + 1
+    return {
+        "features": list(row["features"]),
+        "n": int(row["n"]),
+        "ata": np.array(row["ata"], dtype=np.float64).reshape(m, m),
+        "aty": np.array(row["aty"], dtype=np.float64),
+        "y_sum": float(row["y_sum"]),
+        "y_sumsq": float(row["y_sumsq"]),
+        "updated_at": row["updated_at"],
+    }
+
+
+def rebuild(db, project_id: str, features: list[str] | None = None) -> dict:
+    """
+    Hitung ulang dari semua titik approved (dipakai sekali saat stats
+    belum ada atau feature set berganti).
+    """
+    features = features or feature_set.MODEL_FEATURES
+    X, y = training_rows(db, project_id, features)
+    stats = sufficient_stats(X, y)
+    _save(db, project_id, features, stats)
+    stats["features"] = features
+    return stats
+
+
+def snapshot(db, project_id: str, point_ids):
+    """
+    Kontribusi titik-titik ini sebelum diubah. None bila project belum
+    punya stats (tidak ada yang perlu di-update).
+    """
+    stats = load(db, project_id, lock=True)
+    if stats is None:
+        return None
+
+    X, y = training_rows(db, project_id, stats["features"], point_ids)
+    return {
+        "project_id": project_id,
+        "point_ids": list(point_ids),
+        "stats": stats,
+        "before": sufficient_stats(X, y),
+    }
+
+
+def apply(db, snap):
+    """
+    Tambahkan selisih kontribusi (sesudah - sebelum) ke stats project.
+    """
+    if snap is None:
+        return
+
+    stats = snap["stats"]
+    before = snap["before"]
+
+    X, y = training_rows(db, snap["project_id"], stats["features"], snap["point_ids"])
+    after = sufficient_stats(X, y)
+
+    if after["n"] == 0 and before["n"] == 0:
+        return
+
+    updated = {
+        key: stats[key] + after[key] - before[key]
+        for key in ("n", "ata", "aty", "y_sum", "y_sumsq")
+    }
+    _save(db, snap["project_id"], stats["features"], updated)
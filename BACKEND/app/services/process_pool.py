@@ -0,0 +1,22 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Jumlah proses untuk pekerjaan numpy berat (bootstrap, peta lokal, ...)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "0")) or os.cpu_count() or 1
+
+_executor = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Satu process pool bersama untuk seluruh aplikasi, dibuat saat
+    pertama kali dipakai.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+    return _executor
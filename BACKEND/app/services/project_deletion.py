@@ -0,0 +1,261 @@
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+from app.services.uploads import path_for_url
+
+# ===============================
+# BACKGROUND PROJECT DELETION
+# ===============================
+# Urutan: foto survey -> survey -> sampling point -> project. Tiap batch
+# satu transaksi pendek (lock tabel tidak ditahan lama); progress ditulis
+# di transaksi yang sama dengan batch-nya. Job bisa dijalankan ulang:
+# semua langkah hanya menghapus yang masih tersisa.
+#
+# Endpoint yang menulis ke project (titik, survey, foto, import) memanggil
+# lock_project() dan menolak project 'deleting', sehingga tidak ada foto
+# baru yang masuk setelah langkah foto selesai (file-nya tidak terhapus).
+
+# Baris per batch DELETE
+DELETE_BATCH = 2_000
+
+
+def lock_project(db, project_id: str):
+    """
+    Kunci baris project (FOR SHARE) sebelum menulis titik / survey / foto
+    di bawahnya, sampai transaksi request commit. UPDATE di start()
+    menunggu lock ini, jadi tulisan yang lolos cek sudah commit sebelum
+    job hapus berjalan, dan tulisan berikutnya melihat 'deleting'.
+    Return status project, atau None bila project tidak ada.
+    """
+    return db.execute(
+        text("SELECT COALESCE(status::text, '') FROM projects WHERE id = :pid FOR SHARE"),
+        {"pid": project_id}
+    ).scalar()
+
+
+def start(db, project_id: str):
+    """
+    Tandai project 'deleting' dan siapkan baris progress.
+    Return baris project_deletions, atau None bila project tidak ada.
+    Project yang sudah 'deleting' boleh dijadwalkan ulang (mis. job
+    sebelumnya terhenti karena server restart).
+    """
+    project = db.execute(
+        text("""
+            UPDATE projects
+            SET status = 'deleting'
+            WHERE id = :pid
+            RETURNING name
+        """),
+        {"pid": project_id}
+    ).mappings().first()
+
+    if not project:
+        return None
+
+    totals = db.execute(
+        text("""
+            SELECT
+              (SELECT COUNT(*) FROM sampling_points WHERE project_id = :pid) AS points,
+              (SELECT COUNT(*)
+                 FROM surveys s
+                 JOIN sampling_points sp ON sp.id = s.sampling_point_id
+                WHERE sp.project_id = :pid) AS surveys,
+              (SELECT COUNT(*)
+                 FROM survey_photos ph
+                 JOIN surveys s ON s.id = ph.survey_id
+                 JOIN sampling_points sp ON sp.id = s.sampling_point_id
+                WHERE sp.project_id = :pid) AS photos
+        """),
+        {"pid": project_id}
+    ).mappings().one()
+
+    row = db.execute(
+        text("""
+            INSERT INTO project_deletions (
+                project_id, project_name, status,
+                total_points, total_surveys, total_photos
+            )
+            VALUES (:pid, :name, 'queued', :points, :surveys, :photos)
+            ON CONFLICT (project_id) DO UPDATE
+            SET status = 'queued',
+                error = NULL,
+                finished_at = NULL,
+                updated_at = NOW()
+            RETURNING *
+        """),
+        {"pid": project_id, "name": project["name"], **totals}
+    ).mappings().one()
+
+    db.commit()
+    return dict(row)
+
+
+def progress(db, project_id: str):
+    row = db.execute(
+        text("SELECT * FROM project_deletions WHERE project_id = :pid"),
+        {"pid": project_id}
+    ).mappings().first()
+
+    if not row:
+        return None
+
+    row = dict(row)
+    total = row["total_points"] + row["total_surveys"] + row["total_photos"]
+    done = row["deleted_points"] + row["deleted_surveys"] + row["deleted_photos"]
+    row["percent"] = 100.0 if row["status"] == "done" else (
+        round(100.0 * min(done, total) / total, 1) if total else 0.0
+    )
+    return row
+
+
+def _remove_files(db, urls: list[str]) -> int:
+    # file yang masih dipakai baris foto lain tidak dihapus
+    still_used = {
+        r[0] for r in db.execute(
+            text("SELECT DISTINCT photo_url FROM survey_photos WHERE photo_url = ANY(:urls)"),
+            {"urls": urls}
+        )
+    }
+
+    removed = 0
+    for url in set(urls) - still_used:
+        path = path_for_url(url)
+        if path is None:
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _batches(db, project_id: str, sql: str, counter: str, batch: int):
+    """
+    Jalankan DELETE ... RETURNING per batch sampai habis; progress
+    counter di-update dalam transaksi yang sama. Yield hasil tiap batch.
+    """
+    while True:
+        rows = db.execute(text(sql), {"pid": project_id, "batch": batch}).all()
+        if not rows:
+            return
+
+        db.execute(
+            text(f"""
+                UPDATE project_deletions
+                SET {counter} = {counter} + :n,
+                    updated_at = NOW()
+                WHERE project_id = :pid
+            """),
+            {"pid": project_id, "n": len(rows)}
+        )
+        db.commit()
+
+        yield rows
+
+
+def run(project_id: str, batch: int = DELETE_BATCH):
+    """
+    Background job. Membuka session sendiri karena berjalan di luar request.
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            text("""
+                UPDATE project_deletions
+                SET status = 'running',
+                    started_at = COALESCE(started_at, NOW()),
+                    updated_at = NOW()
+                WHERE project_id = :pid
+            """),
+            {"pid": project_id}
+        )
+        db.commit()
+
+        # 1. foto survey (+ file upload setelah batch commit)
+        for rows in _batches(db, project_id, """
+            DELETE FROM survey_photos
+            WHERE id IN (
+                SELECT ph.id
+                FROM survey_photos ph
+                JOIN surveys s ON s.id = ph.survey_id
+                JOIN sampling_points sp ON sp.id = s.sampling_point_id
+                WHERE sp.project_id = :pid
+                LIMIT :batch
+            )
+            RETURNING photo_url
+        """, "deleted_photos", batch):
+            removed = _remove_files(db, [r[0] for r in rows])
+            if removed:
+                db.execute(
+                    text("""
+                        UPDATE project_deletions
+                        SET files_removed = files_removed + :n
+                        WHERE project_id = :pid
+                    """),
+                    {"pid": project_id, "n": removed}
+                )
+                db.commit()
+
+        # 2. survey
+        for _ in _batches(db, project_id, """
+            DELETE FROM surveys
+            WHERE id IN (
+                SELECT s.id
+                FROM surveys s
+                JOIN sampling_points sp ON sp.id = s.sampling_point_id
+                WHERE sp.project_id = :pid
+                LIMIT :batch
+            )
+            RETURNING id
+        """, "deleted_surveys", batch):
+            pass
+
+        # 3. sampling point (assignment, feature, rollup per titik ikut CASCADE)
+        for _ in _batches(db, project_id, """
+            DELETE FROM sampling_points
+            WHERE id IN (
+                SELECT id
+                FROM sampling_points
+                WHERE project_id = :pid
+                LIMIT :batch
+            )
+            RETURNING id
+        """, "deleted_points", batch):
+            pass
+
+        # 4. project (model, output, rollup, AOI parts ikut CASCADE)
+        db.execute(
+            text("DELETE FROM projects WHERE id = :pid"),
+            {"pid": project_id}
+        )
+        db.execute(
+            text("""
+                UPDATE project_deletions
+                SET status = 'done',
+                    finished_at = NOW(),
+                    updated_at = NOW()
+                WHERE project_id = :pid
+            """),
+            {"pid": project_id}
+        )
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        db.execute(
+            text("""
+                UPDATE project_deletions
+                SET status = 'failed',
+                    error = :error,
+                    finished_at = NOW(),
+                    updated_at = NOW()
+                WHERE project_id = :pid
+            """),
+            {"pid": project_id, "error": str(e)}
+        )
+        db.commit()
+
+    finally:
+        db.close()
@@ -0,0 +1,172 @@
+import json
+import os
+import math
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Folder berisi scene Sentinel-2 lokal, satu sub-folder per scene:
+#
+#   <LOCAL_SCENE_DIR>/<scene_id>/scene.json
+#   <LOCAL_SCENE_DIR>/<scene_id>/B4.npy
+#   <LOCAL_SCENE_DIR>/<scene_id>/B8.npy
+#   ...
+#
+# scene.json:
+#   {
+#     "image_id": "COPERNICUS/S2_SR_HARMONIZED/20240701T...",
+#     "date": "2024-07-01",
+#     "cloud": 12.5,
+#     "srid": 32749,
+#     "transform": [x_origin, pixel_width, 0, y_origin, 0, pixel_height],
+#     "nodata": 0
+#   }
+#
+# transform mengikuti urutan GDAL (pixel_height negatif untuk north-up).
+LOCAL_SCENE_DIR = Path(os.getenv("LOCAL_SCENE_DIR", "scenes"))
+
+# Jumlah titik per blok saat sampling (membatasi memori window)
+POINT_CHUNK = 50_000
+
+
+class LocalScene:
+    """
+    Scene Sentinel-2 di disk, band dibaca lewat memory-map (np.load mmap_mode="r")
+    sehingga hanya pixel yang disentuh yang benar-benar dibaca dari disk.
+    """
+
+    def __init__(self, scene_id: str):
+        root = LOCAL_SCENE_DIR.resolve()
+        path = (root / scene_id).resolve()
+
+        if root not in path.parents:
+            raise ValueError("scene_id tidak valid")
+
+        meta_file = path / "scene.json"
+        if not meta_file.exists():
+            raise FileNotFoundError(f"Scene lokal tidak ditemukan: {scene_id}")
+
+        meta = json.loads(meta_file.read_text())
+
+        self.scene_id = scene_id
+        self.path = path
+        self.image_id = meta.get("image_id", scene_id)
+        self.date = meta.get("date")
+        self.cloud = meta.get("cloud")
+        self.srid = int(meta["srid"])
+        self.nodata = meta.get("nodata")
+
+        x0, dx, _, y0, _, dy = meta["transform"]
+        self.x0 = float(x0)
+        self.y0 = float(y0)
+        self.dx = float(dx)
+        self.dy = float(dy)
+
+        self._bands = {}
+
+    def band(self, name: str) -> np.ndarray:
+        if name not in self._bands:
+            band_file = self.path / f"{name}.npy"
+            if not band_file.exists():
+                raise FileNotFoundError(f"Band {name} tidak ada di scene {self.scene_id}")
+            self._bands[name] = np.load(band_file, mmap_mode="r")
+        return self._bands[name]
+
+    def to_pixel(self, x: np.ndarray, y: np.ndarray):
+        """
+        Koordinat (dalam SRID scene) -> index (row, col), vectorized.
+        """
+        cols = np.floor((x - self.x0) / self.dx).astype(np.int64)
+        rows = np.floor((y - self.y0) / self.dy).astype(np.int64)
+        return rows, cols
+
+    def _window_offsets(self, radius_m: float):
+        half_c = int(math.ceil(radius_m / abs(self.dx))) + 1
+        half_r = int(math.ceil(radius_m / abs(self.dy))) + 1
+        dr, dc = np.meshgrid(
+            np.arange(-half_r, half_r + 1),
+            np.arange(-half_c, half_c + 1),
+            indexing="ij",
+        )
+        return dr.ravel(), dc.ravel()
+
+    def buffered_mean(
+        self,
+        band_names: list[str],
+        x: np.ndarray,
+        y: np.ndarray,
+        radius_m: float = 10,
+        derive=None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Rata-rata nilai band di sekitar setiap titik (setara
+        reduceRegion(mean, point.buffer(radius_m)) di GEE).
+
+        Pixel dihitung bila pusat pixel berada di dalam radius; pixel
+        tempat titik berada selalu ikut dihitung. Titik di luar scene
+        atau tanpa pixel valid menghasilkan NaN.
+
+        derive: opsional, fungsi {band: window} -> {nama: window} yang
+        dijalankan per pixel sebelum dirata-rata (misal index vegetasi),
+        sama seperti reduksi feature image di GEE.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        bands = {b: self.band(b) for b in band_names}
+        height, width = bands[band_names[0]].shape
+
+        dr, dc = self._window_offsets(radius_m)
+        center = (dr == 0) & (dc == 0)
+
+        out = {}
+
+        for start in range(0, len(x), POINT_CHUNK):
+            xs = x[start:start + POINT_CHUNK]
+            ys = y[start:start + POINT_CHUNK]
+
+            rows0, cols0 = self.to_pixel(xs, ys)
+
+            # (n_points, window)
+            rows = rows0[:, None] + dr[None, :]
+            cols = cols0[:, None] + dc[None, :]
+
+            # jarak pusat pixel ke titik
+            px = self.x0 + (cols + 0.5) * self.dx
+            py = self.y0 + (rows + 0.5) * self.dy
+            dist2 = (px - xs[:, None]) ** 2 + (py - ys[:, None]) ** 2
+
+            mask = (dist2 <= radius_m * radius_m) | center[None, :]
+            mask &= (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+
+            r = np.clip(rows, 0, height - 1)
+            c = np.clip(cols, 0, width - 1)
+
+            window = {}
+            for name, arr in bands.items():
+                vals = arr[r, c].astype(np.float64)
+                mask &= np.isfinite(vals)
+                if self.nodata is not None:
+                    mask &= vals != self.nodata
+                window[name] = vals
+
+            if derive is not None:
+                window = derive(window)
+
+            for name, vals in window.items():
+                valid = mask & np.isfinite(vals)
+                count = valid.sum(axis=1)
+                total = np.where(valid, vals, 0.0).sum(axis=1)
+
+                if name not in out:
+                    out[name] = np.full(len(x), np.nan)
+
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    out[name][start:start + POINT_CHUNK] = np.where(
+                        count > 0, total / count, np.nan
+                    )
+
+        return out
@@ -0,0 +1,181 @@
+import numpy as np
+
+# ===============================
+# LINEAR REGRESSION (NUMPY)
+# y = b0 + b1*x1 + ... + bk*xk
+# ===============================
+
+
+def _as_arrays(X, y=None):
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    if y is None:
+        return X
+    return X, np.asarray(y, dtype=np.float64)
+
+
+def fit_linear_regression(X, y, ridge: float = 0.0):
+    """
+    Least squares lewat QR/SVD (np.linalg.lstsq), tanpa membentuk A^T A.
+
+    Feature distandarisasi dulu agar solusi stabil dan penalti ridge
+    (opsional, intercept tidak dipenalti) tidak tergantung skala feature.
+    Return (intercept, [coef...]) dalam skala asli.
+    """
+    X, y = _as_arrays(X, y)
+
+    n = X.shape[0]
+    if n == 0:
+        raise ValueError("No data")
+    k = X.shape[1]
+
+    mu = X.mean(axis=0)
+    sd = X.std(axis=0)
+
+    if ridge <= 0 and np.any(sd < 1e-12):
+        raise ValueError("Singular matrix (not enough variation / too few points)")
+    sd = np.where(sd < 1e-12, 1.0, sd)
+
+    Z = (X - mu) / sd
+    y_mean = y.mean()
+
+    A = Z
+    b = y - y_mean
+
+    if ridge > 0:
+        # ridge = least squares pada baris tambahan sqrt(ridge) * I
+        A = np.vstack([Z, np.sqrt(ridge) * np.eye(k)])
+        b = np.concatenate([b, np.zeros(k)])
+
+    beta, _, rank, _ = np.linalg.lstsq(A, b, rcond=None)
+
+    if rank < k:
+        raise ValueError("Singular matrix (not enough variation / too few points)")
+
+    coefs = beta / sd
+    intercept = y_mean - float(coefs @ mu)
+
+    return float(intercept), coefs.tolist()
+
+
+def predict(X, intercept: float, coefs) -> np.ndarray:
+    X = _as_arrays(X)
+    return intercept + X @ np.asarray(coefs, dtype=np.float64)
+
+
+def metrics(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+
+    n = len(y_true)
+    if n == 0:
+        return None
+
+    resid = y_true - y_pred
+    ss_res = float(resid @ resid)
+    ss_tot = float(((y_true - y_true.mean()) ** 2).sum())
+    r2 = 1.0 - (ss_res / ss_tot) if ss_tot > 1e-12 else None
+
+    rmse = float(np.sqrt(ss_res / n))
+    return r2, rmse
+
+
+def kfold_cv(X, y, folds: int = 5, ridge: float = 0.0, seed: int = 0):
+    """
+    K-fold cross-validation. R² dan RMSE dihitung dari prediksi
+    out-of-fold semua titik, plus RMSE per fold.
+    """
+    X, y = _as_arrays(X, y)
+    n = len(y)
+
+    folds = min(folds, n)
+    if folds < 2:
+        raise ValueError("Butuh minimal 2 fold")
+
+    order = np.random.default_rng(seed).permutation(n)
+    y_oof = np.empty(n)
+    fold_rmse = []
+
+    for test_idx in np.array_split(order, folds):
+        train_mask = np.ones(n, dtype=bool)
+        train_mask[test_idx] = False
+
+        intercept, coefs = fit_linear_regression(X[train_mask], y[train_mask], ridge=ridge)
+        y_oof[test_idx] = predict(X[test_idx], intercept, coefs)
+
+        fold_rmse.append(metrics(y[test_idx], y_oof[test_idx])[1])
+
+    r2, rmse = metrics(y, y_oof)
+
+    return {
+        "folds": folds,
+        "r_squared": r2,
+        "rmse": rmse,
+        "fold_rmse": fold_rmse,
+    }
+
+
+# ===============================
+# SUFFICIENT STATISTICS
+# ===============================
+def sufficient_stats(X, y) -> dict:
+    """
+    A^T A, A^T y, n, sum(y), sum(y^2) dengan A = [1, X].
+    Bisa dijumlah / dikurangi untuk update incremental.
+    """
+    X, y = _as_arrays(X, y)
+    A = np.column_stack([np.ones(len(y)), X])
+    return {
+        "n": len(y),
+        "ata": A.T @ A,
+        "aty": A.T @ y,
+        "y_sum": float(y.sum()),
+        "y_sumsq": float(y @ y),
+    }
+
+
+def fit_from_stats(stats: dict, ridge: float = 0.0):
+    """
+    Fit dari sufficient statistics, O(k^2) terhadap jumlah titik.
+    Standarisasi dan ridge sama dengan fit_linear_regression.
+    Return (intercept, [coef...], r2, rmse).
+    """
+    n = stats["n"]
+    ata = np.asarray(stats["ata"], dtype=np.float64)
+    aty = np.asarray(stats["aty"], dtype=np.float64)
+    k = ata.shape[0] - 1
+
+    if n <= k:
+        raise ValueError("Singular matrix (not enough variation / too few points)")
+
+    mu = ata[0, 1:] / n
+    y_mean = stats["y_sum"] / n
+
+    # centered cross-products
+    sxx = ata[1:, 1:] - n * np.outer(mu, mu)
+    sxy = aty[1:] - n * mu * y_mean
+
+    sd = np.sqrt(np.clip(np.diag(sxx) / n, 0, None))
+    if ridge <= 0 and np.any(sd < 1e-12):
+        raise ValueError("Singular matrix (not enough variation / too few points)")
+    sd = np.where(sd < 1e-12, 1.0, sd)
+
+    zz = sxx / np.outer(sd, sd) + ridge * np.eye(k)
+    zy = sxy / sd
+
+    beta, _, rank, _ = np.linalg.lstsq(zz, zy, rcond=None)
+    if rank < k:
+        raise ValueError("Singular matrix (not enough variation / too few points)")
+
+    coefs = beta / sd
+    intercept = y_mean - float(coefs @ mu)
+
+    full = np.concatenate([[intercept], coefs])
+    ss_res = max(float(stats["y_sumsq"] - 2 * full @ aty + full @ ata @ full), 0.0)
+    ss_tot = float(stats["y_sumsq"] - n * y_mean * y_mean)
+
+    r2 = 1.0 - ss_res / ss_tot if ss_tot > 1e-12 else None
+    rmse = float(np.sqrt(ss_res / n))
+
+    return float(intercept), coefs.tolist(), r2, rmse
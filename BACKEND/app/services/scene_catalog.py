@@ -0,0 +1,233 @@
+import json
+from datetime import date, datetime, timedelta
+
+import ee
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+COLLECTION = "COPERNICUS/S2_SR_HARMONIZED"
+
+
+def _scene_features(aoi, start: date, end: date) -> list[dict]:
+    """
+    Metadata scene (tanpa pixel) yang overlap dengan AOI, satu getInfo.
+    """
+    collection = (
+        ee.ImageCollection(COLLECTION)
+        .filterBounds(aoi)
+        .filterDate(start.isoformat(), end.isoformat())
+    )
+
+    def to_feature(img):
+        return ee.Feature(img.geometry(), {
+            "image_id": img.id(),
+            "time_start": img.get("system:time_start"),
+            "cloud": img.get("CLOUDY_PIXEL_PERCENTAGE"),
+            "tile_id": img.get("MGRS_TILE"),
+        })
+
+    fc = ee.FeatureCollection(collection.map(to_feature)).getInfo()
+    return fc["features"]
+
+
+def _year_chunks(start: date, end: date):
+    # GEE membatasi getInfo ~5000 elemen, jadi harvest per tahun
+    cur = start
+    while cur <= end:
+        chunk_end = min(date(cur.year, 12, 31), end)
+        yield cur, chunk_end + timedelta(days=1)
+        cur = date(cur.year + 1, 1, 1)
+
+
+def harvest_project_scenes(project_id: str, start: date, end: date):
+    """
+    Background job: isi sentinel_scenes untuk AOI project.
+    Membuka session sendiri karena berjalan di luar request.
+    """
+    db = SessionLocal()
+    try:
+        project = db.execute(
+            text("""
+                SELECT ST_AsGeoJSON(aoi)::json AS aoi
+                FROM projects
+                WHERE id = :pid
+            """),
+            {"pid": project_id}
+        ).mappings().first()
+
+        if not project:
+            return
+
+        db.execute(
+            text("""
+                INSERT INTO sentinel_scene_harvests (project_id, start_date, end_date, status)
+                VALUES (:pid, :start, :end, 'running')
+                ON CONFLICT (project_id) DO UPDATE
+                SET status = 'running',
+                    error = NULL,
+                    started_at = NOW(),
+                    finished_at = NULL
+            """),
+            {"pid": project_id, "start": start, "end": end}
+        )
+        db.commit()
+
+        aoi = ee.Geometry(project["aoi"])
+        total = 0
+
+        for chunk_start, chunk_end in _year_chunks(start, end):
+            features = _scene_features(aoi, chunk_start, chunk_end)
+            if not features:
+                continue
+
+            db.execute(
+                text("""
+                    INSERT INTO sentinel_scenes (image_id, acquired_at, cloud, tile_id, footprint)
+                    SELECT
+                        v.image_id,
+                        to_timestamp(v.time_start / 1000.0),
+                        v.cloud,
+                        v.tile_id,
+                        ST_SetSRID(ST_GeomFromGeoJSON(v.footprint), 4326)
+                    FROM unnest(
+                        CAST(:image_ids AS text[]),
+                        CAST(:time_starts AS double precision[]),
+                        CAST(:clouds AS double precision[]),
+                        CAST(:tile_ids AS text[]),
+                        CAST(:footprints AS text[])
+                    ) AS v(image_id, time_start, cloud, tile_id, footprint)
+                    ON CONFLICT (image_id) DO UPDATE
+                    SET cloud = EXCLUDED.cloud,
+                        tile_id = EXCLUDED.tile_id,
+                        footprint = EXCLUDED.footprint,
+                        harvested_at = NOW()
+                """),
+                {
+                    "image_ids": [f["properties"]["image_id"] for f in features],
+                    "time_starts": [f["properties"]["time_start"] for f in features],
+                    "clouds": [f["properties"].get("cloud") for f in features],
+                    "tile_ids": [f["properties"].get("tile_id") for f in features],
+                    "footprints": [json.dumps(f["geometry"]) for f in features],
+                }
+            )
+            db.commit()
+
+            total += len(features)
+
+        db.execute(
+            text("""
+                UPDATE sentinel_scene_harvests
+                SET status = 'done',
+                    start_date = :start,
+                    end_date = :end,
+                    scene_count = :total,
+                    finished_at = NOW()
+                WHERE project_id = :pid
+            """),
+            {"pid": project_id, "start": start, "end": end, "total": total}
+        )
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        db.execute(
+            text("""
+                UPDATE sentinel_scene_harvests
+                SET status = 'failed',
+                    error = :error,
+                    finished_at = NOW()
+                WHERE project_id = :pid
+            """),
+            {"pid": project_id, "error": str(e)}
+        )
+        db.commit()
+
+    finally:
+        db.close()
+
+
+def catalog_covers(db, project_id: str, start: date, end: date) -> bool:
+    """
+    True bila rentang tanggal sudah selesai di-harvest untuk project.
+    """
+    return bool(db.execute(
+        text("""
+            SELECT 1
+            FROM sentinel_scene_harvests
+            WHERE project_id = :pid
+              AND status = 'done'
+              AND start_date <= :start
+              AND end_date >= :end
+        """),
+        {"pid": project_id, "start": start, "end": end}
+    ).scalar())
+
+
+def closest_scenes(db, project_id: str, mid: datetime, start: date, end: date, cloud: float, limit: int = 5):
+    rows = db.execute(
+        text("""
+            SELECT
+                s.image_id,
+                s.acquired_at,
+                s.cloud,
+                ABS(EXTRACT(EPOCH FROM (s.acquired_at - CAST(:mid AS timestamptz)))) / 86400.0 AS date_diff
+            FROM sentinel_scenes s
+            JOIN projects p
+              ON p.id = :pid
+            WHERE s.acquired_at >= :start
+              AND s.acquired_at < :end
+              AND s.cloud < :cloud
+              AND ST_Intersects(s.footprint, p.aoi)
+            ORDER BY date_diff
+            LIMIT :limit
+        """),
+        {
+            "pid": project_id,
+            "mid": mid,
+            "start": start,
+            "end": end,
+            "cloud": cloud,
+            "limit": limit
+        }
+    ).mappings().all()
+
+    return [
+        {
+            "image_id": r["image_id"],
+            "date": r["acquired_at"].strftime("%Y-%m-%d"),
+            "cloud": r["cloud"] or 0,
+            "date_diff": round(float(r["date_diff"]), 1)
+        }
+        for r in rows
+    ]
+
+
+def available_years(db, project_id: str) -> list[int]:
+    return db.execute(
+        text("""
+            SELECT DISTINCT EXTRACT(YEAR FROM s.acquired_at)::int AS year
+            FROM sentinel_scenes s
+            JOIN projects p
+              ON p.id = :pid
+            WHERE ST_Intersects(s.footprint, p.aoi)
+            ORDER BY year
+        """),
+        {"pid": project_id}
+    ).scalars().all()
+
+
+def available_months(db, project_id: str, year: int) -> list[int]:
+    return db.execute(
+        text("""
+            SELECT DISTINCT EXTRACT(MONTH FROM s.acquired_at)::int AS month
+            FROM sentinel_scenes s
+            JOIN projects p
+              ON p.id = :pid
+            WHERE s.acquired_at >= make_date(:year, 1, 1)
+              AND s.acquired_at < make_date(:year + 1, 1, 1)
+              AND ST_Intersects(s.footprint, p.aoi)
+            ORDER BY month
+        """),
+        {"pid": project_id, "year": year}
+    ).scalars().all()
@@ -0,0 +1,83 @@
+import uuid
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+# ===============================
+# FAST JSON SERIALIZATION
+# ===============================
+# orjson menulis datetime / date / UUID / numpy langsung (format sama
+# dengan isoformat / str); Decimal (kolom numeric) jadi float. UUID dari
+# asyncpg (asyncpg.pgproto.UUID, subclass uuid.UUID) ditolak orjson, jadi
+# ditulis lewat default sebagai str.
+#
+# Endpoint panas tidak mengembalikan dict (yang masih lewat
+# jsonable_encoder FastAPI) tetapi bytes dari tuple hasil query:
+# kolom geometri diambil sebagai teks ST_AsGeoJSON (tanpa ::json) dan
+# disisipkan apa adanya lewat orjson.Fragment, tanpa parse + dump ulang.
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+def raw(text: str | None):
+    """
+    Teks JSON dari database (mis. ST_AsGeoJSON) tanpa di-parse.
+    """
+    return None if text is None else orjson.Fragment(text)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class aplikasi (lihat main.py).
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_response(body: bytes, headers: dict | None = None) -> Response:
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def records(rows, columns: list[str], raw_columns=()) -> bytes:
+    """
+    List of object JSON dari tuple baris; raw_columns berisi teks JSON.
+    """
+    raw_idx = [i for i, c in enumerate(columns) if c in raw_columns]
+    if raw_idx:
+        rows = [list(r) for r in rows]
+        for r in rows:
+            for i in raw_idx:
+                r[i] = raw(r[i])
+
+    return dumps([dict(zip(columns, r)) for r in rows])
+
+
+def feature_collection(rows, properties: list[str]) -> bytes:
+    """
+    FeatureCollection dari tuple baris (geojson_text, *properties).
+    """
+    return dumps({
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": raw(r[0]),
+                "properties": dict(zip(properties, r[1:])),
+            }
+            for r in rows
+        ],
+    })
@@ -0,0 +1,141 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from app.services.process_pool import get_pool, WORKER_PROCESSES
+from app.services.regression import fit_linear_regression, predict, kfold_cv
+
+# ===============================
+# BOOTSTRAP UNCERTAINTY (LINEAR MODEL)
+# ===============================
+# Modul ini sengaja hanya bergantung pada numpy: fungsi chunk dijalankan
+# di process pool (spawn di Windows meng-import ulang modul ini).
+
+# Batas elemen matriks bobot (resample x titik) per chunk
+_CHUNK_CELLS = 2_000_000
+
+
+def _bootstrap_chunk(A: np.ndarray, y: np.ndarray, ridge: float, n_boot: int, seed) -> np.ndarray:
+    """
+    n_boot resample sekaligus. Resample direpresentasikan sebagai bobot
+    multinomial per titik, sehingga A^T W A untuk semua resample cukup
+    satu einsum dan satu batched solve.
+    A: design matrix terstandarisasi [1, Z]. Return beta (n_boot, m).
+    """
+    rng = np.random.default_rng(seed)
+    n, m = A.shape
+
+    W = rng.multinomial(n, np.full(n, 1.0 / n), size=n_boot).astype(np.float64)
+
+    ata = np.einsum("bn,ni,nj->bij", W, A, A)
+    aty = W @ (A * y[:, None])
+
+    if ridge > 0:
+        penalty = ridge * np.eye(m)
+        penalty[0, 0] = 0.0
+        ata = ata + penalty
+
+    try:
+        return np.linalg.solve(ata, aty[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # resample degenerate (titik terlalu sedikit / duplikat)
+        return (np.linalg.pinv(ata) @ aty[..., None])[..., 0]
+
+
+def bootstrap(X, y, n_boot: int = 2000, ridge: float = 0.0, level: float = 0.95, seed: int = 0, cv_folds: int = 5) -> dict:
+    """
+    Distribusi koefisien lewat bootstrap paralel + ringkasan untuk
+    prediction interval. Koefisien dikembalikan dalam skala asli
+    [intercept, coef_1, ..., coef_k].
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n, k = X.shape
+
+    mu = X.mean(axis=0)
+    sd = X.std(axis=0)
+    sd = np.where(sd < 1e-12, 1.0, sd)
+
+    A = np.column_stack([np.ones(n), (X - mu) / sd])
+
+    # cukup kecil untuk memori, cukup banyak untuk semua worker
+    chunk = max(1, min(n_boot, _CHUNK_CELLS // max(n, 1), -(-n_boot // WORKER_PROCESSES)))
+    sizes = [min(chunk, n_boot - i) for i in range(0, n_boot, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if len(sizes) > 1 and WORKER_PROCESSES > 1:
+        parts = list(get_pool().map(
+            _bootstrap_chunk,
+            [A] * len(sizes),
+            [y] * len(sizes),
+            [ridge] * len(sizes),
+            sizes,
+            seeds,
+        ))
+    else:
+        parts = [_bootstrap_chunk(A, y, ridge, s, sd_) for s, sd_ in zip(sizes, seeds)]
+
+    beta_z = np.vstack(parts)
+
+    # back to original feature scale
+    coefs = beta_z[:, 1:] / sd
+    intercepts = beta_z[:, 0] - coefs @ mu
+    betas = np.column_stack([intercepts, coefs])
+
+    alpha = (1.0 - level) / 2.0
+    lo_q, hi_q = alpha * 100, (1.0 - alpha) * 100
+
+    # residual spread of the full-data fit (df-corrected)
+    intercept, point_coefs = fit_linear_regression(X, y, ridge=ridge)
+    resid = y - predict(X, intercept, point_coefs)
+    dof = max(n - (k + 1), 1)
+    residual_std = float(np.sqrt(resid @ resid / dof))
+
+    result = {
+        "method": "bootstrap",
+        "n_boot": int(betas.shape[0]),
+        "level": level,
+        "ridge": ridge,
+        "coef_mean": betas.mean(axis=0).tolist(),
+        "coef_std": betas.std(axis=0, ddof=1).tolist(),
+        "coef_percentiles": {
+            "lower": np.percentile(betas, lo_q, axis=0).tolist(),
+            "median": np.percentile(betas, 50, axis=0).tolist(),
+            "upper": np.percentile(betas, hi_q, axis=0).tolist(),
+        },
+        "coef_cov": np.cov(betas, rowvar=False).reshape(k + 1, k + 1).tolist(),
+        "residual_std": residual_std,
+        "residual_quantiles": {
+            "lower": float(np.percentile(resid, lo_q)),
+            "upper": float(np.percentile(resid, hi_q)),
+        },
+    }
+
+    lower, upper = prediction_interval(X, intercept, point_coefs, result)
+    result["training_coverage"] = float(np.mean((y >= lower) & (y <= upper)))
+    result["mean_interval_width"] = float(np.mean(upper - lower))
+
+    if cv_folds >= 2:
+        result["cv"] = kfold_cv(X, y, folds=cv_folds, ridge=ridge, seed=seed)
+
+    return result
+
+
+def prediction_interval(X, intercept: float, coefs, unc: dict):
+    """
+    Interval prediksi per baris X:
+    y_hat +/- z * sqrt(x^T Cov(beta) x + residual_std^2)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[None, :]
+
+    yhat = predict(X, intercept, coefs)
+
+    A = np.column_stack([np.ones(len(X)), X])
+    cov = np.asarray(unc["coef_cov"], dtype=np.float64)
+    var = np.einsum("ni,ij,nj->n", A, cov, A) + unc["residual_std"] ** 2
+
+    z = NormalDist().inv_cdf((1.0 + unc.get("level", 0.95)) / 2.0)
+    half = z * np.sqrt(np.clip(var, 0, None))
+    return yhat - half, yhat + half
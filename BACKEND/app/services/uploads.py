@@ -0,0 +1,22 @@
+from pathlib import Path
+from urllib.parse import urlparse
+
+# ===============================
+# UPLOADED FILES
+# ===============================
+# Folder upload (sama dengan app/api/upload.py dan mount /uploads).
+# URL foto disimpan lengkap: http://host/uploads/<category>/<file>
+UPLOAD_DIR = Path("uploads")
+
+
+def path_for_url(url: str):
+    """
+    URL upload -> path lokal, hanya bila berada di dalam UPLOAD_DIR.
+    """
+    parts = urlparse(url).path.split("/uploads/", 1)
+    if len(parts) != 2 or not parts[1]:
+        return None
+
+    base = UPLOAD_DIR.resolve()
+    path = (base / parts[1]).resolve()
+    return path if base in path.parents else None
@@ -0,0 +1,101 @@
+import csv
+import io
+import sys
+import time
+
+import numpy as np
+import shapely
+
+from app.services import bulk_import
+
+# Throughput pipeline import (parse + validasi AOI + spesies + biomass +
+# serialisasi COPY) tanpa database. Jalankan dari folder BACKEND:
+#   python -m app.test.bench_import
+#   python -m app.test.bench_import <file.csv|xlsx|geojson>   (dry, file sendiri)
+
+SPECIES = [
+    {"id": 1, "local_name": "Meranti", "scientific_name": "Shorea leprosula", "wood_density": 0.52, "biomass_formula": None},
+    {"id": 2, "local_name": "Jati", "scientific_name": "Tectona grandis", "wood_density": 0.61, "biomass_formula": "0.0673 * pow(wood_density * dbh_cm ** 2 * height_m, 0.976)"},
+    {"id": 3, "local_name": "Mahoni", "scientific_name": "Swietenia macrophylla", "wood_density": 0.53, "biomass_formula": "exp(-2.134 + 2.53 * log(dbh_cm))"},
+    {"id": 4, "local_name": "Sengon", "scientific_name": "Falcataria moluccana", "wood_density": None, "biomass_formula": None},
+]
+
+AOI = shapely.box(110.0, -7.5, 110.2, -7.3)
+
+
+class CopyOnlyImporter(bulk_import.Importer):
+    """
+    Importer yang menulis payload COPY ke buffer (tanpa koneksi DB).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.copied_bytes = 0
+        self._seq = 0
+
+    def _allocate_point_ids(self, n):
+        ids = list(range(self._seq + 1, self._seq + n + 1))
+        self._seq += n
+        return ids
+
+    def _copy(self, table, columns, rows):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        self.copied_bytes += buf.tell()
+
+
+def synthetic_csv(n: int, trees_per_plot: int = 20, bad_ratio: float = 0.01, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    plots = n // trees_per_plot + 1
+
+    plot_lat = rng.uniform(-7.52, -7.28, plots)       # sebagian di luar AOI
+    plot_lng = rng.uniform(109.98, 110.22, plots)
+    names = ["Meranti", "jati", "Swietenia macrophylla", "4", "Tidak Ada"]
+    p_names = [0.4, 0.25, 0.2, 0.149, 0.001]
+
+    plot = np.arange(n) // trees_per_plot
+    dbh = rng.gamma(4, 6, n).round(1)
+    height = rng.uniform(5, 35, n).round(1)
+    species = rng.choice(names, size=n, p=p_names)
+    bad = rng.random(n) < bad_ratio
+
+    out = io.StringIO()
+    out.write("plot_id,latitude,longitude,species,dbh_cm,height_m,survey_date\n")
+    for i in range(n):
+        p = plot[i]
+        out.write(
+            f"P{p},{plot_lat[p]:.6f},{plot_lng[p]:.6f},{species[i]},"
+            f"{'x' if bad[i] else dbh[i]},{height[i]},2024-05-01\n"
+        )
+    return out.getvalue().encode("utf-8")
+
+
+def run(label: str, data: bytes, fmt: str):
+    importer = CopyOnlyImporter(
+        None, "bench", "00000000-0000-0000-0000-000000000000",
+        AOI, bulk_import.SpeciesIndex(SPECIES)
+    )
+    t0 = time.perf_counter()
+    result = bulk_import.run_import(importer, io.BytesIO(data), fmt)
+    elapsed = time.perf_counter() - t0
+
+    print(
+        f"{label:>22} {result['rows']:>9,} {result['points_created']:>8,} "
+        f"{result['trees_created']:>9,} {result['error_count']:>8,} "
+        f"{elapsed:>8.2f} {result['rows'] / elapsed:>10,.0f} "
+        f"{importer.copied_bytes / 1e6:>8.1f}"
+    )
+    return result
+
+
+print(f"{'input':>22} {'rows':>9} {'points':>8} {'trees':>9} {'errors':>8} {'sec':>8} {'rows/s':>10} {'copy_MB':>8}")
+
+if len(sys.argv) > 1:
+    path = sys.argv[1]
+    with open(path, "rb") as f:
+        result = run(path, f.read(), bulk_import.detect_format(path))
+    for e in result["errors"][:20]:
+        print(e)
+else:
+    for n in [10_000, 100_000, 500_000]:
+        run(f"synthetic csv n={n}", synthetic_csv(n), "csv")
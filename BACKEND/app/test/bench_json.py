@@ -0,0 +1,138 @@
+import json
+import sys
+import time
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+from asyncpg.pgproto.pgproto import UUID as PgUUID
+from fastapi.encoders import jsonable_encoder
+
+from app.services import serialize
+
+# Serialisasi response list_sampling_points (FeatureCollection titik) tanpa
+# database. Jalankan dari folder BACKEND:
+#   python -m app.test.bench_json            (100k feature)
+#   python -m app.test.bench_json 500000
+#
+#   legacy           dict per baris + float()/isoformat() per field,
+#                    jsonable_encoder, json.dumps (JSONResponse lama)
+#   legacy+orjson    pipeline lama, hanya response class diganti
+#   tuples+orjson    serialize.feature_collection dari tuple baris,
+#                    geometri teks ST_AsGeoJSON via orjson.Fragment
+
+PROPERTIES = [
+    "id", "status", "survey_status", "assigned_count", "max_surveyors",
+    "assigned_ids", "assigned_names", "latitude", "longitude", "total_biomass",
+    "start_date", "end_date", "created_at", "submitted_at",
+    "ndvi", "sentinel_date", "sentinel_cloud",
+]
+
+
+def synthetic(n: int, seed: int = 0):
+    """
+    Baris seperti hasil driver: tuple (geometry_text, *PROPERTIES) untuk
+    pipeline baru, dan mapping dengan geometry dict + Decimal untuk lama.
+    """
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(110.0, 110.2, n).round(7).tolist()
+    lat = rng.uniform(-7.5, -7.3, n).round(7).tolist()
+    biomass = rng.gamma(2, 300, n).round(3).tolist()
+    ndvi = rng.uniform(0.1, 0.9, n).tolist()
+    # tipe UUID yang dikembalikan asyncpg (bukan uuid.UUID biasa)
+    surveyors = [PgUUID(str(uuid.UUID(int=i + 1))) for i in range(5)]
+
+    created = datetime(2024, 5, 1, 8, 30, 15, 123456)
+    submitted = datetime(2024, 6, 1, 2, 0, tzinfo=timezone.utc)
+
+    tuples, mappings = [], []
+    for i in range(n):
+        assigned = surveyors[: i % 3]
+        props = [
+            i + 1, "open", "active", len(assigned), 5,
+            assigned, [f"Surveyor {uuid.UUID(str(u)).int}" for u in assigned],
+            lat[i], lon[i], biomass[i],
+            date(2024, 5, 1), date(2024, 6, 30), created,
+            submitted if i % 2 else None,
+            ndvi[i] if i % 10 else None, date(2024, 4, 28), 12,
+        ]
+        geometry = {"type": "Point", "coordinates": [lon[i], lat[i]]}
+
+        tuples.append((json.dumps(geometry, separators=(",", ":")), *props))
+        row = dict(zip(PROPERTIES, props))
+        row["geometry"] = geometry
+        row["total_biomass"] = Decimal(str(biomass[i]))
+        mappings.append(row)
+    return tuples, mappings
+
+
+def legacy_build(rows):
+    features = []
+    for r in rows:
+        features.append({
+            "type": "Feature",
+            "geometry": r["geometry"],
+            "properties": {
+                "id": r["id"],
+                "status": r["status"],
+                "survey_status": r["survey_status"],
+                "assigned_count": int(r["assigned_count"]),
+                "max_surveyors": r["max_surveyors"],
+                "assigned_ids": r["assigned_ids"],
+                "assigned_names": r["assigned_names"],
+                "latitude": float(r["latitude"]),
+                "longitude": float(r["longitude"]),
+                "total_biomass": float(r["total_biomass"] or 0),
+                "start_date": str(r["start_date"]) if r["start_date"] else None,
+                "end_date": str(r["end_date"]) if r["end_date"] else None,
+                "created_at": r["created_at"].isoformat() if r["created_at"] else None,
+                "submitted_at": r["submitted_at"].isoformat() if r["submitted_at"] else None,
+                "ndvi": float(r["ndvi"]) if r["ndvi"] is not None else None,
+                "sentinel_date": str(r["sentinel_date"]) if r["sentinel_date"] else None,
+                "sentinel_cloud": r["sentinel_cloud"],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def legacy(mappings) -> bytes:
+    content = jsonable_encoder(legacy_build(mappings))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def legacy_orjson(mappings) -> bytes:
+    return serialize.dumps(jsonable_encoder(legacy_build(mappings)))
+
+
+def tuples_orjson(tuples) -> bytes:
+    return serialize.feature_collection(tuples, PROPERTIES)
+
+
+def timed(fn, arg, repeat: int = 3):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(arg)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+tuples, mappings = synthetic(n)
+
+# output harus identik secara isi dengan pipeline lama
+sample_t, sample_m = tuples[:1000], mappings[:1000]
+assert json.loads(tuples_orjson(sample_t)) == json.loads(legacy(sample_m)), "output berbeda"
+
+print(f"{'pipeline':>16} {'features':>9} {'sec':>8} {'features/s':>12} {'MB':>7} {'speedup':>8}")
+base = None
+for label, fn, arg in [
+    ("legacy", legacy, mappings),
+    ("legacy+orjson", legacy_orjson, mappings),
+    ("tuples+orjson", tuples_orjson, tuples),
+]:
+    sec, body = timed(fn, arg)
+    base = base or sec
+    print(f"{label:>16} {n:>9,} {sec:>8.3f} {n / sec:>12,.0f} {len(body) / 1e6:>7.1f} {base / sec:>7.1f}x")
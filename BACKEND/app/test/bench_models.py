@@ -0,0 +1,90 @@
+import sys
+import time
+
+import numpy as np
+
+from app.services import carbon_models
+from app.services.regression import metrics
+
+# Bandingkan model type: waktu training, throughput prediksi, akurasi holdout.
+# Jalankan dari folder BACKEND:
+#   python -m app.test.bench_models                 (data sintetis)
+#   python -m app.test.bench_models <project_id>    (+ titik approved project)
+
+FEATURES = ["ndvi", "evi", "b4", "b8"]
+
+CONFIGS = [
+    ("linear_regression", {}),
+    ("random_forest", {"n_trees": 50, "max_depth": 8}),
+    ("random_forest", {"n_trees": 100, "max_depth": 12}),
+]
+
+PREDICT_ROWS = 1_000_000
+
+
+def synthetic(n: int, seed: int = 0):
+    """
+    AGB yang jenuh terhadap NDVI di hutan rapat (kasus linear gagal).
+    """
+    rng = np.random.default_rng(seed)
+    ndvi = rng.uniform(0.1, 0.9, n)
+    evi = ndvi * rng.uniform(0.6, 0.9, n)
+    b4 = rng.uniform(0.01, 0.1, n) * (1.1 - ndvi)
+    b8 = rng.uniform(0.2, 0.45, n)
+    X = np.column_stack([ndvi, evi, b4, b8])
+    y = 30 * (1 - np.exp(-5 * np.clip(ndvi - 0.15, 0, None))) + rng.normal(0, 2, n)
+    return X, y
+
+
+def project_data(project_id: str):
+    from app.db.session import SessionLocal
+    from app.services import model_stats
+
+    db = SessionLocal()
+    try:
+        return model_stats.training_rows(db, project_id, FEATURES)
+    finally:
+        db.close()
+
+
+def run(label: str, X, y, seed: int = 0):
+    order = np.random.default_rng(seed).permutation(len(y))
+    cut = int(len(y) * 0.8)
+    train, test = order[:cut], order[cut:]
+
+    X_big = X[np.random.default_rng(seed).integers(0, len(y), PREDICT_ROWS)]
+
+    print(f"\n{label}: {len(train)} train / {len(test)} test")
+    print(f"{'model':>28} {'fit_ms':>9} {'rows/s':>12} {'r2':>7} {'rmse':>8}")
+
+    for name, opts in CONFIGS:
+        plugin = carbon_models.get_type(name)
+
+        t0 = time.perf_counter()
+        params = plugin.fit(X[train], y[train], FEATURES, **opts)
+        t1 = time.perf_counter()
+
+        predictor = plugin.load(params, FEATURES)
+
+        t2 = time.perf_counter()
+        predictor.predict(X_big)
+        t3 = time.perf_counter()
+
+        r2, rmse = metrics(y[test], predictor.predict(X[test]))
+
+        tag = name + "".join(f" {k[0]}{v}" for k, v in opts.items())
+        print(
+            f"{tag:>28} {(t1 - t0) * 1000:>9.1f} "
+            f"{PREDICT_ROWS / (t3 - t2):>12,.0f} {r2:>7.3f} {rmse:>8.3f}"
+        )
+
+
+for n in [500, 5_000]:
+    run(f"synthetic n={n}", *synthetic(n))
+
+if len(sys.argv) > 1:
+    X, y = project_data(sys.argv[1])
+    if len(y) < 20:
+        print(f"\nproject {sys.argv[1]}: titik terlalu sedikit ({len(y)})")
+    else:
+        run(f"project {sys.argv[1]}", X, y)
@@ -0,0 +1,33 @@
+import time
+
+import numpy as np
+
+from app.services.regression import fit_linear_regression, predict, metrics, kfold_cv
+
+# Jalankan dari folder BACKEND:
+#   python -m app.test.bench_regression
+
+rng = np.random.default_rng(42)
+
+print(f"{'points':>8} {'features':>9} {'fit_ms':>9} {'ridge_ms':>9} {'cv5_ms':>9} {'r2':>7}")
+
+for n in [1_000, 10_000, 50_000]:
+    for k in [4, 16, 64]:
+        X = rng.normal(size=(n, k))
+        beta = rng.normal(size=k)
+        y = 1.5 + X @ beta + rng.normal(scale=0.5, size=n)
+
+        t0 = time.perf_counter()
+        intercept, coefs = fit_linear_regression(X, y)
+        t1 = time.perf_counter()
+        fit_linear_regression(X, y, ridge=1.0)
+        t2 = time.perf_counter()
+        kfold_cv(X, y, folds=5)
+        t3 = time.perf_counter()
+
+        r2, _ = metrics(y, predict(X, intercept, coefs))
+
+        print(
+            f"{n:>8} {k:>9} {(t1 - t0) * 1000:>9.2f} "
+            f"{(t2 - t1) * 1000:>9.2f} {(t3 - t2) * 1000:>9.2f} {r2:>7.3f}"
+        )
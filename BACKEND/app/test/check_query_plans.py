@@ -0,0 +1,245 @@
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from app.api import carbon, project, sampling, survey
+from app.db.session import create_db_engine
+from app.services import archive, export
+
+# Regression check index: isi data sintetis (dalam satu transaksi yang
+# di-rollback di akhir), ANALYZE, lalu EXPLAIN (FORMAT JSON) tiap query
+# panas. Gagal (exit 1) bila ada Seq Scan pada tabel besar. Jalankan dari
+# folder BACKEND terhadap database scratch / CI yang sudah
+# `python -m app.db.migrate --url ... up`:
+#
+#   python -m app.test.check_query_plans --url postgresql://.../sentinel_ci
+#   python -m app.test.check_query_plans --url ... --projects 200 --points 500 -v
+#
+# Database tujuan wajib diberikan lewat --url (bukan .env), dan script
+# menolak database yang sudah berisi sampling point: ANALYZE di dalam
+# transaksi ikut di-rollback, tetapi reltuples pg_class tetap ter-update
+# sehingga statistik planner database itu melenceng sampai autovacuum.
+
+HOT_TABLES = {"sampling_points", "surveys", "sampling_assignments", "survey_photos"}
+
+
+# ===============================
+# SEED
+# ===============================
+SEED_SQL = [
+    """
+    CREATE TEMP TABLE _seed_users ON COMMIT DROP AS
+    SELECT gen_random_uuid() AS id, g AS n
+    FROM generate_series(1, 5) g
+    """,
+    """
+    INSERT INTO users (id, name, email, password_hash, role)
+    SELECT id, 'plan check ' || n, 'plan-check-' || id || '@example.invalid', '-', 'surveyor'
+    FROM _seed_users
+    """,
+    """
+    INSERT INTO tree_species (local_name, scientific_name, biomass_formula, wood_density)
+    VALUES ('plan-check', 'plan-check ' || gen_random_uuid(), '0.11 * wood_density * dbh_cm ** 2.62', 0.6)
+    """,
+    """
+    CREATE TEMP TABLE _seed_projects ON COMMIT DROP AS
+    SELECT gen_random_uuid() AS id, g AS n
+    FROM generate_series(1, :projects) g
+    """,
+    """
+    INSERT INTO projects (id, name, aoi, year, months)
+    SELECT id, 'plan check ' || n,
+           ST_MakeEnvelope(110.0, -7.5, 110.2, -7.3, 4326),
+           2024, ARRAY[1, 2, 3, 4, 5, 6]
+    FROM _seed_projects
+    """,
+    """
+    INSERT INTO sampling_points (project_id, geom, latitude, longitude, survey_status)
+    SELECT p.id, ST_SetSRID(ST_MakePoint(x, y), 4326), y, x,
+           (ARRAY['draft', 'active', 'submitted', 'approved'])[1 + (g % 4)]::survey_status_enum
+    FROM _seed_projects p
+    CROSS JOIN generate_series(1, :points) g
+    CROSS JOIN LATERAL (
+        SELECT 110.0 + random() * 0.2 AS x, -7.5 + random() * 0.2 AS y
+    ) xy
+    """,
+    """
+    CREATE TEMP TABLE _seed_points ON COMMIT DROP AS
+    SELECT id FROM sampling_points
+    WHERE project_id IN (SELECT id FROM _seed_projects)
+    """,
+    """
+    INSERT INTO sampling_assignments (sampling_point_id, surveyor_id)
+    SELECT sp.id, u.id
+    FROM _seed_points sp
+    JOIN _seed_users u ON u.n IN (1 + sp.id % 5, 1 + (sp.id + 1) % 5)
+    """,
+    """
+    INSERT INTO surveys (
+        sampling_point_id, surveyor_id, tree_species_id, survey_date,
+        dbh_cm, height_m, biomass, status, geom, latitude, longitude
+    )
+    SELECT sp.id, u.id, ts.id, DATE '2024-05-01',
+           d, 20, 0.11 * 0.6 * d ^ 2.62, 'submitted',
+           ST_SetSRID(ST_MakePoint(110.1, -7.4), 4326), -7.4, 110.1
+    FROM _seed_points sp
+    CROSS JOIN generate_series(1, :trees) g
+    JOIN _seed_users u ON u.n = 1 + sp.id % 5
+    CROSS JOIN (
+        SELECT id FROM tree_species WHERE local_name = 'plan-check' ORDER BY id DESC LIMIT 1
+    ) ts
+    CROSS JOIN LATERAL (SELECT 10 + random() * 40 AS d) dbh
+    """,
+    """
+    INSERT INTO survey_photos (survey_id, photo_url, photo_slot)
+    SELECT s.id, 'http://plan-check/uploads/survey/' || s.id || '_' || slot || '.jpg', slot
+    FROM surveys s
+    JOIN _seed_points sp ON sp.id = s.sampling_point_id
+    CROSS JOIN unnest(ARRAY['photo1', 'photo2']) slot
+    """,
+    "ANALYZE users",
+    "ANALYZE tree_species",
+    "ANALYZE projects",
+    "ANALYZE sampling_points",
+    "ANALYZE sampling_assignments",
+    "ANALYZE surveys",
+    "ANALYZE survey_photos",
+]
+
+
+def seed(conn, projects: int, points: int, trees: int) -> dict:
+    params = {"projects": projects, "points": points, "trees": trees}
+    for sql in SEED_SQL:
+        stmt = text(sql)
+        conn.execute(stmt, {k: v for k, v in params.items() if k in stmt.compile().params})
+
+    # parameter query: satu project di tengah, titik + survey miliknya
+    project_id = conn.execute(
+        text("SELECT id::text FROM _seed_projects WHERE n = :n"),
+        {"n": max(1, projects // 2)}
+    ).scalar()
+    point_id, surveyor_id = conn.execute(
+        text("""
+            SELECT sa.sampling_point_id, sa.surveyor_id::text
+            FROM sampling_assignments sa
+            JOIN sampling_points sp ON sp.id = sa.sampling_point_id
+            WHERE sp.project_id = :pid
+            ORDER BY sa.sampling_point_id
+            LIMIT 1
+        """),
+        {"pid": project_id}
+    ).one()
+    survey_ids = conn.execute(
+        text("SELECT id FROM surveys WHERE sampling_point_id = :id ORDER BY id"),
+        {"id": point_id}
+    ).scalars().all()
+
+    return {
+        "project_id": project_id,
+        "point_id": point_id,
+        "surveyor_id": surveyor_id,
+        "survey_id": survey_ids[0],
+        "sids": survey_ids,
+        "slot": "photo1",
+        "lons": [110.1, 110.15],
+        "lats": [-7.4, -7.35],
+        "features": ["ndvi", "evi"],
+    }
+
+
+# ===============================
+# HOT QUERIES
+# ===============================
+# SQL diambil langsung dari konstanta modul router / service yang
+# menjalankannya: nama -> (sql, {parameter SQL: key hasil seed}).
+# Parameter yang tidak dipetakan memakai key dengan nama yang sama.
+HOT_QUERIES = {
+    "list_sampling_points": (sampling.POINTS_SQL, {"pid": "project_id"}),
+    "feature_report": (export.feature_report_sql(list(export.POINT_COLUMNS)), {}),
+    "survey_detail": (export.survey_detail_sql(list(export.SURVEY_COLUMNS)), {}),
+    "archive_photos": (archive.PHOTOS_SQL, {}),
+    "surveys_by_point": (survey.SURVEYS_BY_POINT_SQL, {"pid": "point_id"}),
+    "photos_by_surveys": (survey.PHOTOS_BY_SURVEYS_SQL, {}),
+    # EXPLAIN tanpa ANALYZE: DELETE tidak dieksekusi
+    "photo_slot_replace": (survey.PHOTO_SLOT_DELETE_SQL, {"sid": "survey_id"}),
+    "survey_joined_check": (survey.JOINED_SQL, {"pid": "point_id", "sid": "surveyor_id"}),
+    "submit_joined_check": (sampling.ASSIGNMENT_CHECK_SQL, {"pid": "point_id", "sid": "surveyor_id"}),
+    "assignment_count": (sampling.ASSIGNMENT_COUNT_SQL, {"pid": "point_id"}),
+    "project_summary": (project.SUMMARY_SQL, {"pid": "project_id"}),
+    "nearest_features": (carbon.NEAREST_FEATURES_SQL, {"pid": "project_id"}),
+}
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(conn, sql: str, params: dict, aliases: dict) -> dict:
+    used = text(sql).compile().params
+    plan = conn.execute(
+        text(f"EXPLAIN (FORMAT JSON) {sql.strip().rstrip(';')}"),
+        {k: params[aliases.get(k, k)] for k in used}
+    ).scalar()
+    return plan[0]["Plan"]
+
+
+def check(conn, params: dict, verbose: bool = False) -> list[str]:
+    failures = []
+    for name, (sql, aliases) in HOT_QUERIES.items():
+        plan = explain(conn, sql, params, aliases)
+        scans = [
+            (n["Node Type"], n.get("Relation Name"), n.get("Index Name"))
+            for n in plan_nodes(plan)
+            if "Relation Name" in n
+        ]
+        bad = [rel for kind, rel, _ in scans if kind == "Seq Scan" and rel in HOT_TABLES]
+
+        status = "FAIL" if bad else "ok"
+        print(f"{status:>4}  {name:<26} cost={plan['Total Cost']:>12,.0f}")
+        if verbose or bad:
+            for kind, rel, index in scans:
+                print(f"        {kind:<18} {rel}{f' ({index})' if index else ''}")
+
+        if bad:
+            failures.append(f"{name}: Seq Scan on {', '.join(sorted(set(bad)))}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.test.check_query_plans")
+    parser.add_argument("--url", required=True, help="database scratch / CI (bukan dari .env)")
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--points", type=int, default=500, help="titik per project")
+    parser.add_argument("--trees", type=int, default=3, help="survey per titik")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    engine = create_db_engine(args.url, statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            existing = conn.execute(text("SELECT COUNT(*) FROM sampling_points")).scalar()
+            if existing:
+                print(f"Database sudah berisi {existing:,} sampling point; jalankan di database scratch / CI")
+                sys.exit(2)
+
+            print(f"seed: {args.projects} project x {args.points} titik x {args.trees} survey")
+            params = seed(conn, args.projects, args.points, args.trees)
+            failures = check(conn, params, args.verbose)
+        finally:
+            trans.rollback()
+    engine.dispose()
+
+    if failures:
+        print("\nQuery panas jatuh ke sequential scan:")
+        for f in failures:
+            print(f"  {f}")
+        sys.exit(1)
+    print("\nSemua query panas memakai index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+# Load test endpoint baca terhadap server yang sedang berjalan.
+# Bandingkan dua build (mis. sebelum/sesudah port async) dengan
+# menjalankan script yang sama ke masing-masing server:
+#
+#   python -m app.test.load_test --base http://localhost:8000/api \
+#       --project <project_id> --point <point_id> --token <jwt> \
+#       --concurrency 50 200 500 --duration 20
+#
+# Tiap endpoint dijalankan terpisah per level concurrency; hasil:
+# request/detik, latency p50/p95/p99, jumlah error.
+
+
+def endpoints(args) -> dict:
+    eps = {
+        "list_projects": "/projects/",
+        "list_sampling_points": f"/sampling/points/{args.project}",
+    }
+    if args.point:
+        eps["list_surveys_by_point"] = f"/survey/by-point/{args.point}"
+    if args.token:
+        eps["auth_me"] = "/auth/me"
+    return eps
+
+
+async def worker(client: httpx.AsyncClient, path: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path)
+            await r.aread()
+            if r.status_code >= 400:
+                errors.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(base: str, path: str, concurrency: int, duration: float, token: str | None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, headers=headers, limits=limits, timeout=60) as client:
+        # warm-up (pool koneksi DB, cache)
+        await client.get(path)
+
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, path, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    if latencies:
+        q = statistics.quantiles(latencies, n=100)
+        p50, p95, p99 = q[49] * 1000, q[94] * 1000, q[98] * 1000
+    else:
+        p50 = p95 = p99 = float("nan")
+
+    return len(latencies) / elapsed, p50, p95, p99, len(errors)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base", default="http://localhost:8000/api")
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--point", type=int)
+    parser.add_argument("--token")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':>24} {'clients':>8} {'req/s':>9} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'errors':>7}")
+
+    for name, path in endpoints(args).items():
+        for c in args.concurrency:
+            rps, p50, p95, p99, errors = await run(args.base, path, c, args.duration, args.token)
+            print(f"{name:>24} {c:>8} {rps:>9.1f} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {errors:>7}")
+
+
+asyncio.run(main())
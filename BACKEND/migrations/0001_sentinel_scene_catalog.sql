@@ -0,0 +1,33 @@
+-- Local catalog of Sentinel-2 scene metadata.
+-- Harvested per project AOI by a background job so closest-scene and
+-- availability queries can be answered from Postgres instead of GEE.
+
+CREATE TABLE IF NOT EXISTS sentinel_scenes (
+    image_id text PRIMARY KEY,
+    acquired_at timestamp with time zone NOT NULL,
+    cloud double precision,
+    tile_id text,
+    footprint public.geometry(Geometry, 4326) NOT NULL,
+    harvested_at timestamp with time zone DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sentinel_scenes_footprint
+    ON sentinel_scenes USING gist (footprint);
+
+CREATE INDEX IF NOT EXISTS idx_sentinel_scenes_acquired_at
+    ON sentinel_scenes USING btree (acquired_at, cloud);
+
+CREATE INDEX IF NOT EXISTS idx_sentinel_scenes_tile
+    ON sentinel_scenes USING btree (tile_id);
+
+-- Date range already harvested for each project AOI
+CREATE TABLE IF NOT EXISTS sentinel_scene_harvests (
+    project_id uuid PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    start_date date NOT NULL,
+    end_date date NOT NULL,
+    status text NOT NULL DEFAULT 'running',
+    scene_count integer,
+    error text,
+    started_at timestamp with time zone DEFAULT now(),
+    finished_at timestamp with time zone
+);
@@ -0,0 +1,12 @@
+-- Compact per-point feature store (bands + spectral indices) written by
+-- /sentinel/extract and /sentinel/extract-local. One jsonb document per
+-- sampling point instead of one column per index.
+
+CREATE TABLE IF NOT EXISTS sampling_point_features (
+    sampling_point_id integer PRIMARY KEY
+        REFERENCES sampling_points(id) ON DELETE CASCADE,
+    features jsonb NOT NULL,
+    image_id text,
+    sentinel_date date,
+    extracted_at timestamp with time zone DEFAULT now()
+);
@@ -0,0 +1,14 @@
+-- Export task tracking for project_outputs (filled by the GEE task poller)
+
+ALTER TABLE project_outputs
+    ADD COLUMN IF NOT EXISTS state text,
+    ADD COLUMN IF NOT EXISTS error_message text,
+    ADD COLUMN IF NOT EXISTS task_started_at timestamp with time zone,
+    ADD COLUMN IF NOT EXISTS task_finished_at timestamp with time zone,
+    ADD COLUMN IF NOT EXISTS updated_at timestamp with time zone;
+
+-- Poller only scans unfinished tasks
+CREATE INDEX IF NOT EXISTS idx_project_outputs_pending
+    ON project_outputs USING btree (id)
+    WHERE gee_task_id IS NOT NULL
+      AND (state IS NULL OR state IN ('UNSUBMITTED', 'READY', 'RUNNING', 'CANCEL_REQUESTED'));
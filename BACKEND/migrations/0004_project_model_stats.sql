@@ -0,0 +1,15 @@
+-- Running sufficient statistics of the linear carbon model per project.
+-- Design matrix A = [1, features...]; ata is (k+1)x(k+1) row-major.
+-- Maintained incrementally when points are approved / rejected /
+-- re-extracted, so refitting is O(k^2) regardless of point count.
+
+CREATE TABLE IF NOT EXISTS project_model_stats (
+    project_id uuid PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    features text[] NOT NULL,
+    n bigint NOT NULL DEFAULT 0,
+    ata double precision[] NOT NULL,
+    aty double precision[] NOT NULL,
+    y_sum double precision NOT NULL DEFAULT 0,
+    y_sumsq double precision NOT NULL DEFAULT 0,
+    updated_at timestamp with time zone DEFAULT now()
+);
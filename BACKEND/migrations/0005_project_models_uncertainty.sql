@@ -0,0 +1,5 @@
+-- Bootstrap / cross-validation uncertainty of a trained model
+-- (coefficient distribution, covariance, residual spread).
+
+ALTER TABLE project_models
+    ADD COLUMN IF NOT EXISTS uncertainty jsonb;
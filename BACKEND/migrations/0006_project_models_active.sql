@@ -0,0 +1,12 @@
+-- Model yang dipin sebagai aktif per project (maksimal satu).
+-- Tanpa pin, model aktif = model terbaru.
+
+ALTER TABLE project_models
+    ADD COLUMN IF NOT EXISTS is_active boolean NOT NULL DEFAULT false;
+
+CREATE UNIQUE INDEX IF NOT EXISTS project_models_one_active_idx
+    ON project_models (project_id)
+    WHERE is_active;
+
+CREATE INDEX IF NOT EXISTS project_models_project_created_idx
+    ON project_models (project_id, created_at DESC);
@@ -0,0 +1,50 @@
+-- Carbon stock rollups per project.
+--
+-- project_point_carbon / project_point_species_carbon hold each sampling
+-- point's contribution (refreshed per point when its surveys or status
+-- change). project_carbon_rollup is regrouped from those small tables,
+-- so the summary endpoint never aggregates surveys directly.
+-- Sub-area = 1 km grid cell in EPSG:3857 (cell_x, cell_y = floor(m / 1000)).
+
+CREATE TABLE IF NOT EXISTS project_point_carbon (
+    sampling_point_id integer PRIMARY KEY
+        REFERENCES sampling_points(id) ON DELETE CASCADE,
+    project_id uuid NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    survey_status text,
+    cell_x integer,
+    cell_y integer,
+    tree_count integer NOT NULL DEFAULT 0,
+    agb_kg double precision NOT NULL DEFAULT 0,
+    updated_at timestamp with time zone DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS project_point_carbon_project_idx
+    ON project_point_carbon (project_id);
+
+CREATE TABLE IF NOT EXISTS project_point_species_carbon (
+    sampling_point_id integer NOT NULL
+        REFERENCES sampling_points(id) ON DELETE CASCADE,
+    project_id uuid NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    tree_species_id integer NOT NULL,
+    tree_count integer NOT NULL DEFAULT 0,
+    agb_kg double precision NOT NULL DEFAULT 0,
+    PRIMARY KEY (sampling_point_id, tree_species_id)
+);
+
+CREATE INDEX IF NOT EXISTS project_point_species_carbon_project_idx
+    ON project_point_species_carbon (project_id);
+
+-- dimension: 'total' | 'status' | 'species' | 'cell'
+-- species / cell only count approved points.
+CREATE TABLE IF NOT EXISTS project_carbon_rollup (
+    project_id uuid NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    dimension text NOT NULL,
+    key text NOT NULL,
+    points integer NOT NULL DEFAULT 0,
+    trees integer NOT NULL DEFAULT 0,
+    agb_kg double precision NOT NULL DEFAULT 0,
+    carbon_kg double precision NOT NULL DEFAULT 0,
+    co2e_kg double precision NOT NULL DEFAULT 0,
+    updated_at timestamp with time zone DEFAULT now(),
+    PRIMARY KEY (project_id, dimension, key)
+);
@@ -0,0 +1,40 @@
+-- Derived AOI columns for lightweight project listings.
+-- Maintained by trigger on insert / AOI update, so every writer
+-- (ORM create, raw SQL update) keeps them in sync.
+--
+--   bbox           envelope of aoi
+--   centroid       ST_PointOnSurface (always inside the AOI)
+--   aoi_simple_low  ~100 m tolerance, overview zooms (<= 12)
+--   aoi_simple_mid  ~10 m tolerance, zooms 13-15
+
+ALTER TABLE projects
+    ADD COLUMN IF NOT EXISTS bbox geometry(Polygon, 4326),
+    ADD COLUMN IF NOT EXISTS centroid geometry(Point, 4326),
+    ADD COLUMN IF NOT EXISTS aoi_simple_low geometry(Geometry, 4326),
+    ADD COLUMN IF NOT EXISTS aoi_simple_mid geometry(Geometry, 4326);
+
+CREATE OR REPLACE FUNCTION projects_aoi_derived()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.bbox := ST_Envelope(NEW.aoi);
+    NEW.centroid := ST_PointOnSurface(NEW.aoi);
+    NEW.aoi_simple_low := ST_SimplifyPreserveTopology(NEW.aoi, 0.001);
+    NEW.aoi_simple_mid := ST_SimplifyPreserveTopology(NEW.aoi, 0.0001);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS projects_aoi_derived_trg ON projects;
+
+CREATE TRIGGER projects_aoi_derived_trg
+    BEFORE INSERT OR UPDATE OF aoi ON projects
+    FOR EACH ROW
+    EXECUTE FUNCTION projects_aoi_derived();
+
+-- backfill existing rows
+UPDATE projects SET aoi = aoi WHERE bbox IS NULL;
+
+CREATE INDEX IF NOT EXISTS projects_created_at_idx
+    ON projects (created_at DESC);
@@ -0,0 +1,63 @@
+-- Pre-projected AOI (EPSG:3857) plus a subdivided copy for fast
+-- containment / intersection tests in sampling queries.
+--
+-- projects.aoi_3857 is set by the BEFORE trigger from 0008 (redefined
+-- here); project_aoi_parts is rebuilt by an AFTER trigger because its
+-- rows reference the project.
+
+ALTER TABLE projects
+    ADD COLUMN IF NOT EXISTS aoi_3857 geometry(Polygon, 3857);
+
+CREATE INDEX IF NOT EXISTS projects_aoi_3857_gix
+    ON projects USING gist (aoi_3857);
+
+CREATE TABLE IF NOT EXISTS project_aoi_parts (
+    id bigserial PRIMARY KEY,
+    project_id uuid NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    geom geometry(Polygon, 3857) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS project_aoi_parts_geom_gix
+    ON project_aoi_parts USING gist (geom);
+
+CREATE INDEX IF NOT EXISTS project_aoi_parts_project_idx
+    ON project_aoi_parts (project_id);
+
+CREATE OR REPLACE FUNCTION projects_aoi_derived()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.bbox := ST_Envelope(NEW.aoi);
+    NEW.centroid := ST_PointOnSurface(NEW.aoi);
+    NEW.aoi_simple_low := ST_SimplifyPreserveTopology(NEW.aoi, 0.001);
+    NEW.aoi_simple_mid := ST_SimplifyPreserveTopology(NEW.aoi, 0.0001);
+    NEW.aoi_3857 := ST_Transform(NEW.aoi, 3857);
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION projects_aoi_parts_refresh()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM project_aoi_parts WHERE project_id = NEW.id;
+
+    -- max 256 vertices per part
+    INSERT INTO project_aoi_parts (project_id, geom)
+    SELECT NEW.id, ST_Subdivide(NEW.aoi_3857, 256);
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS projects_aoi_parts_trg ON projects;
+
+CREATE TRIGGER projects_aoi_parts_trg
+    AFTER INSERT OR UPDATE OF aoi ON projects
+    FOR EACH ROW
+    EXECUTE FUNCTION projects_aoi_parts_refresh();
+
+-- backfill existing rows (fires both triggers)
+UPDATE projects SET aoi = aoi WHERE aoi_3857 IS NULL;
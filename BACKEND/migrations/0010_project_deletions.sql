@@ -0,0 +1,44 @@
+-- Background project deletion.
+--
+-- DELETE /projects/{id} marks the project 'deleting' and a background
+-- job removes photos, surveys and sampling points in bounded batches
+-- before deleting the project row itself. project_deletions keeps the
+-- progress (and survives the project, so no FK to projects).
+
+ALTER TABLE projects
+    DROP CONSTRAINT IF EXISTS projects_status_check;
+
+ALTER TABLE projects
+    ADD CONSTRAINT projects_status_check
+    CHECK (status = ANY (ARRAY['draft'::text, 'locked'::text, 'deleting'::text]));
+
+CREATE TABLE IF NOT EXISTS project_deletions (
+    project_id uuid PRIMARY KEY,
+    project_name text,
+    status text NOT NULL DEFAULT 'queued',
+    total_points integer NOT NULL DEFAULT 0,
+    total_surveys integer NOT NULL DEFAULT 0,
+    total_photos integer NOT NULL DEFAULT 0,
+    deleted_points integer NOT NULL DEFAULT 0,
+    deleted_surveys integer NOT NULL DEFAULT 0,
+    deleted_photos integer NOT NULL DEFAULT 0,
+    files_removed integer NOT NULL DEFAULT 0,
+    error text,
+    requested_at timestamp with time zone DEFAULT now(),
+    started_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    updated_at timestamp with time zone DEFAULT now(),
+    CONSTRAINT project_deletions_status_check
+        CHECK (status = ANY (ARRAY['queued'::text, 'running'::text, 'done'::text, 'failed'::text]))
+);
+
+-- FK columns used by the batched deletes (and by ON DELETE CASCADE,
+-- which otherwise scans the child table once per deleted parent row)
+CREATE INDEX IF NOT EXISTS idx_surveys_sampling_point
+    ON surveys USING btree (sampling_point_id);
+
+CREATE INDEX IF NOT EXISTS idx_survey_photos_survey
+    ON survey_photos USING btree (survey_id);
+
+CREATE INDEX IF NOT EXISTS idx_sampling_assignments_point
+    ON sampling_assignments USING btree (sampling_point_id);
@@ -0,0 +1,63 @@
+-- migrate: no-transaction
+--
+-- Index set for the hot router / export queries, built CONCURRENTLY so
+-- field writes keep going during the migration. Each composite index
+-- replaces the single-column index on its leading column.
+--
+--   sampling_points (project_id, survey_status)
+--       list_sampling_points, feature report / export (approved_only),
+--       carbon rollup, project summary
+--   surveys (sampling_point_id, created_at)
+--       list_surveys_by_point (ORDER BY created_at), per-point biomass
+--       aggregates, export survey detail
+--   sampling_assignments (sampling_point_id, surveyor_id)
+--       already covered by the UNIQUE constraint; the table had the
+--       same constraint twice and 0010 added a third copy of the index
+--   sampling_assignments (surveyor_id), surveys (surveyor_id),
+--   surveys (tree_species_id)
+--       FK columns without an index (user / species deletes, and
+--       per-surveyor lookups)
+--   survey_photos (survey_id, photo_slot)
+--       photos by survey (ANY(:sids)) and slot replacement
+--   surveys USING gist (geom)
+--       spatial filters on tree positions
+--
+-- If a run fails half way, `python -m app.db.migrate status` lists any
+-- INVALID index left behind; drop it and run `up` again.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sampling_points_project_status
+    ON sampling_points USING btree (project_id, survey_status);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_sampling_points_project;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_surveys_point_created
+    ON surveys USING btree (sampling_point_id, created_at);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_surveys_sampling_point;
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_sampling_assignments_point;
+
+ALTER TABLE sampling_assignments
+    DROP CONSTRAINT IF EXISTS unique_sampling_assignment;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sampling_assignments_surveyor
+    ON sampling_assignments USING btree (surveyor_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_survey_photos_survey_slot
+    ON survey_photos USING btree (survey_id, photo_slot);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_survey_photos_survey;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_surveys_surveyor
+    ON surveys USING btree (surveyor_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_surveys_species
+    ON surveys USING btree (tree_species_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_surveys_geom
+    ON surveys USING gist (geom);
+
+ANALYZE sampling_points;
+ANALYZE surveys;
+ANALYZE sampling_assignments;
+ANALYZE survey_photos;
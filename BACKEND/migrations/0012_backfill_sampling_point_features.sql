@@ -0,0 +1,44 @@
+-- Backfill sampling_point_features from the legacy per-point columns.
+--
+-- Training (model_stats.training_rows), predict-by-coordinates and the
+-- feature report read features only from sampling_point_features. Points
+-- extracted before 0002 only have sampling_points.ndvi / evi / b4 / b8,
+-- so without this backfill every existing project reports "Data approved
+-- terlalu sedikit" until all of its points are re-extracted.
+--
+-- Existing points get a features document with just the legacy keys:
+--   ndvi, evi  copied as is
+--   b4, b8     stored on sampling_points as Sentinel-2 DN (x10000) and
+--              converted to reflectance 0-1 like the extractor writes
+-- NULL columns are left out, so a point missing a band simply does not
+-- qualify for models that need it. Features that never had a column
+-- (savi, ndmi, b2, b3, b11) are only available after a re-extract
+-- (/sentinel/extract or /sentinel/extract-local), which overwrites the
+-- whole document. Points that already have a row are not touched.
+--
+-- Cached sufficient statistics were built without these points, so they
+-- are dropped and rebuilt on the next training run (model_stats.rebuild).
+
+INSERT INTO sampling_point_features (
+    sampling_point_id,
+    features,
+    image_id,
+    sentinel_date,
+    extracted_at
+)
+SELECT
+    sp.id,
+    jsonb_strip_nulls(jsonb_build_object(
+        'ndvi', sp.ndvi,
+        'evi', sp.evi,
+        'b4', sp.b4 / 10000.0,
+        'b8', sp.b8 / 10000.0
+    )),
+    sp.sentinel_image_id,
+    sp.sentinel_date,
+    NULL
+FROM sampling_points sp
+WHERE COALESCE(sp.ndvi, sp.evi, sp.b4, sp.b8) IS NOT NULL
+ON CONFLICT (sampling_point_id) DO NOTHING;
+
+DELETE FROM project_model_stats;
@@ -135,17 +135,27 @@ async function loadProjects() {
     }
 }
 
-function selectProject() {
+async function selectProject() {
     const select = document.getElementById("projectSelect");
     const projectId = select.value;
     if (!projectId) return;
 
     const project = projectMap[projectId];
-    if (!project || !project.center || !project.aoi) {
+    if (!project || !project.center) {
         alert("Data area project tidak tersedia");
         return;
     }
 
+    // listing hanya berisi bbox/center, AOI penuh (untuk edit) diambil per project
+    if (!project.aoi) {
+        const res = await fetch(`${API_BASE}/projects/${projectId}/aoi`);
+        if (!res.ok) {
+            alert("Data area project tidak tersedia");
+            return;
+        }
+        project.aoi = (await res.json()).aoi;
+    }
+
     CURRENT_PROJECT_ID = projectId;
     setCurrentProject(projectId);
 
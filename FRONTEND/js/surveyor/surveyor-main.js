@@ -196,10 +196,9 @@ window.SurveyorApp = (function () {
             projectAOILayer = null;
         }
 
-        // AMBIL PROJECT
-        const res = await fetch(`${API_BASE}/projects`);
-        const projects = await res.json();
-        const project = projects.find(p => p.id === selectedId);
+        // AMBIL AOI PROJECT
+        const res = await fetch(`${API_BASE}/projects/${selectedId}/aoi`);
+        const project = res.ok ? await res.json() : null;
 
         // TAMBAHKAN POLYGON
         if (project?.aoi) {